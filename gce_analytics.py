@@ -0,0 +1,326 @@
+"""
+Offline per-node analytics over a GCE SQLite DB.
+
+Work is split into units (groups of nodes, or rowid ranges with
+--split time) and run on a process pool; each worker opens its own
+read-only connection, pulls its rows once and aggregates them with NumPy
+into per-(node, day) partials. The parent merges the partials and derives
+per-node summaries (loss, vbat trend) from them in one batched pass.
+
+    python gce_analytics.py --db gce_data.sqlite3 --since 180d --to-db
+    python gce_analytics.py --split time --jobs 8 --out daily.csv --summary-out nodes.csv
+    python gce_analytics.py --snapshot --jobs 8 --to-db
+
+--db may be a read-only snapshot from gce_backup; with --snapshot the
+workers read a temporary snapshot of --db taken first, so long runs never
+touch the live file (--to-db still writes the results to --db).
+
+Values are raw ADC counts (means of telemetry means, extremes of the
+frame min/max); days are UTC days of the aligned event time. Cycle gaps
+that straddle two work units are not counted as loss.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import time
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gce_backup import temporary_snapshot
+from gce_dump_telemetry import parse_time_arg
+from gce_linkstats import CYCLE_MOD, MAX_CYCLE_GAP
+from gce_rollout import parse_node_list
+from gce_series import SENSORS
+from gce_store import _EVENT_EPOCH_SQL, GceStore, connect_readonly
+
+DAY_S = 86400
+_ROWS_PER_UNIT = 250_000
+# colunas trazidas por unidade de trabalho, nessa ordem
+_QUERY_COLUMNS = (
+    "node_id",
+    "id",
+    _EVENT_EPOCH_SQL,
+    "cycle",
+    "rssi",
+    *(f"{s}_{stat}" for s in SENSORS for stat in ("mean", "min", "max")),
+)
+
+Partial = Dict[str, np.ndarray]
+WorkUnit = Tuple[Optional[Tuple[int, ...]], Optional[Tuple[int, int]]]
+
+
+def _fetch_unit(db_path: str, unit: WorkUnit, since: Optional[int], until: Optional[int]) -> np.ndarray:
+    node_ids, id_range = unit
+    where: List[str] = []
+    params: List[object] = []
+    if node_ids:
+        where.append(f"node_id IN ({','.join('?' * len(node_ids))})")
+        params += list(node_ids)
+    if id_range:
+        where.append("id >= ? AND id < ?")
+        params += list(id_range)
+    if since is not None:
+        where.append(f"{_EVENT_EPOCH_SQL} >= ?")
+        params.append(since)
+    if until is not None:
+        where.append(f"{_EVENT_EPOCH_SQL} < ?")
+        params.append(until)
+    query = f"SELECT {', '.join(_QUERY_COLUMNS)} FROM telemetry"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    conn = connect_readonly(Path(db_path))
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return np.empty((0, len(_QUERY_COLUMNS)), dtype=np.float64)
+    return np.array(rows, dtype=np.float64)  # NULL -> NaN
+
+
+def _group_starts(*keys: np.ndarray) -> np.ndarray:
+    """Start index of each run of equal keys in already sorted arrays."""
+    change = np.zeros(keys[0].size, dtype=bool)
+    change[0] = True
+    for k in keys:
+        change[1:] |= k[1:] != k[:-1]
+    return np.flatnonzero(change)
+
+
+def aggregate_rows(data: np.ndarray) -> Partial:
+    """Per-(node, day) count/sums/extremes/loss for one unit's rows (see _QUERY_COLUMNS)."""
+    if data.shape[0] == 0:
+        return {}
+    data = data[np.lexsort((data[:, 1], data[:, 0]))]
+    node = data[:, 0].astype(np.int64)
+    day = np.floor_divide(data[:, 2], DAY_S)
+    cycle = data[:, 3]
+
+    # perda: lacunas de ciclo entre frames consecutivos do mesmo nó
+    lost = np.zeros(node.size, dtype=np.float64)
+    if node.size > 1:
+        same = (node[1:] == node[:-1]) & np.isfinite(cycle[1:]) & np.isfinite(cycle[:-1])
+        gap = np.mod(cycle[1:] - np.where(same, cycle[:-1], cycle[1:]), CYCLE_MOD)
+        lost[1:] = np.where(same & (gap >= 1) & (gap <= MAX_CYCLE_GAP), gap - 1, 0)
+
+    starts = _group_starts(node, day)
+    out: Partial = {
+        "node_id": node[starts],
+        "day": day[starts].astype(np.int64),
+        "count": np.diff(np.append(starts, node.size)).astype(np.int64),
+        "lost": np.add.reduceat(lost, starts),
+        "rssi_sum": np.add.reduceat(data[:, 4], starts),
+    }
+    for i, sensor in enumerate(SENSORS):
+        base = 5 + 3 * i
+        out[f"{sensor}_sum"] = np.add.reduceat(data[:, base], starts)
+        out[f"{sensor}_min"] = np.minimum.reduceat(data[:, base + 1], starts)
+        out[f"{sensor}_max"] = np.maximum.reduceat(data[:, base + 2], starts)
+    return out
+
+
+def _run_unit(args) -> Partial:
+    db_path, unit, since, until = args
+    return aggregate_rows(_fetch_unit(db_path, unit, since, until))
+
+
+def merge_partials(partials: Sequence[Partial]) -> Partial:
+    """Combine partials whose (node, day) keys may overlap (time-split units)."""
+    partials = [p for p in partials if p]
+    if not partials:
+        return {}
+    cat = {k: np.concatenate([p[k] for p in partials]) for k in partials[0]}
+    order = np.lexsort((cat["day"], cat["node_id"]))
+    cat = {k: v[order] for k, v in cat.items()}
+    starts = _group_starts(cat["node_id"], cat["day"])
+    merged: Partial = {}
+    for key, values in cat.items():
+        if key in ("node_id", "day"):
+            merged[key] = values[starts]
+        elif key.endswith("_min"):
+            merged[key] = np.minimum.reduceat(values, starts)
+        elif key.endswith("_max"):
+            merged[key] = np.maximum.reduceat(values, starts)
+        else:
+            merged[key] = np.add.reduceat(values, starts)
+    return merged
+
+
+def daily_rows(merged: Partial) -> List[tuple]:
+    """(node_id, day, count, lost, rssi_mean, soil_mean, soil_min, soil_max, vbat_..., ntc_...) per node/day."""
+    if not merged:
+        return []
+    count = merged["count"].astype(np.float64)
+    cols = [merged["node_id"], merged["day"], merged["count"], merged["lost"], merged["rssi_sum"] / count]
+    for sensor in SENSORS:
+        cols += [merged[f"{sensor}_sum"] / count, merged[f"{sensor}_min"], merged[f"{sensor}_max"]]
+    return [
+        (int(r[0]), int(r[1]), int(r[2]), int(r[3]), *(None if np.isnan(v) else round(float(v), 3) for v in r[4:]))
+        for r in zip(*cols)
+    ]
+
+
+def node_summaries(merged: Partial) -> List[tuple]:
+    """
+    (node_id, first_day, last_day, rows, lost, loss_pct, vbat_mean, vbat_slope_per_day) per node.
+    The vbat trend is a count-weighted least-squares line through the daily means,
+    solved for every node at once from grouped sums.
+    """
+    if not merged:
+        return []
+    node = merged["node_id"]
+    starts = _group_starts(node)
+    w = merged["count"].astype(np.float64)
+    x = merged["day"].astype(np.float64)
+    y = merged["vbat_sum"] / w
+    valid = np.isfinite(y)
+    w = np.where(valid, w, 0.0)
+    y = np.where(valid, y, 0.0)
+    x = x - x[starts].repeat(np.diff(np.append(starts, node.size)))  # centra por nó (estabilidade)
+    sw, swx, swy = (np.add.reduceat(v, starts) for v in (w, w * x, w * y))
+    swxx, swxy = np.add.reduceat(w * x * x, starts), np.add.reduceat(w * x * y, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denom = sw * swxx - swx * swx
+        slope = np.where(denom > 0, (sw * swxy - swx * swy) / denom, np.nan)
+        vbat_mean = swy / sw
+    rows = np.add.reduceat(merged["count"], starts)
+    lost = np.add.reduceat(merged["lost"], starts)
+    loss_pct = 100.0 * lost / (rows + lost)
+    first_day = merged["day"][starts]
+    last_day = np.maximum.reduceat(merged["day"], starts)
+    out = []
+    for i, n in enumerate(node[starts]):
+        out.append(
+            (
+                int(n),
+                int(first_day[i]),
+                int(last_day[i]),
+                int(rows[i]),
+                int(lost[i]),
+                round(float(loss_pct[i]), 3),
+                None if np.isnan(vbat_mean[i]) else round(float(vbat_mean[i]), 3),
+                None if np.isnan(slope[i]) else round(float(slope[i]), 4),
+            )
+        )
+    return out
+
+
+def plan_units(db_path: Path, split: str, jobs: int, node_ids: Optional[Sequence[int]] = None) -> List[WorkUnit]:
+    """Node groups (about 4 per worker) or contiguous rowid ranges of bounded size."""
+    conn = connect_readonly(db_path)
+    try:
+        if split == "node":
+            nodes = list(node_ids) if node_ids else [r[0] for r in conn.execute("SELECT DISTINCT node_id FROM telemetry")]
+            groups = np.array_split(np.array(sorted(nodes), dtype=np.int64), max(1, min(len(nodes), jobs * 4)))
+            return [(tuple(int(n) for n in g), None) for g in groups if g.size]
+        lo, hi = conn.execute("SELECT MIN(id), MAX(id) FROM telemetry").fetchone()
+    finally:
+        conn.close()
+    if lo is None:
+        return []
+    n_units = max(jobs * 2, (hi - lo + 1) // _ROWS_PER_UNIT + 1)
+    edges = np.linspace(lo, hi + 1, n_units + 1).astype(np.int64)
+    nodes_key = tuple(int(n) for n in node_ids) if node_ids else None
+    return [(nodes_key, (int(a), int(b))) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def run_analytics(
+    db_path: Path,
+    *,
+    split: str = "node",
+    jobs: Optional[int] = None,
+    node_ids: Optional[Sequence[int]] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+) -> Partial:
+    """Aggregate the whole DB (or a filtered part) on a process pool; returns merged daily partials."""
+    jobs = jobs or os.cpu_count() or 1
+    units = plan_units(db_path, split, jobs, node_ids)
+    tasks = [(str(db_path), unit, since, until) for unit in units]
+    if jobs == 1 or len(tasks) <= 1:
+        partials = [_run_unit(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            partials = list(pool.map(_run_unit, tasks))
+    return merge_partials(partials)
+
+
+DAILY_HEADER = ["node_id", "day", "count", "lost", "rssi_mean"] + [
+    f"{s}_{stat}" for s in SENSORS for stat in ("mean", "min", "max")
+]
+NODE_HEADER = ["node_id", "first_day", "last_day", "rows", "lost", "loss_pct", "vbat_mean", "vbat_slope_per_day"]
+
+
+def _write_csv(path: Path, header: List[str], rows: List[tuple]):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _epoch_arg(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    return int(datetime.fromisoformat(parse_time_arg(value)).replace(tzinfo=timezone.utc).timestamp())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-node daily analytics over a GCE SQLite DB")
+    ap.add_argument("--db", type=Path, default=Path("gce_data.sqlite3"), help="Path to SQLite DB")
+    ap.add_argument("--split", choices=("node", "time"), default="node", help="Split work by node groups or rowid ranges")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    ap.add_argument("--nodes", help="Node list/range filter, e.g. '1,4,10-20'")
+    ap.add_argument("--since", help="ISO UTC time or look-back like '90d'")
+    ap.add_argument("--until", help="ISO UTC time or look-back like '1d'")
+    ap.add_argument("--out", type=Path, help="Write per-node daily rows to this CSV")
+    ap.add_argument("--summary-out", type=Path, help="Write per-node summary to this CSV")
+    ap.add_argument("--to-db", action="store_true", help="Replace analytics_daily/analytics_node tables in the DB")
+    ap.add_argument("--snapshot", action="store_true", help="Read from a temporary read-only snapshot of --db")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    with ExitStack() as stack:
+        source = stack.enter_context(temporary_snapshot(args.db)) if args.snapshot else args.db
+        merged = run_analytics(
+            source,
+            split=args.split,
+            jobs=args.jobs,
+            node_ids=parse_node_list(args.nodes) if args.nodes else None,
+            since=_epoch_arg(args.since),
+            until=_epoch_arg(args.until),
+        )
+    daily = daily_rows(merged)
+    summary = node_summaries(merged)
+    elapsed = time.perf_counter() - t0
+    if args.out:
+        _write_csv(args.out, DAILY_HEADER, daily)
+    if args.summary_out:
+        _write_csv(args.summary_out, NODE_HEADER, summary)
+    if args.to_db:
+        store = GceStore(args.db)
+        try:
+            store.save_analytics(daily, summary)
+        finally:
+            store.close()
+    if not (args.out or args.summary_out or args.to_db):
+        writer = csv.writer(sys.stdout)
+        writer.writerow(NODE_HEADER)
+        writer.writerows(summary)
+    print(
+        f"{int(merged['count'].sum()) if merged else 0} rows, {len(summary)} nodes, {len(daily)} node-days "
+        f"in {elapsed:.2f}s ({args.jobs} jobs, split={args.split})",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Archive old telemetry of a GCE SQLite DB into compressed columnar chunks.
+
+    python gce_archive.py --db gce_data.sqlite3 --older-than 90d
+    python gce_archive.py --db gce_data.sqlite3 --older-than 30d --chunk 6h --vacuum
+
+Rows older than the horizon leave the telemetry table and are stored per
+node in fixed-time chunks (see gce_chunks). Rollups and
+GceStore.read_columns() cover both tiers; the row-based views (telemetry
+table, gce_dump_telemetry, gce_analytics) only see rows not yet archived.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from gce_rollout import parse_duration_s
+from gce_store import GceStore
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Archive old GCE telemetry into compressed chunks")
+    ap.add_argument("--db", type=Path, default=Path("gce_data.sqlite3"), help="Path to SQLite DB")
+    ap.add_argument("--older-than", required=True, help="Archive rows older than this look-back, e.g. '90d'")
+    ap.add_argument("--chunk", default="1h", help="Chunk length, e.g. '1h' or '6h'")
+    ap.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages to the OS")
+    args = ap.parse_args()
+
+    try:
+        horizon_s = parse_duration_s(args.older_than)
+        chunk_s = int(parse_duration_s(args.chunk))
+    except ValueError as exc:
+        ap.error(str(exc))
+    if chunk_s <= 0:
+        ap.error("--chunk must be positive")
+
+    size_before = args.db.stat().st_size
+    t0 = time.perf_counter()
+    store = GceStore(args.db)
+    try:
+        rows, chunks = store.archive_telemetry(time.time() - horizon_s, chunk_s=chunk_s)
+        if args.vacuum:
+            store.vacuum()
+    finally:
+        store.close()
+    print(
+        f"{rows} rows archived into {chunks} chunks in {time.perf_counter() - t0:.1f}s; "
+        f"DB {size_before / 1e6:.1f} MB -> {args.db.stat().st_size / 1e6:.1f} MB",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Online backups and read-only snapshots of a GCE SQLite DB.
+
+    python gce_backup.py --db gce_data.sqlite3 --out backups/ --keep 7
+    python gce_backup.py --db gce_data.sqlite3 --out season.sqlite3 --pages 4096
+
+A snapshot is a consistent point-in-time copy taken while ingest goes on:
+a read-only connection opens one WAL read transaction and SQLite's online
+backup copies `pages` pages per step, sleeping `pause_s` between steps.
+Writers never wait on it (WAL readers do not block writers) and, as the
+read snapshot stays fixed, the copy never restarts; the WAL only cannot be
+checkpointed past the snapshot until the copy ends.
+
+The copy is written as *.partial, switched to journal_mode=DELETE (no -wal
+or -shm needed to read it), made read-only and renamed into place.
+gce_analytics and gce_dump_telemetry read snapshots like any --db, or take
+a temporary one themselves with --snapshot.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+from gce_store import connect_readonly
+
+SNAPSHOT_SUFFIX = ".sqlite3"
+
+
+def backup_database(
+    db_path: Path,
+    dest: Path,
+    *,
+    pages: int = 256,
+    pause_s: float = 0.005,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Copy db_path to dest as a read-only snapshot, pages per step.
+    progress(remaining, total) is called after every step. Returns the page count.
+    """
+    dest = Path(dest)
+    partial = dest.with_name(dest.name + ".partial")
+    if partial.exists():
+        partial.unlink()
+    src = connect_readonly(db_path)
+    try:
+        # transação de leitura aberta durante toda a cópia: mesmo instante, sem reinícios
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        target = sqlite3.connect(partial)
+        total = 0
+        try:
+
+            def step(_status, remaining, count):
+                nonlocal total
+                total = count
+                if progress:
+                    progress(remaining, count)
+                if remaining and pause_s > 0:
+                    time.sleep(pause_s)
+
+            src.backup(target, pages=max(1, int(pages)), progress=step)
+            target.execute("PRAGMA journal_mode=DELETE;")
+        finally:
+            target.close()
+    except BaseException:
+        if partial.exists():
+            partial.unlink()
+        raise
+    finally:
+        src.close()
+    os.chmod(partial, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    os.replace(partial, dest)
+    return total
+
+
+def snapshot_name(db_path: Path, at: Optional[float] = None) -> str:
+    """<db stem>-<UTC time>.sqlite3; names sort in time order."""
+    stamp = datetime.fromtimestamp(time.time() if at is None else at, tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return f"{Path(db_path).stem}-{stamp}{SNAPSHOT_SUFFIX}"
+
+
+def list_snapshots(out_dir: Path, db_path: Path) -> List[Path]:
+    """Snapshots of db_path in out_dir, oldest first."""
+    return sorted(Path(out_dir).glob(f"{Path(db_path).stem}-*T*Z{SNAPSHOT_SUFFIX}"))
+
+
+def _remove(path: Path):
+    # arquivos somente leitura não podem ser apagados no Windows
+    os.chmod(path, stat.S_IWUSR | stat.S_IRUSR)
+    path.unlink()
+
+
+def create_snapshot(db_path: Path, out_dir: Path, *, keep: int = 0, **kwargs) -> Path:
+    """
+    Write a new time-stamped snapshot into out_dir (see backup_database for
+    kwargs); with keep > 0 only the newest `keep` snapshots are kept.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # cópias interrompidas (processo encerrado no meio) ficam como .partial
+    for stale in out_dir.glob(f"{Path(db_path).stem}-*{SNAPSHOT_SUFFIX}.partial"):
+        stale.unlink()
+    dest = out_dir / snapshot_name(db_path)
+    backup_database(db_path, dest, **kwargs)
+    if keep > 0:
+        for old in list_snapshots(out_dir, db_path)[:-keep]:
+            _remove(old)
+    return dest
+
+
+@contextmanager
+def temporary_snapshot(db_path: Path, **kwargs) -> Iterator[Path]:
+    """Snapshot of db_path in a temporary directory, removed on exit."""
+    tmp = Path(tempfile.mkdtemp(prefix="gce-snapshot-"))
+    try:
+        dest = tmp / snapshot_name(db_path)
+        backup_database(db_path, dest, **kwargs)
+        yield dest
+    finally:
+        for path in tmp.iterdir():
+            _remove(path)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Online backup of a GCE SQLite DB into a read-only snapshot")
+    ap.add_argument("--db", type=Path, default=Path("gce_data.sqlite3"), help="Path to SQLite DB")
+    ap.add_argument("--out", type=Path, required=True, help="Snapshot file, or directory for time-stamped snapshots")
+    ap.add_argument("--keep", type=int, default=0, help="Directory mode: keep only the newest N snapshots (0 = all)")
+    ap.add_argument("--pages", type=int, default=256, help="Pages copied per backup step")
+    ap.add_argument("--pause-ms", type=float, default=5.0, help="Pause between steps, in ms")
+    args = ap.parse_args()
+    if not args.db.exists():
+        ap.error(f"{args.db} not found")
+
+    last_pct = [-1]
+
+    def progress(remaining: int, total: int):
+        pct = 100 * (total - remaining) // total if total else 100
+        if pct != last_pct[0]:
+            last_pct[0] = pct
+            print(f"\r{pct:3d}% of {total} pages", end="", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    kwargs = dict(pages=args.pages, pause_s=args.pause_ms / 1000.0, progress=progress)
+    if args.out.is_dir() or not args.out.suffix:
+        dest = create_snapshot(args.db, args.out, keep=args.keep, **kwargs)
+    else:
+        dest = args.out
+        backup_database(args.db, dest, **kwargs)
+    print(f"\n{dest} ({dest.stat().st_size / 1e6:.1f} MB) in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Fleet-wide battery life forecasting from calibrated rollups.
+
+Each node's hourly vbat means are fitted with a count-weighted linear model
+vbat = a + b * t + c * (ntc - ntc_mean): the ntc term absorbs the
+temperature swing of the cell voltage, b is the discharge trend. All nodes
+are solved at once from grouped sums (closed-form 2x2 per node after
+centering), so a refresh over hundreds of nodes is a few array passes.
+
+vbat must be in millivolts for the empty threshold to mean anything:
+nodes with a vbat calibration use it (rollups are calibrated), the others
+go through the ADC divider conversion (rollups_to_mv).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from gce_calib_utils import vbat_raw_to_mv_array
+
+DAY_S = 86400.0
+BATTERY_EMPTY_MV = 3300.0
+# divisor padrão do vbat quando o nó não tem calibração própria
+VBAT_VREF = 3.3
+VBAT_DIVIDER_RATIO = 2.0
+
+
+@dataclass
+class BatteryForecast:
+    node_id: int
+    vbat_now: float
+    slope_per_day: float
+    temp_coeff: float
+    days_to_empty: Optional[float]  # None: no discharge trend
+
+
+def rollups_to_mv(
+    rows,
+    is_calibrated: Callable[[int], bool],
+    *,
+    vref: float = VBAT_VREF,
+    divider_ratio: float = VBAT_DIVIDER_RATIO,
+) -> np.ndarray:
+    """
+    forecast_fleet rows with vbat_mean in mV: rows of nodes without a vbat
+    calibration hold raw ADC means and are converted through the divider.
+    """
+    data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    if data.shape[0] == 0:
+        return data
+    nodes = np.unique(data[:, 0]).astype(np.int64)
+    raw_nodes = [n for n in nodes.tolist() if not is_calibrated(n)]
+    raw = np.isin(data[:, 0], raw_nodes)
+    data[raw, 3] = vbat_raw_to_mv_array(data[raw, 3], vref=vref, divider_ratio=divider_ratio)
+    return data
+
+
+def forecast_fleet(
+    rows,
+    empty_level: float = BATTERY_EMPTY_MV,
+    now_epoch: Optional[float] = None,
+    min_buckets: int = 24,
+    min_span_days: float = 2.0,
+) -> Dict[int, BatteryForecast]:
+    """
+    rows: (node_id, bucket_start, count, vbat_mean, ntc_mean) sorted by node, bucket.
+    Nodes with fewer than min_buckets buckets or a span under min_span_days are skipped.
+    """
+    data = np.asarray(rows, dtype=np.float64).reshape(-1, 5)
+    data = data[np.isfinite(data[:, 3]) & (data[:, 2] > 0)]
+    if data.shape[0] == 0:
+        return {}
+    node = data[:, 0].astype(np.int64)
+    t = data[:, 1] / DAY_S
+    w = data[:, 2]
+    y = data[:, 3]
+    temp = data[:, 4]
+
+    change = np.ones(node.size, dtype=bool)
+    change[1:] = node[1:] != node[:-1]
+    starts = np.flatnonzero(change)
+    sizes = np.diff(np.append(starts, node.size))
+
+    def grouped(v):
+        return np.add.reduceat(v, starts)
+
+    sw = grouped(w)
+    t_bar = grouped(w * t) / sw
+    # buckets sem ntc contam como temperatura média do nó
+    has_temp = np.isfinite(temp)
+    sw_temp = grouped(np.where(has_temp, w, 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        temp_bar = np.where(sw_temp > 0, grouped(np.where(has_temp, w * temp, 0.0)) / sw_temp, 0.0)
+    y_bar = grouped(w * y) / sw
+    x = t - np.repeat(t_bar, sizes)
+    z = np.where(has_temp, temp - np.repeat(temp_bar, sizes), 0.0)
+    yc = y - np.repeat(y_bar, sizes)
+
+    sxx, sxz, szz = grouped(w * x * x), grouped(w * x * z), grouped(w * z * z)
+    sxy, szy = grouped(w * x * yc), grouped(w * z * yc)
+    det = sxx * szz - sxz * sxz
+    with np.errstate(invalid="ignore", divide="ignore"):
+        well_posed = det > 1e-9 * np.maximum(sxx * szz, 1e-12)
+        b = np.where(well_posed, (szz * sxy - sxz * szy) / det, sxy / sxx)
+        c = np.where(well_posed, (sxx * szy - sxz * sxy) / det, 0.0)
+
+    t_first = t[starts]
+    t_last = np.maximum.reduceat(t, starts)
+    v_now = y_bar + b * (t_last - t_bar)
+    now_days = (now_epoch / DAY_S) if now_epoch is not None else t_last
+    elapsed = np.maximum(now_days - t_last, 0.0) if now_epoch is not None else np.zeros_like(t_last)
+    eligible = (sizes >= min_buckets) & (t_last - t_first >= min_span_days) & np.isfinite(b)
+
+    out: Dict[int, BatteryForecast] = {}
+    for i in np.flatnonzero(eligible):
+        slope = float(b[i])
+        if v_now[i] <= empty_level:
+            days = 0.0
+        elif slope < 0:
+            days = max(0.0, float((v_now[i] - empty_level) / -slope - elapsed[i]))
+        else:
+            days = None
+        out[int(node[starts[i]])] = BatteryForecast(
+            node_id=int(node[starts[i]]),
+            vbat_now=float(v_now[i]),
+            slope_per_day=slope,
+            temp_coeff=float(c[i]),
+            days_to_empty=days,
+        )
+    return out
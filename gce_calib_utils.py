@@ -4,10 +4,25 @@ Helper functions for basic conversions on RSN raw telemetry.
 NOTE: Constants depend on your hardware (divider ratios, ADC reference).
 Provide the parameters explicitly to avoid baking wrong numbers.
 No automatic/ML logic here; just deterministic helpers.
+
+Array variants take and return NumPy arrays so a whole history (or fleet)
+converts in one pass; out-of-range raw counts become NaN instead of raising.
 """
 
 from __future__ import annotations
 
+import math
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from gce_series import MAX_NODES, SENSORS
+
+ADC_MAX_12BIT = 4095
+
+
 def vbat_raw_to_mv(raw: int, *, vref: float, divider_ratio: float, adc_max: int = 4095) -> int:
     """
     Convert a raw ADC reading to millivolts using a provided reference and divider ratio.
@@ -28,9 +43,173 @@ def vbat_raw_to_mv(raw: int, *, vref: float, divider_ratio: float, adc_max: int
     return int(mv)
 
 
-def ntc_raw_to_temp_stub(raw: int) -> float:
+def vbat_raw_to_mv_array(raw, *, vref: float, divider_ratio: float, adc_max: int = 4095) -> np.ndarray:
     """
-    Placeholder for NTC conversion. Requires sensor constants (R0, B, divider).
-    Keep as stub to avoid hard-coding wrong numbers; fill in when constants are defined.
+    Array version of vbat_raw_to_mv. Returns float64 millivolts (not truncated);
+    raw counts outside 0..adc_max (or NaN) map to NaN.
     """
-    raise NotImplementedError("Define NTC constants and implement conversion here.")
+    if adc_max <= 0:
+        raise ValueError("adc_max must be > 0")
+    if divider_ratio <= 0:
+        raise ValueError("divider_ratio must be > 0")
+    raw = np.asarray(raw, dtype=np.float64)
+    return np.where((raw < 0) | (raw > adc_max), np.nan, raw * (vref * 1000.0 * divider_ratio / adc_max))
+
+
+def apply_linear(raw, slope, offset) -> np.ndarray:
+    """slope * raw + offset over an array (float64); slope/offset may be per-sample arrays."""
+    return np.asarray(raw, dtype=np.float64) * slope + offset
+
+
+def linear_coeffs_at(at, starts, coeffs) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-sample (slope, offset) arrays for times `at`, given coefficients
+    effective from the sorted `starts`; samples before the first start get
+    identity (1, 0).
+    """
+    idx = np.searchsorted(np.asarray(starts, dtype=np.float64), np.asarray(at, dtype=np.float64), side="right")
+    table = np.vstack([(1.0, 0.0), np.asarray(coeffs, dtype=np.float64).reshape(-1, 2)])
+    return table[idx, 0], table[idx, 1]
+
+
+@dataclass(frozen=True)
+class NtcModel:
+    """
+    NTC thermistor in a voltage divider with a fixed resistor.
+
+    - r_series: fixed divider resistor in ohms
+    - r0 / beta / t0_c: Beta model (R0 at T0); used when sh_coeffs is None
+    - sh_coeffs: optional Steinhart-Hart (A, B, C) for 1/T = A + B ln R + C ln^3 R
+    - ntc_low_side: True when the NTC sits between the ADC pin and GND
+    - adc_max: max ADC count (default 4095 for 12-bit ESP32)
+    """
+
+    r_series: float
+    r0: float = 10000.0
+    beta: float = 3950.0
+    t0_c: float = 25.0
+    sh_coeffs: Optional[Tuple[float, float, float]] = None
+    ntc_low_side: bool = True
+    adc_max: int = ADC_MAX_12BIT
+
+    def resistance(self, raw) -> np.ndarray:
+        """NTC resistance in ohms for raw counts; rail values (0, adc_max) give NaN."""
+        raw = np.asarray(raw, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = raw / self.adc_max
+            if self.ntc_low_side:
+                r = self.r_series * ratio / (1.0 - ratio)
+            else:
+                r = self.r_series * (1.0 - ratio) / ratio
+        return np.where(np.isfinite(r) & (r > 0), r, np.nan)
+
+    def celsius_from_resistance(self, r) -> np.ndarray:
+        r = np.asarray(r, dtype=np.float64)
+        ln_r = np.log(r)
+        if self.sh_coeffs is not None:
+            a, b, c = self.sh_coeffs
+            inv_t = a + b * ln_r + c * ln_r ** 3
+        else:
+            inv_t = 1.0 / (self.t0_c + 273.15) + (ln_r - math.log(self.r0)) / self.beta
+        return 1.0 / inv_t - 273.15
+
+    def build_lut(self) -> np.ndarray:
+        """Temperature in °C for every raw count 0..adc_max (float32, NaN at the rails)."""
+        raw = np.arange(self.adc_max + 1, dtype=np.float64)
+        return self.celsius_from_resistance(self.resistance(raw)).astype(np.float32)
+
+
+_lut_cache: Dict[NtcModel, np.ndarray] = {}
+_lut_lock = threading.Lock()
+
+
+def ntc_lut(model: NtcModel) -> np.ndarray:
+    """Precomputed raw->°C table for a model (built once per distinct model)."""
+    with _lut_lock:
+        lut = _lut_cache.get(model)
+        if lut is None:
+            lut = model.build_lut()
+            lut.setflags(write=False)
+            _lut_cache[model] = lut
+        return lut
+
+
+def ntc_raw_to_temp_array(raw, model: NtcModel) -> np.ndarray:
+    """
+    Convert raw NTC counts to °C through the model's LUT (one gather, no math per sample).
+    Fractional inputs (e.g. mean counts) are rounded; out-of-range or NaN gives NaN.
+    """
+    lut = ntc_lut(model)
+    raw = np.asarray(raw, dtype=np.float64)
+    valid = np.isfinite(raw) & (raw >= 0) & (raw <= model.adc_max)
+    idx = np.rint(np.where(valid, raw, 0)).astype(np.intp)
+    return np.where(valid, lut[idx].astype(np.float64), np.nan)
+
+
+def ntc_raw_to_temp(raw: int, model: NtcModel) -> float:
+    """Scalar NTC conversion (see ntc_raw_to_temp_array)."""
+    return float(ntc_raw_to_temp_array(np.asarray([raw]), model)[0])
+
+
+class CalibrationCache:
+    """
+    Per-node linear coefficients (slope, offset) per sensor, kept as arrays
+    indexed by node_id so a whole fleet converts with one gather + FMA.
+
+    Nodes without explicit coefficients use identity (1, 0). `version` bumps
+    on every change so consumers can tell when cached conversions are stale.
+    """
+
+    def __init__(self, sensors: Tuple[str, ...] = SENSORS):
+        self._lock = threading.Lock()
+        self._slope = {s: np.ones(MAX_NODES, dtype=np.float64) for s in sensors}
+        self._offset = {s: np.zeros(MAX_NODES, dtype=np.float64) for s in sensors}
+        self._known: Dict[str, set] = {s: set() for s in sensors}
+        self.version = 0
+
+    def set(self, node_id: int, sensor: str, slope: float, offset: float):
+        with self._lock:
+            self._slope[sensor][node_id] = float(slope)
+            self._offset[sensor][node_id] = float(offset)
+            self._known[sensor].add(int(node_id))
+            self.version += 1
+
+    def load(self, entries):
+        """Replace all coefficients at once from (node_id, sensor, slope, offset) tuples."""
+        with self._lock:
+            for sensor in self._slope:
+                self._slope[sensor].fill(1.0)
+                self._offset[sensor].fill(0.0)
+                self._known[sensor].clear()
+            for node_id, sensor, slope, offset in entries:
+                if sensor not in self._slope:
+                    continue
+                self._slope[sensor][node_id] = float(slope)
+                self._offset[sensor][node_id] = float(offset)
+                self._known[sensor].add(int(node_id))
+            self.version += 1
+
+    def clear(self):
+        with self._lock:
+            for sensor in self._slope:
+                self._slope[sensor].fill(1.0)
+                self._offset[sensor].fill(0.0)
+                self._known[sensor].clear()
+            self.version += 1
+
+    def has(self, node_id: int, sensor: str) -> bool:
+        return int(node_id) in self._known.get(sensor, ())
+
+    def get(self, node_id: int, sensor: str) -> Tuple[float, float]:
+        """(slope, offset) for a node; identity when not configured."""
+        return float(self._slope[sensor][node_id]), float(self._offset[sensor][node_id])
+
+    def apply(self, sensor: str, node_ids, raw) -> np.ndarray:
+        """Calibrate raw values row-wise: node_ids and raw are broadcastable arrays."""
+        idx = np.asarray(node_ids, dtype=np.intp)
+        return np.asarray(raw, dtype=np.float64) * self._slope[sensor][idx] + self._offset[sensor][idx]
+
+    def apply_node(self, sensor: str, node_id: int, raw) -> np.ndarray:
+        """Calibrate an array of raw values from a single node."""
+        slope, offset = self.get(node_id, sensor)
+        return apply_linear(raw, slope, offset)
@@ -0,0 +1,97 @@
+"""
+Columnar codec for archived telemetry chunks (telemetry_chunks table).
+
+A chunk holds one node's frames for one fixed time window (chunk_s,
+e.g. one hour). Every column is stored as int64 deltas from the previous
+row, narrowed to the smallest integer type that fits, with an optional
+null bitmap; the whole blob is zlib-compressed. Decoding is one
+np.frombuffer + cumsum per column.
+
+Blob (before zlib): b"GCT1", rows u32, columns u16, then per column:
+  flags u8 (bit0: null bitmap follows), width u8 (1/2/4/8 bytes),
+  [packbits(valid) ceil(rows/8) bytes], rows * width delta bytes.
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import Dict, Sequence
+
+import numpy as np
+
+# Stored columns, in row order; epoch_ms is the sample time (event time, else host time).
+CHUNK_COLUMNS = (
+    "epoch_ms", "host_ms", "event_ts_ms", "tgw_ts_ms", "rsn_ts_ms", "cycle", "rssi",
+    "soil_mean", "soil_median", "soil_min", "soil_max", "soil_std",
+    "vbat_mean", "vbat_median", "vbat_min", "vbat_max", "vbat_std",
+    "ntc_mean", "ntc_median", "ntc_min", "ntc_max", "ntc_std",
+    "batt_status", "flags", "last_rssi",
+)
+_MAGIC = b"GCT1"
+_HEAD = struct.Struct("<4sIH")
+_COL_HEAD = struct.Struct("<BB")
+_WIDTHS = ((1, np.int8), (2, np.int16), (4, np.int32), (8, np.int64))
+_DTYPE_BY_WIDTH = {w: np.dtype(t).newbyteorder("<") for w, t in _WIDTHS}
+
+
+def encode_chunk(table: np.ndarray, level: int = 6) -> bytes:
+    """
+    table: rows x len(CHUNK_COLUMNS), in time order; float with NaN for NULL
+    (or any integer dtype when there are none).
+    """
+    table = np.asarray(table)
+    rows = table.shape[0]
+    if table.dtype.kind == "f":
+        valid = ~np.isnan(table)
+        values = np.where(valid, table, 0).astype(np.int64)
+    else:
+        valid = None
+        values = table.astype(np.int64, copy=False)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, values.shape[1]), dtype=np.int64))
+    lo = deltas.min(axis=0) if rows else np.zeros(values.shape[1], dtype=np.int64)
+    hi = deltas.max(axis=0) if rows else lo
+    # menor largura em que cabem todos os deltas da coluna
+    widths = np.full(values.shape[1], 8)
+    for width, dtype in reversed(_WIDTHS[:-1]):
+        info = np.iinfo(dtype)
+        widths[(lo >= info.min) & (hi <= info.max)] = width
+    has_nulls = ~valid.all(axis=0) if valid is not None else np.zeros(values.shape[1], dtype=bool)
+    # uma conversão por largura, já em ordem de coluna
+    by_width = {int(w): np.ascontiguousarray(deltas.T.astype(_DTYPE_BY_WIDTH[int(w)])) for w in np.unique(widths)}
+    parts = [_HEAD.pack(_MAGIC, rows, len(CHUNK_COLUMNS))]
+    for j, (width, nulls) in enumerate(zip(widths.tolist(), has_nulls.tolist())):
+        parts.append(_COL_HEAD.pack(1 if nulls else 0, width))
+        if nulls:
+            parts.append(np.packbits(valid[:, j]).tobytes())
+        parts.append(by_width[width][j].tobytes())
+    return zlib.compress(b"".join(parts), level)
+
+
+def decode_chunk(blob: bytes, columns: Sequence[str] = CHUNK_COLUMNS) -> Dict[str, np.ndarray]:
+    """
+    Decode the requested columns of a chunk. Columns without NULLs come back
+    as int64; columns with NULLs as float64 with NaN.
+    """
+    data = zlib.decompress(blob)
+    magic, rows, ncols = _HEAD.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("not a telemetry chunk")
+    wanted = set(columns)
+    out: Dict[str, np.ndarray] = {}
+    offset = _HEAD.size
+    for name in CHUNK_COLUMNS[:ncols]:
+        flags, width = _COL_HEAD.unpack_from(data, offset)
+        offset += _COL_HEAD.size
+        mask_len = (rows + 7) // 8 if flags & 1 else 0
+        mask_at = offset
+        offset += mask_len
+        if name in wanted:
+            deltas = np.frombuffer(data, dtype=_DTYPE_BY_WIDTH[width], count=rows, offset=offset)
+            values = np.cumsum(deltas, dtype=np.int64)
+            if mask_len:
+                valid = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=mask_len, offset=mask_at), count=rows)
+                values = np.where(valid.astype(bool), values, np.nan)
+            out[name] = values
+        offset += rows * width
+    return out
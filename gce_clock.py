@@ -0,0 +1,157 @@
+"""
+Clock alignment for TGW/RSN millisecond counters.
+
+`tgw_local_ts_ms` (TGW) and the RSN `ts_ms` are unsigned 32-bit local
+millisecond counters: they wrap every ~49.7 days and restart on reboot.
+Host receive time includes serial/queueing delay, which is never negative,
+so the delay-free relation between a local clock and host time is the
+lower envelope of (host - local). ClockModel keeps the minimum offset per
+segment (10 min by default) and fits offset + drift through the recent
+segment minima; observations cost O(1), the refit runs once per segment.
+
+A counter that steps back by less than `reorder_ms` is a late copy of an
+older frame (retransmission, reordering), not a reboot: it is aligned with
+the current model but does not update it. Larger backward steps reset it.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+COUNTER_MOD = 1 << 32
+
+
+class ClockModel:
+    """Maps an unsigned 32-bit ms counter to a reference clock (epoch ms)."""
+
+    def __init__(self, segment_ms: int = 600_000, max_segments: int = 36, reorder_ms: int = 600_000):
+        self.segment_ms = int(segment_ms)
+        self.reorder_ms = int(reorder_ms)
+        self._anchors: Deque[Tuple[int, int]] = deque(maxlen=int(max_segments))
+        self.resets = 0
+        self.reordered = 0
+        self._clear()
+
+    def _clear(self):
+        self._anchors.clear()
+        self._wraps = 0
+        self._last_raw: Optional[int] = None
+        self._seg_start: Optional[int] = None
+        self._seg_min: Optional[Tuple[int, int]] = None
+        self._fit: Optional[Tuple[float, float, int]] = None
+
+    @property
+    def locked(self) -> bool:
+        """True once at least one full segment has been observed since the last reset."""
+        return len(self._anchors) > 0
+
+    def unwrap(self, raw: int) -> int:
+        """Extend a raw 32-bit reading to a monotonic 64-bit local time (resets on reboot)."""
+        return self._unwrap(raw)[0]
+
+    def _unwrap(self, raw: int) -> Tuple[int, bool]:
+        """(unwrapped local time, True when raw is a late reading older than the last one)."""
+        raw = int(raw) % COUNTER_MOD
+        if self._last_raw is not None:
+            diff = raw - self._last_raw
+            if diff > COUNTER_MOD // 2 and COUNTER_MOD - diff <= self.reorder_ms:
+                # leitura atrasada de antes da última volta do contador
+                self.reordered += 1
+                return (self._wraps - 1) * COUNTER_MOD + raw, True
+            if diff < -(COUNTER_MOD // 2):
+                self._wraps += 1
+            elif -self.reorder_ms <= diff < 0:
+                # cópia atrasada de um quadro anterior: não é reboot
+                self.reordered += 1
+                return self._wraps * COUNTER_MOD + raw, True
+            elif diff < 0:
+                # contador voltou sem dar a volta: reboot do dispositivo
+                self._clear()
+                self.resets += 1
+        self._last_raw = raw
+        return self._wraps * COUNTER_MOD + raw, False
+
+    def observe(self, raw: int, ref_ms: int) -> int:
+        """Feed one (local counter, reference time) pair; return the aligned time for it."""
+        local, late = self._unwrap(raw)
+        if late:
+            # o atraso de chegada da cópia não diz nada sobre o offset
+            return min(self.to_ref_unwrapped(local), int(ref_ms))
+        offset = int(ref_ms) - local
+        if self._seg_start is None:
+            self._seg_start = local
+        if self._seg_min is None or offset < self._seg_min[1]:
+            self._seg_min = (local, offset)
+        if local - self._seg_start >= self.segment_ms:
+            self._anchors.append(self._seg_min)
+            self._refit()
+            self._seg_start = local
+            self._seg_min = (local, offset)
+        # nunca antes do tempo de chegada: o atraso só pode ser positivo
+        return min(self.to_ref_unwrapped(local), int(ref_ms))
+
+    def to_ref_unwrapped(self, local: int) -> int:
+        """Aligned reference time for an already unwrapped local time."""
+        if self._fit is not None:
+            c0, c1, x0 = self._fit
+            return int(round(local + c0 + c1 * (local - x0)))
+        if self._anchors:
+            best = min(off for _, off in self._anchors)
+        elif self._seg_min is not None:
+            best = self._seg_min[1]
+        else:
+            best = 0
+        if self._seg_min is not None:
+            best = min(best, self._seg_min[1])
+        return local + best
+
+    def _refit(self):
+        """Least-squares line (offset vs local) through the segment minima."""
+        if len(self._anchors) < 2:
+            self._fit = None
+            return
+        n = len(self._anchors)
+        x0 = self._anchors[0][0]
+        xs = [x - x0 for x, _ in self._anchors]
+        ys = [y for _, y in self._anchors]
+        mx = sum(xs) / n
+        my = sum(ys) / n
+        sxx = sum((x - mx) ** 2 for x in xs)
+        if sxx == 0:
+            self._fit = None
+            return
+        slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+        self._fit = (my - slope * mx, slope, x0)
+
+    @property
+    def drift_ppm(self) -> Optional[float]:
+        """Estimated drift of the local clock against the reference, in ppm."""
+        return None if self._fit is None else self._fit[1] * 1e6
+
+
+class ClockAligner:
+    """
+    Per-gateway TGW clock plus per-node RSN clocks.
+
+    The TGW counter is aligned to host epoch ms; each node's ts_ms is then
+    aligned to that gateway time. While a node's clock is not locked (too
+    few observations, or it restarts every wake-up) the event time falls back
+    to the aligned gateway receive time.
+    """
+
+    def __init__(self, gateway: str = "tgw0", segment_ms: int = 600_000):
+        self.gateway = gateway
+        self._segment_ms = segment_ms
+        self.tgw = ClockModel(segment_ms=segment_ms)
+        self._nodes: Dict[int, ClockModel] = {}
+
+    def align(self, node_id: int, tgw_ts_ms: int, rsn_ts_ms: int, host_ms: int) -> int:
+        """Return the aligned event time (epoch ms) for one telemetry frame."""
+        gw_ms = self.tgw.observe(tgw_ts_ms, host_ms)
+        model = self._nodes.get(node_id)
+        if model is None:
+            model = ClockModel(segment_ms=self._segment_ms)
+            self._nodes[node_id] = model
+        node_ms = model.observe(rsn_ts_ms, gw_ms)
+        return node_ms if model.locked else gw_ms
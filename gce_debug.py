@@ -0,0 +1,164 @@
+"""
+Recording of RSN DEBUG sample streams (UP_RSN_DEBUG frames).
+
+Blocks of raw ADC samples are buffered per node, node session and channel
+and written as one debug_chunks row every `chunk_samples` samples (or when
+the buffer gets older than `max_age_s`). A chunk holds two blobs:
+
+  samples: the uint16 LE samples of all its blocks, back to back
+  blocks:  one BLOCK_DTYPE record (seq, t0_ms, count) per block
+
+so sample times are rebuilt as t0_ms + i * period_ms per block, and lost
+blocks show up as seq gaps. A node session maps to a new debug_sessions
+row whenever the node's session id changes or the stream pauses for more
+than `session_gap_s`.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rsn_proto import DEBUG_CHANNELS
+from tgw_proto import UpDebugFrame
+
+BLOCK_DTYPE = np.dtype([("seq", "<u2"), ("t0_ms", "<u4"), ("count", "<u2")])
+SEQ_MOD = 1 << 16
+
+
+@dataclass
+class _ChannelBuffer:
+    session_id: int
+    channel: int
+    period_ms: int
+    chunk_seq: int = 0
+    samples: List[np.ndarray] = field(default_factory=list)
+    blocks: List[Tuple[int, int, int]] = field(default_factory=list)
+    n_samples: int = 0
+    lost: int = 0
+    last_seq: Optional[int] = None
+    opened_at: float = 0.0
+
+
+class DebugStreamRecorder:
+    """Buffers debug blocks and writes them to the store in chunks (call under the store's writer lock)."""
+
+    def __init__(self, store, chunk_samples: int = 4096, max_age_s: float = 5.0, session_gap_s: float = 600.0):
+        self._store = store
+        self.chunk_samples = int(chunk_samples)
+        self.max_age_s = float(max_age_s)
+        self.session_gap_s = float(session_gap_s)
+        # node -> (rsn_session, session_id, last block time)
+        self._sessions: Dict[int, Tuple[int, int, float]] = {}
+        self._buffers: Dict[Tuple[int, int], _ChannelBuffer] = {}
+        self._last_sweep = 0.0
+
+    def add(self, frame: UpDebugFrame, now: Optional[float] = None) -> int:
+        """Buffer one block; returns the number of chunks written."""
+        now = time.monotonic() if now is None else now
+        block = frame.block
+        node_id = frame.node_id
+        written = 0
+        current = self._sessions.get(node_id)
+        if current is None or current[0] != block.session or now - current[2] > self.session_gap_s:
+            written += self._flush_node(node_id)
+            session_id = self._store.open_debug_session(node_id, block.session)
+        else:
+            session_id = current[1]
+        self._sessions[node_id] = (block.session, session_id, now)
+
+        key = (node_id, block.channel)
+        buf = self._buffers.get(key)
+        if buf is not None and (buf.session_id != session_id or buf.period_ms != block.period_ms):
+            written += self._write(buf)
+            chunk_seq = buf.chunk_seq if buf.session_id == session_id else 0
+            buf = _ChannelBuffer(session_id, block.channel, block.period_ms, chunk_seq=chunk_seq)
+            self._buffers[key] = buf
+        elif buf is None:
+            buf = _ChannelBuffer(session_id, block.channel, block.period_ms)
+            self._buffers[key] = buf
+        if not buf.samples:
+            buf.opened_at = now
+        if buf.last_seq is not None:
+            gap = (block.seq - buf.last_seq) % SEQ_MOD
+            if 1 < gap < SEQ_MOD // 2:
+                buf.lost += gap - 1
+        buf.last_seq = block.seq
+        buf.samples.append(block.samples)
+        buf.blocks.append((block.seq, block.t0_ms, block.samples.size))
+        buf.n_samples += block.samples.size
+        if buf.n_samples >= self.chunk_samples:
+            written += self._write(buf)
+
+        if now - self._last_sweep >= 1.0:
+            written += self.flush(stale_only=True, now=now)
+        return written
+
+    def flush(self, stale_only: bool = False, now: Optional[float] = None) -> int:
+        """Write buffered blocks (only those older than max_age_s with stale_only)."""
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        written = 0
+        for buf in self._buffers.values():
+            if buf.samples and (not stale_only or now - buf.opened_at >= self.max_age_s):
+                written += self._write(buf)
+        return written
+
+    def _flush_node(self, node_id: int) -> int:
+        written = 0
+        for (node, _), buf in self._buffers.items():
+            if node == node_id:
+                written += self._write(buf)
+        return written
+
+    def _write(self, buf: _ChannelBuffer) -> int:
+        if not buf.samples:
+            return 0
+        # a única cópia das amostras: concatenação direto para o blob do chunk
+        samples = np.concatenate(buf.samples).astype("<u2", copy=False).tobytes()
+        blocks = np.array(buf.blocks, dtype=BLOCK_DTYPE).tobytes()
+        self._store.add_debug_chunk(
+            buf.session_id,
+            buf.channel,
+            buf.chunk_seq,
+            buf.period_ms,
+            blocks,
+            samples,
+            n_blocks=len(buf.blocks),
+            n_samples=buf.n_samples,
+            lost_blocks=buf.lost,
+        )
+        buf.chunk_seq += 1
+        buf.samples = []
+        buf.blocks = []
+        buf.n_samples = 0
+        buf.lost = 0
+        return 1
+
+
+def decode_chunks(chunks) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    (t_ms, samples, lost_blocks) from load_debug_chunks() rows.
+
+    t_ms is on the node clock (float64, ms); samples are uint16.
+    """
+    if not chunks:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.uint16), 0
+    samples = np.concatenate([np.frombuffer(c[2], dtype="<u2") for c in chunks])
+    per_chunk = [np.frombuffer(c[1], dtype=BLOCK_DTYPE) for c in chunks]
+    blocks = np.concatenate(per_chunk)
+    periods = np.repeat(np.array([c[0] for c in chunks], dtype=np.float64), [b.size for b in per_chunk])
+    counts = blocks["count"].astype(np.int64)
+    starts = np.cumsum(counts) - counts
+    index_in_block = np.arange(samples.size) - np.repeat(starts, counts)
+    t_ms = np.repeat(blocks["t0_ms"].astype(np.float64), counts) + index_in_block * np.repeat(periods, counts)
+    gaps = np.diff(blocks["seq"].astype(np.int64)) % SEQ_MOD
+    lost = int(np.sum(np.where((gaps > 1) & (gaps < SEQ_MOD // 2), gaps - 1, 0)))
+    return t_ms, samples, lost
+
+
+def channel_name(channel: int) -> str:
+    return DEBUG_CHANNELS[channel] if 0 <= channel < len(DEBUG_CHANNELS) else f"ch{channel}"
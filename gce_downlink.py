@@ -0,0 +1,252 @@
+"""
+Wake-window-aware downlink scheduling for sleeping RSN nodes.
+
+RSN nodes sleep for `sleep_time_s` between uplinks and only listen right
+after they transmit. Downlink commands (HANDSHAKE/CONFIG) are therefore
+queued per node and released when that node's next HELLO or TELEMETRY
+arrives. CONFIG commands stay in flight until the matching CONFIG_ACK;
+if the node wakes again without acking, the command is resent, skipping
+an exponentially growing number of wake-ups between attempts, until
+max_attempts is reached.
+
+Writes are paced to the serial link: consecutive downlinks start at least
+`pace_s` apart. A command whose write slot would fall after the node's
+listen window (`listen_window_s` after its uplink) stays queued for the
+next wake-up instead of being written to a node that is asleep again.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+PENDING = "pending"
+WRITING = "writing"
+SENT = "sent"
+ACKED = "acked"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class DownlinkCommand:
+    node_id: int
+    kind: str  # "handshake" | "config"
+    payload: bytes
+    max_attempts: int = 5
+    id: int = field(default_factory=lambda: next(_ids))
+    created_at: float = field(default_factory=time.time)
+    state: str = PENDING
+    attempts: int = 0
+    sent_at: Optional[float] = None
+    skip_wakes: int = 0
+    ack_status: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def config_bytes(self) -> Optional[bytes]:
+        """RsnConfig.to_bytes() carried by a CONFIG command (payload minus the TGW prefix)."""
+        return self.payload[2:] if self.kind == "config" else None
+
+    @property
+    def needs_ack(self) -> bool:
+        return self.kind == "config"
+
+    @property
+    def done(self) -> bool:
+        return self.state in (ACKED, FAILED, CANCELLED)
+
+
+class DownlinkScheduler:
+    """
+    Per-node downlink queues released on node wake-up.
+
+    send(payload) writes one TGW payload to the link: it either returns once
+    written (raising on error) or returns a Future that completes on write.
+    on_change(cmd) is called after every state change of a command,
+    from whichever thread caused it (serial reader, pacing timer or caller).
+    pace_s may be changed at any time (e.g. by a rollout).
+    """
+
+    def __init__(
+        self,
+        send: Callable[[bytes], None],
+        *,
+        max_attempts: int = 5,
+        ack_timeout_s: float = 5.0,
+        on_change: Optional[Callable[[DownlinkCommand], None]] = None,
+        pace_s: float = 0.0,
+        listen_window_s: float = 2.0,
+        log=None,
+    ):
+        self._send = send
+        self.max_attempts = int(max_attempts)
+        self.ack_timeout_s = float(ack_timeout_s)
+        self._on_change = on_change
+        self.pace_s = float(pace_s)
+        self.listen_window_s = float(listen_window_s)
+        self._log = log
+        self._lock = threading.Lock()
+        self._queues: Dict[int, Deque[DownlinkCommand]] = {}
+        # próximo instante (monotonic) livre para escrever no link
+        self._next_write_at = 0.0
+
+    def enqueue(self, node_id: int, kind: str, payload: bytes, max_attempts: Optional[int] = None) -> DownlinkCommand:
+        """Queue a command; it goes out on the node's next uplink."""
+        if kind not in ("handshake", "config"):
+            raise ValueError(f"unknown downlink kind: {kind}")
+        cmd = DownlinkCommand(node_id, kind, payload, max_attempts=max_attempts or self.max_attempts)
+        with self._lock:
+            queue = self._queues.setdefault(node_id, deque())
+            if kind == "config":
+                # uma config nova substitui a que ainda não foi confirmada
+                for old in queue:
+                    if old.kind == "config" and not old.done:
+                        old.state = CANCELLED
+                        self._notify(old)
+            queue.append(cmd)
+            self._prune(queue)
+        self._notify(cmd)
+        if self._log:
+            self._log.info("downlink-queued", node_id=node_id, kind=kind, cmd_id=cmd.id)
+        return cmd
+
+    def on_uplink(self, node_id: int):
+        """Node just transmitted (HELLO/TELEMETRY): it is awake, release its queue."""
+        now = time.time()
+        mono = time.monotonic()
+        to_send: List[Tuple[DownlinkCommand, float]] = []
+        with self._lock:
+            queue = self._queues.get(node_id)
+            if not queue:
+                return
+            for cmd in queue:
+                if cmd.done or cmd.state == WRITING:
+                    continue
+                if cmd.state == SENT:
+                    if cmd.sent_at is not None and now - cmd.sent_at < self.ack_timeout_s:
+                        continue  # same wake window, ack may still come
+                    if cmd.attempts >= cmd.max_attempts:
+                        cmd.state = FAILED
+                        cmd.error = "no-ack"
+                        self._notify(cmd)
+                        continue
+                    if cmd.skip_wakes > 0:
+                        cmd.skip_wakes -= 1
+                        continue
+                slot = max(mono, self._next_write_at)
+                if slot - mono > self.listen_window_s:
+                    continue  # link ocupado até o nó voltar a dormir: fica para o próximo despertar
+                self._next_write_at = slot + self.pace_s
+                cmd.state = WRITING
+                to_send.append((cmd, slot - mono))
+            self._prune(queue)
+        for cmd, delay in to_send:
+            if delay > 0:
+                timer = threading.Timer(delay, self._transmit, args=(cmd,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._transmit(cmd)
+
+    def on_config_ack(self, node_id: int, status: int) -> Optional[DownlinkCommand]:
+        """Match a CONFIG_ACK to the oldest in-flight config of the node."""
+        with self._lock:
+            queue = self._queues.get(node_id) or ()
+            cmd = next((c for c in queue if c.kind == "config" and c.state in (SENT, WRITING)), None)
+            if cmd is None:
+                return None
+            cmd.state = ACKED
+            cmd.ack_status = int(status)
+            self._prune(self._queues[node_id])
+        self._notify(cmd)
+        return cmd
+
+    def cancel(self, node_id: int) -> int:
+        """Drop every open command of a node; returns how many were cancelled."""
+        with self._lock:
+            queue = self._queues.pop(node_id, deque())
+            open_cmds = [c for c in queue if not c.done]
+            for cmd in open_cmds:
+                cmd.state = CANCELLED
+        for cmd in open_cmds:
+            self._notify(cmd)
+        return len(open_cmds)
+
+    def cancel_command(self, cmd: DownlinkCommand) -> bool:
+        """Cancel one command if it is still open; other commands of the node are kept."""
+        with self._lock:
+            if cmd.done:
+                return False
+            cmd.state = CANCELLED
+            queue = self._queues.get(cmd.node_id)
+            if queue:
+                self._prune(queue)
+        self._notify(cmd)
+        return True
+
+    def pending(self, node_id: Optional[int] = None) -> List[DownlinkCommand]:
+        """Open (not yet acked/failed) commands, optionally for one node."""
+        with self._lock:
+            queues = [self._queues.get(node_id, ())] if node_id is not None else list(self._queues.values())
+            return [c for q in queues for c in q if not c.done]
+
+    def _transmit(self, cmd: DownlinkCommand):
+        with self._lock:
+            if cmd.done:
+                return  # cancelado enquanto esperava sua vez no link
+        now = time.time()
+        cmd.attempts += 1
+        try:
+            result = self._send(cmd.payload)
+        except Exception as exc:
+            self._on_written(cmd, now, exc)
+            return
+        if isinstance(result, Future):
+            result.add_done_callback(
+                lambda f: self._on_written(cmd, now, CancelledError() if f.cancelled() else f.exception())
+            )
+        else:
+            self._on_written(cmd, now, None)
+
+    def _on_written(self, cmd: DownlinkCommand, now: float, exc: Optional[BaseException]):
+        with self._lock:
+            if cmd.done:
+                return  # cancelado/substituído enquanto era escrito
+            if exc is not None:
+                cmd.error = str(exc) or type(exc).__name__
+                cmd.state = FAILED if cmd.attempts >= cmd.max_attempts else PENDING
+            else:
+                cmd.error = None
+                cmd.sent_at = now
+                if cmd.needs_ack:
+                    cmd.state = SENT
+                    # backoff exponencial em número de despertares: 0, 1, 3, 7...
+                    cmd.skip_wakes = (1 << (cmd.attempts - 1)) - 1
+                else:
+                    cmd.state = ACKED
+        self._notify(cmd)
+        if self._log:
+            if exc is not None:
+                self._log.warning("downlink-send-failed", node_id=cmd.node_id, kind=cmd.kind, err=cmd.error)
+            else:
+                self._log.info("downlink-sent", node_id=cmd.node_id, kind=cmd.kind, attempt=cmd.attempts)
+
+    @staticmethod
+    def _prune(queue: Deque[DownlinkCommand]):
+        while queue and queue[0].done:
+            queue.popleft()
+
+    def _notify(self, cmd: DownlinkCommand):
+        if self._on_change:
+            try:
+                self._on_change(cmd)
+            except Exception:
+                pass
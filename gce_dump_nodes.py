@@ -1,18 +1,35 @@
 from __future__ import annotations
 
 import argparse
-import sqlite3
+import sys
+import time
 from pathlib import Path
+from typing import List, Optional, Sequence
+
+from gce_rollout import parse_node_list
+from gce_store import connect_readonly
+
+# last_seen/last_rssi vivem em node_latest; nodes só muda com novas versões
+_NODE_COLUMNS = (
+    "n.node_id, n.first_seen, COALESCE(l.last_seen, n.last_seen) AS seen, "
+    "COALESCE(l.last_rssi, n.last_rssi), n.hw_version, n.fw_version, n.capabilities"
+)
+_NODE_FROM = "nodes n LEFT JOIN node_latest l ON l.node_id = n.node_id"
+
+
+def _format_row(r) -> str:
+    node_id, first_seen, last_seen, last_rssi, hw, fw, caps = r
+    return f"node_id={node_id} first_seen={first_seen} last_seen={last_seen} rssi={last_rssi} hw={hw} fw={fw} caps=0x{caps or 0:04X}"
 
 
 def dump_nodes(db_path: Path):
-    conn = sqlite3.connect(db_path)
+    conn = connect_readonly(db_path)
     cur = conn.cursor()
     cur.execute(
-        """
-        SELECT node_id, first_seen, last_seen, last_rssi, hw_version, fw_version, capabilities
-        FROM nodes
-        ORDER BY node_id
+        f"""
+        SELECT {_NODE_COLUMNS}
+        FROM {_NODE_FROM}
+        ORDER BY n.node_id
         """
     )
     rows = cur.fetchall()
@@ -20,15 +37,69 @@ def dump_nodes(db_path: Path):
         print("No nodes found.")
         return
     for r in rows:
-        node_id, first_seen, last_seen, last_rssi, hw, fw, caps = r
-        print(f"node_id={node_id} first_seen={first_seen} last_seen={last_seen} rssi={last_rssi} hw={hw} fw={fw} caps=0x{caps:04X}")
+        print(_format_row(r))
+
+
+def follow_nodes(
+    db_path: Path, node_ids: Optional[Sequence[int]] = None, interval: float = 2.0, max_rate: float = 0.0
+):
+    """
+    Print nodes whenever they are seen again, polling by last_seen high-water mark.
+    max_rate > 0 caps printed rows per second; the excess is summarised.
+    """
+    conn = connect_readonly(db_path)
+    cur = conn.cursor()
+    node_sql = ""
+    node_params: List[object] = []
+    if node_ids:
+        node_sql = f" AND n.node_id IN ({','.join('?' * len(node_ids))})"
+        node_params = [int(n) for n in node_ids]
+    cur.execute(f"SELECT COALESCE(MAX(COALESCE(l.last_seen, n.last_seen)), '') FROM {_NODE_FROM}")
+    mark = cur.fetchone()[0]
+    query = f"SELECT {_NODE_COLUMNS} FROM {_NODE_FROM} WHERE seen > ?{node_sql} ORDER BY seen"
+    budget = max_rate
+    last_refill = time.monotonic()
+    try:
+        while True:
+            cur.execute(query, [mark, *node_params])
+            rows = cur.fetchall()
+            if rows:
+                mark = rows[-1][2]
+                shown = rows
+                if max_rate > 0:
+                    now = time.monotonic()
+                    budget = min(max_rate, budget + (now - last_refill) * max_rate)
+                    last_refill = now
+                    shown = rows[: int(budget)]
+                    budget -= len(shown)
+                for r in shown:
+                    print(_format_row(r))
+                if len(shown) < len(rows):
+                    print(f"... {len(rows) - len(shown)} updates skipped (rate limit)")
+                sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
 
 
 def main():
     ap = argparse.ArgumentParser(description="Dump nodes from GCE SQLite DB")
     ap.add_argument("--db", type=Path, default=Path("gce_data.sqlite3"), help="Path to SQLite DB")
+    ap.add_argument("--follow", action="store_true", help="After the dump, print nodes again each time they are seen")
+    ap.add_argument("--nodes", help="Follow filter: node list/range, e.g. '1,4,10-20'")
+    ap.add_argument("--interval", type=float, default=2.0, help="Follow: poll interval in seconds")
+    ap.add_argument("--max-rate", type=float, default=0.0, help="Follow: max printed rows per second (0 = no limit)")
     args = ap.parse_args()
     dump_nodes(args.db)
+    if args.follow:
+        follow_nodes(
+            args.db,
+            parse_node_list(args.nodes) if args.nodes else None,
+            interval=args.interval,
+            max_rate=args.max_rate,
+        )
 
 
 if __name__ == "__main__":
@@ -1,22 +1,109 @@
+"""
+Dump or export telemetry from the GCE SQLite DB.
+
+Without --format the last --limit rows are printed as text. Export formats
+(csv, jsonl, npz, parquet) stream rows with fetchmany() in chunks of
+--chunk rows, so memory stays constant regardless of the row count:
+
+    python gce_dump_telemetry.py --format csv --since 90d --out season.csv
+    python gce_dump_telemetry.py --format npz --nodes 1-20 --since 2024-09-01 --out sept.npz
+
+npz is written column by column through temporary files; parquet needs
+pyarrow (optional, not in requirements.txt). --follow tails new rows by
+polling past the highest id already printed. --db may be a read-only
+snapshot from gce_backup; --snapshot exports from a temporary one taken
+first, so a long export does not hold a read transaction on the live file.
+"""
+
 from __future__ import annotations
 
 import argparse
-import sqlite3
+import csv
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from contextlib import ExitStack
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import IO, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gce_backup import temporary_snapshot
+from gce_rollout import parse_duration_s, parse_node_list
+from gce_store import connect_readonly
+
+EXPORT_FORMATS = ("csv", "jsonl", "npz", "parquet")
+# (coluna, dtype no npz); fora id/node_id/ts_host, toda coluna pode ser NULL
+# (ex.: linhas do gce_import sem a coluna na origem) e vira float64 com NaN
+EXPORT_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("id", "i8"),
+    ("node_id", "i8"),
+    ("ts_host", "U"),
+    ("event_ts_ms", "f8"),
+    ("tgw_ts_ms", "f8"),
+    ("rsn_ts_ms", "f8"),
+    ("cycle", "f8"),
+    ("rssi", "f8"),
+    ("soil_mean", "f8"),
+    ("soil_median", "f8"),
+    ("soil_min", "f8"),
+    ("soil_max", "f8"),
+    ("soil_std", "f8"),
+    ("vbat_mean", "f8"),
+    ("vbat_median", "f8"),
+    ("vbat_min", "f8"),
+    ("vbat_max", "f8"),
+    ("vbat_std", "f8"),
+    ("ntc_mean", "f8"),
+    ("ntc_median", "f8"),
+    ("ntc_min", "f8"),
+    ("ntc_max", "f8"),
+    ("ntc_std", "f8"),
+    ("batt_status", "f8"),
+    ("flags", "f8"),
+    ("last_rssi", "f8"),
+)
+_WRITE_BUFFER = 1 << 20
+
+
+_TEXT_COLUMNS = """
+    node_id, ts_host, tgw_ts_ms, rssi,
+    soil_mean, soil_median, soil_min, soil_max, soil_std,
+    vbat_mean, vbat_median, vbat_min, vbat_max, vbat_std,
+    ntc_mean, ntc_median, ntc_min, ntc_max, ntc_std,
+    batt_status, flags, last_rssi
+"""
+
+
+def _format_row(r) -> str:
+    # colunas ausentes na origem de uma importação ficam NULL: mostradas como "-"
+    r = ["-" if v is None else v for v in r]
+    (
+        nid, ts_host, tgw_ts_ms, rssi,
+        soil_mean, soil_median, soil_min, soil_max, soil_std,
+        vbat_mean, vbat_median, vbat_min, vbat_max, vbat_std,
+        ntc_mean, ntc_median, ntc_min, ntc_max, ntc_std,
+        batt_status, flags, last_rssi
+    ) = r
+    flags_text = flags if flags == "-" else f"0x{flags:02X}"
+    return (
+        f"node={nid} ts={ts_host} tgw_ts_ms={tgw_ts_ms} rssi={rssi} "
+        f"soil(mean/med/min/max/std)={soil_mean}/{soil_median}/{soil_min}/{soil_max}/{soil_std} "
+        f"vbat(mean/med/min/max/std)={vbat_mean}/{vbat_median}/{vbat_min}/{vbat_max}/{vbat_std} "
+        f"ntc(mean/med/min/max/std)={ntc_mean}/{ntc_median}/{ntc_min}/{ntc_max}/{ntc_std} "
+        f"batt_status={batt_status} flags={flags_text} last_rssi={last_rssi}"
+    )
 
 
 def dump_telemetry(db_path: Path, node_id: Optional[int], limit: int):
-    conn = sqlite3.connect(db_path)
+    conn = connect_readonly(db_path)
     cur = conn.cursor()
-    base_query = """
-        SELECT node_id, ts_host, tgw_ts_ms, rssi,
-               soil_mean, soil_median, soil_min, soil_max, soil_std,
-               vbat_mean, vbat_median, vbat_min, vbat_max, vbat_std,
-               ntc_mean, ntc_median, ntc_min, ntc_max, ntc_std,
-               batt_status, flags, last_rssi
-        FROM telemetry
-    """
+    base_query = f"SELECT {_TEXT_COLUMNS} FROM telemetry"
     params = []
     if node_id is not None:
         base_query += " WHERE node_id = ?"
@@ -30,20 +117,223 @@ def dump_telemetry(db_path: Path, node_id: Optional[int], limit: int):
         print("No telemetry found.")
         return
     for r in rows:
-        (
-            nid, ts_host, tgw_ts_ms, rssi,
-            soil_mean, soil_median, soil_min, soil_max, soil_std,
-            vbat_mean, vbat_median, vbat_min, vbat_max, vbat_std,
-            ntc_mean, ntc_median, ntc_min, ntc_max, ntc_std,
-            batt_status, flags, last_rssi
-        ) = r
-        print(
-            f"node={nid} ts={ts_host} tgw_ts_ms={tgw_ts_ms} rssi={rssi} "
-            f"soil(mean/med/min/max/std)={soil_mean}/{soil_median}/{soil_min}/{soil_max}/{soil_std} "
-            f"vbat(mean/med/min/max/std)={vbat_mean}/{vbat_median}/{vbat_min}/{vbat_max}/{vbat_std} "
-            f"ntc(mean/med/min/max/std)={ntc_mean}/{ntc_median}/{ntc_min}/{ntc_max}/{ntc_std} "
-            f"batt_status={batt_status} flags=0x{flags:02X} last_rssi={last_rssi}"
+        print(_format_row(r))
+
+
+def follow_telemetry(
+    db_path: Path,
+    node_ids: Optional[Sequence[int]] = None,
+    interval: float = 1.0,
+    max_rate: float = 0.0,
+    backlog: int = 0,
+):
+    """
+    Print new telemetry rows as they land, polling by id high-water mark.
+
+    Each poll is one range read past the last id seen (rowid, or the
+    (node_id, id) index with a node filter). max_rate > 0 caps printed rows
+    per second; the excess is summarised instead of printed.
+    """
+    conn = connect_readonly(db_path)
+    cur = conn.cursor()
+    node_sql = ""
+    node_params: List[object] = []
+    if node_ids:
+        node_sql = f" AND node_id IN ({','.join('?' * len(node_ids))})"
+        node_params = [int(n) for n in node_ids]
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM telemetry")
+    last_id = cur.fetchone()[0]
+    if backlog > 0:
+        cur.execute(
+            f"SELECT id, {_TEXT_COLUMNS} FROM telemetry WHERE id <= ?{node_sql} ORDER BY id DESC LIMIT ?",
+            [last_id, *node_params, backlog],
         )
+        for r in reversed(cur.fetchall()):
+            print(_format_row(r[1:]))
+    query = f"SELECT id, {_TEXT_COLUMNS} FROM telemetry WHERE id > ?{node_sql} ORDER BY id LIMIT 10000"
+    budget = max_rate
+    last_refill = time.monotonic()
+    try:
+        while True:
+            cur.execute(query, [last_id, *node_params])
+            rows = cur.fetchall()
+            if rows:
+                last_id = rows[-1][0]
+                if max_rate > 0:
+                    now = time.monotonic()
+                    budget = min(max_rate, budget + (now - last_refill) * max_rate)
+                    last_refill = now
+                    shown = rows[: int(budget)]
+                    budget -= len(shown)
+                else:
+                    shown = rows
+                for r in shown:
+                    print(_format_row(r[1:]))
+                if len(shown) < len(rows):
+                    print(f"... {len(rows) - len(shown)} rows skipped (rate limit)")
+                sys.stdout.flush()
+                if len(rows) == 10000:
+                    continue  # ainda há atraso: lê de novo sem esperar
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+def parse_time_arg(value: str, now: Optional[float] = None) -> str:
+    """ISO date/time (UTC) or a look-back duration ('7d', '12h') -> ts_host-comparable ISO string."""
+    try:
+        ts = (time.time() if now is None else now) - parse_duration_s(value)
+        return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat()
+    except ValueError:
+        return datetime.fromisoformat(value).isoformat()
+
+
+def iter_telemetry_chunks(
+    conn,
+    node_ids: Optional[Sequence[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    chunk: int = 50000,
+) -> Iterator[List[tuple]]:
+    """
+    Yield lists of EXPORT_COLUMNS rows (at most `chunk` each).
+
+    The time range is host receive time (ISO UTC) and is filtered on
+    ts_host itself: ids are not in ts_host order once rows are bulk
+    imported or the host clock steps. Without nodes the scan walks the
+    ts_host index (rows come in receive-time order); with nodes, the
+    (node_id, id) index.
+    """
+    cur = conn.cursor()
+    where: List[str] = []
+    params: List[object] = []
+    if since is not None:
+        where.append("ts_host >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("ts_host < ?")
+        params.append(until)
+    if node_ids:
+        where.append(f"node_id IN ({','.join('?' * len(node_ids))})")
+        params += [int(n) for n in node_ids]
+    query = f"SELECT {', '.join(name for name, _ in EXPORT_COLUMNS)} FROM telemetry"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    if node_ids:
+        query += " ORDER BY node_id, id"
+    else:
+        query += " ORDER BY ts_host, id" if since is not None or until is not None else " ORDER BY id"
+    cur.execute(query, params)
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            return
+        yield rows
+
+
+def _export_csv(chunks, out: IO[str]) -> int:
+    writer = csv.writer(out)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    total = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        total += len(rows)
+    return total
+
+
+def _export_jsonl(chunks, out: IO[str]) -> int:
+    names = [name for name, _ in EXPORT_COLUMNS]
+    total = 0
+    for rows in chunks:
+        out.write("".join(json.dumps(dict(zip(names, r)), separators=(",", ":")) + "\n" for r in rows))
+        total += len(rows)
+    return total
+
+
+def _column_array(values, dtype: str) -> np.ndarray:
+    if dtype == "U":
+        # ts_host ISO -> epoch ms (int64)
+        return np.array(values, dtype="datetime64[us]").astype("datetime64[ms]").astype(np.int64)
+    return np.array(values, dtype=np.float64 if dtype == "f8" else np.int64)
+
+
+def _export_npz(chunks, out_path: Path) -> int:
+    """Column-wise temp files, then one .npy member per column in an uncompressed zip."""
+    total = 0
+    with tempfile.TemporaryDirectory(prefix="gce_npz_") as tmp:
+        files = {name: open(Path(tmp) / name, "wb", buffering=_WRITE_BUFFER) for name, _ in EXPORT_COLUMNS}
+        dtypes = {}
+        try:
+            for rows in chunks:
+                for (name, dtype), values in zip(EXPORT_COLUMNS, zip(*rows)):
+                    arr = _column_array(values, dtype)
+                    dtypes[name] = arr.dtype
+                    arr.tofile(files[name])
+                total += len(rows)
+        finally:
+            for f in files.values():
+                f.close()
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name, dtype in EXPORT_COLUMNS:
+                member = "ts_host_ms" if dtype == "U" else name
+                arr_dtype = dtypes.get(name, np.dtype(np.int64 if dtype in ("U", "i8") else np.float64))
+                header = {"descr": np.lib.format.dtype_to_descr(arr_dtype), "fortran_order": False, "shape": (total,)}
+                with zf.open(member + ".npy", "w", force_zip64=True) as dst, open(Path(tmp) / name, "rb") as src:
+                    np.lib.format.write_array_header_1_0(dst, header)
+                    shutil.copyfileobj(src, dst, _WRITE_BUFFER)
+    return total
+
+
+def _export_parquet(chunks, out_path: Path) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise SystemExit("parquet export needs pyarrow (pip install pyarrow)") from exc
+    # esquema fixo: um chunk só com NULL numa coluna seria inferido como tipo null
+    schema = pa.schema([(name, pa.string() if dtype == "U" else pa.int64()) for name, dtype in EXPORT_COLUMNS])
+    total = 0
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for rows in chunks:
+            arrays = [pa.array(col, type=field.type) for col, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))  # um row group por chunk
+            total += len(rows)
+    return total
+
+
+def export_telemetry(
+    db_path: Path,
+    fmt: str,
+    out: Optional[Path],
+    node_ids: Optional[Sequence[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    chunk: int = 50000,
+) -> int:
+    """Stream matching telemetry to `out` (stdout for csv/jsonl when None); returns the row count."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    conn = connect_readonly(db_path)
+    try:
+        chunks = iter_telemetry_chunks(conn, node_ids, since, until, chunk)
+        if fmt in ("npz", "parquet"):
+            if out is None:
+                raise ValueError(f"--out is required for {fmt}")
+            return _export_npz(chunks, out) if fmt == "npz" else _export_parquet(chunks, out)
+        export = _export_csv if fmt == "csv" else _export_jsonl
+        if out is None:
+            stream = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="", write_through=False)
+            try:
+                return export(chunks, stream)
+            finally:
+                stream.flush()
+                stream.detach()
+        with open(out, "w", encoding="utf-8", newline="", buffering=_WRITE_BUFFER) as f:
+            return export(chunks, f)
+    finally:
+        conn.close()
 
 
 def main():
@@ -51,8 +341,46 @@ def main():
     ap.add_argument("--db", type=Path, default=Path("gce_data.sqlite3"), help="Path to SQLite DB")
     ap.add_argument("--node-id", type=int, help="Filter by node_id")
     ap.add_argument("--limit", type=int, default=20, help="Limit number of rows")
+    ap.add_argument("--format", choices=EXPORT_FORMATS, help="Export every matching row instead of printing the last --limit")
+    ap.add_argument("--out", type=Path, help="Export file (csv/jsonl default to stdout)")
+    ap.add_argument("--nodes", help="Export/follow filter: node list/range, e.g. '1,4,10-20'")
+    ap.add_argument("--since", help="Export filter: ISO UTC time or look-back like '7d'")
+    ap.add_argument("--until", help="Export filter: ISO UTC time or look-back like '1d'")
+    ap.add_argument("--chunk", type=int, default=50000, help="Rows fetched per fetchmany() call")
+    ap.add_argument("--follow", action="store_true", help="Keep printing new rows as they arrive (last --limit first)")
+    ap.add_argument("--interval", type=float, default=1.0, help="Follow: poll interval in seconds")
+    ap.add_argument("--max-rate", type=float, default=0.0, help="Follow: max printed rows per second (0 = no limit)")
+    ap.add_argument("--snapshot", action="store_true", help="Export from a temporary read-only snapshot of --db")
     args = ap.parse_args()
-    dump_telemetry(args.db, args.node_id, args.limit)
+    if args.snapshot and (args.follow or not args.format):
+        ap.error("--snapshot applies to exports (--format) only")
+    node_ids = parse_node_list(args.nodes) if args.nodes else None
+    if args.node_id is not None:
+        node_ids = sorted(set(node_ids or []) | {args.node_id})
+    if args.follow:
+        follow_telemetry(args.db, node_ids, interval=args.interval, max_rate=args.max_rate, backlog=args.limit)
+        return
+    if not args.format:
+        dump_telemetry(args.db, args.node_id, args.limit)
+        return
+    t0 = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            source = stack.enter_context(temporary_snapshot(args.db)) if args.snapshot else args.db
+            total = export_telemetry(
+                source,
+                args.format,
+                args.out,
+                node_ids=node_ids,
+                since=parse_time_arg(args.since) if args.since else None,
+                until=parse_time_arg(args.until) if args.until else None,
+                chunk=args.chunk,
+            )
+    except BrokenPipeError:
+        # saída cortada (ex.: | head): não é erro
+        sys.stderr.close()
+        return
+    print(f"exported {total} rows in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""
+Streaming per-node health/anomaly detector for RSN telemetry.
+
+Runs on the ingest path: every telemetry frame updates EWMA mean/variance
+of soil/vbat/ntc for its node in O(1) and may yield HealthEvent objects.
+State lives in arrays indexed by node_id, so memory is fixed regardless
+of how many frames arrive. Events fire on transitions only (an anomaly is
+reported once when it starts, not on every frame while it lasts).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from gce_series import MAX_NODES, SENSORS
+from rsn_proto import RsnTelemetry
+
+ADC_RAIL_LOW = 5
+ADC_RAIL_HIGH = 4090
+
+# bits do estado ativo por nó: 4 tipos x 3 sensores
+_KINDS = ("outlier", "rail", "stuck", "noisy")
+
+
+def _bit(kind: str, sensor_idx: int) -> int:
+    return 1 << (_KINDS.index(kind) * len(SENSORS) + sensor_idx)
+
+
+@dataclass
+class HealthEvent:
+    node_id: int
+    kind: str
+    sensor: Optional[str]
+    value: float
+    expected: float
+    score: float
+
+    def describe(self) -> str:
+        where = f" {self.sensor}" if self.sensor else ""
+        return f"{self.kind}{where} value={self.value:.1f} expected={self.expected:.1f} score={self.score:.2f}"
+
+
+class HealthDetector:
+    """
+    Online detector with one row of state per node_id.
+
+    - outlier: |mean - ewma| beyond z_threshold EWMA std (plus the frame's own
+      reported std), after `warmup` frames; catches drift steps and battery sag
+    - rail: mean stuck at the ADC rails (open/shorted probe, dead NTC)
+    - stuck: std_raw == 0 and min == max for `stuck_frames` frames in a row
+    - noisy: frame std_raw above noise_factor x its EWMA
+    - batt-status / flags: batt_status drops or new flag bits appear
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.05,
+        z_threshold: float = 4.0,
+        warmup: int = 10,
+        stuck_frames: int = 6,
+        noise_factor: float = 5.0,
+    ):
+        self.alpha = float(alpha)
+        self.z_threshold = float(z_threshold)
+        self.warmup = int(warmup)
+        self.stuck_frames = int(stuck_frames)
+        self.noise_factor = float(noise_factor)
+        n_sensors = len(SENSORS)
+        self._mean = np.zeros((MAX_NODES, n_sensors), dtype=np.float64)
+        self._var = np.zeros((MAX_NODES, n_sensors), dtype=np.float64)
+        self._std_ewma = np.zeros((MAX_NODES, n_sensors), dtype=np.float64)
+        self._stuck = np.zeros((MAX_NODES, n_sensors), dtype=np.int32)
+        self._count = np.zeros(MAX_NODES, dtype=np.int64)
+        self._active = np.zeros(MAX_NODES, dtype=np.int64)
+        self._flags = np.zeros(MAX_NODES, dtype=np.int32)
+        self._batt = np.full(MAX_NODES, -1, dtype=np.int32)
+
+    def reset(self, node_id: Optional[int] = None):
+        """Forget state for one node (e.g. after a probe swap) or all nodes."""
+        rows = slice(None) if node_id is None else node_id
+        for arr in (self._mean, self._var, self._std_ewma, self._stuck, self._count, self._active, self._flags):
+            arr[rows] = 0
+        self._batt[rows] = -1
+
+    def update(self, node_id: int, telemetry: RsnTelemetry) -> List[HealthEvent]:
+        """Fold one telemetry frame into the node's state; return new events."""
+        events: List[HealthEvent] = []
+        t = telemetry
+        means = (t.soil_mean_raw, t.vbat_mean_raw, t.ntc_mean_raw)
+        stds = (t.soil_std_raw, t.vbat_std_raw, t.ntc_std_raw)
+        mins = (t.soil_min_raw, t.vbat_min_raw, t.ntc_min_raw)
+        maxs = (t.soil_max_raw, t.vbat_max_raw, t.ntc_max_raw)
+        n = int(self._count[node_id])
+        active = int(self._active[node_id])
+        mean_row = self._mean[node_id]
+        var_row = self._var[node_id]
+        std_row = self._std_ewma[node_id]
+        stuck_row = self._stuck[node_id]
+
+        for i, sensor in enumerate(SENSORS):
+            x = float(means[i])
+            s = float(stds[i])
+            if n == 0:
+                mean_row[i] = x
+                var_row[i] = 0.0
+                std_row[i] = s
+            ewma = float(mean_row[i])
+            sigma = float(np.sqrt(var_row[i] + s * s)) or 1.0
+            z = abs(x - ewma) / sigma
+            active = self._transition(
+                events, active, node_id, "outlier", i, n >= self.warmup and z > self.z_threshold, x, ewma, z
+            )
+            rail = x <= ADC_RAIL_LOW or x >= ADC_RAIL_HIGH
+            active = self._transition(events, active, node_id, "rail", i, rail, x, ewma, 0.0)
+            if s == 0 and mins[i] == maxs[i]:
+                stuck_row[i] += 1
+            else:
+                stuck_row[i] = 0
+            active = self._transition(
+                events, active, node_id, "stuck", i, stuck_row[i] >= self.stuck_frames, x, ewma, float(stuck_row[i])
+            )
+            noisy = n >= self.warmup and s > self.noise_factor * max(float(std_row[i]), 1.0)
+            active = self._transition(
+                events, active, node_id, "noisy", i, noisy, s, float(std_row[i]), s / max(float(std_row[i]), 1.0)
+            )
+            # EWMA de média e variância (West, 1979)
+            diff = x - ewma
+            incr = self.alpha * diff
+            mean_row[i] = ewma + incr
+            var_row[i] = (1.0 - self.alpha) * (var_row[i] + diff * incr)
+            std_row[i] += self.alpha * (s - std_row[i])
+
+        prev_batt = int(self._batt[node_id])
+        if 0 <= t.batt_status < prev_batt:
+            events.append(HealthEvent(node_id, "batt-status", "vbat", float(t.batt_status), float(prev_batt), 0.0))
+        self._batt[node_id] = t.batt_status
+        new_flags = int(t.flags) & ~int(self._flags[node_id])
+        if n > 0 and new_flags:
+            events.append(HealthEvent(node_id, "flags", None, float(t.flags), float(self._flags[node_id]), float(new_flags)))
+        self._flags[node_id] = t.flags
+
+        self._active[node_id] = active
+        self._count[node_id] = n + 1
+        return events
+
+    @staticmethod
+    def _transition(
+        events: List[HealthEvent],
+        active: int,
+        node_id: int,
+        kind: str,
+        sensor_idx: int,
+        condition: bool,
+        value: float,
+        expected: float,
+        score: float,
+    ) -> int:
+        bit = _bit(kind, sensor_idx)
+        if condition and not active & bit:
+            events.append(HealthEvent(node_id, kind, SENSORS[sensor_idx], value, expected, score))
+            return active | bit
+        if not condition and active & bit:
+            return active & ~bit
+        return active
@@ -0,0 +1,167 @@
+"""
+Bulk import of telemetry into a GCE SQLite DB.
+
+Sources are files written by gce_dump_telemetry (csv, jsonl) or another
+GCE database; the format is taken from the extension unless --format is
+given:
+
+    python gce_import.py --db gce_data.sqlite3 season.csv site_b.sqlite3
+    python gce_import.py --db gce_data.sqlite3 --nodes 1-20 --since 30d site_b.sqlite3
+
+Rows go through GceStore.bulk_import (large transactions, relaxed
+durability, deferred indexes); frames already in the DB are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence
+
+from gce_dump_telemetry import iter_telemetry_chunks, parse_time_arg
+from gce_rollout import parse_node_list
+from gce_store import IMPORT_COLUMNS, GceStore, connect_readonly
+
+IMPORT_FORMATS = ("csv", "jsonl", "sqlite")
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".sqlite3": "sqlite",
+    ".sqlite": "sqlite",
+    ".db": "sqlite",
+}
+
+
+def detect_format(path: Path) -> str:
+    fmt = _EXTENSIONS.get(path.suffix.lower())
+    if fmt is None:
+        raise ValueError(f"unknown import format for {path} (use --format)")
+    return fmt
+
+
+def _to_int(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))
+
+
+def _import_row(record: Dict[str, object]) -> tuple:
+    """Map one exported record (column name -> value) to IMPORT_COLUMNS order."""
+    row = [(record.get(name) or None) if name == "ts_host" else _to_int(record.get(name)) for name in IMPORT_COLUMNS]
+    return _fill_ts_host(row)
+
+
+def _fill_ts_host(row: list) -> tuple:
+    if row[1] is None and row[2] is not None:
+        # sem ts_host: usa o horário do evento (UTC, sem tzinfo, como o store grava)
+        row[1] = datetime.fromtimestamp(row[2] / 1000, tz=timezone.utc).replace(tzinfo=None).isoformat()
+    return tuple(row)
+
+
+def iter_csv(path: Path) -> Iterator[tuple]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            yield _import_row(record)
+
+
+def iter_jsonl(path: Path) -> Iterator[tuple]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield _import_row(json.loads(line))
+
+
+def iter_sqlite(
+    path: Path,
+    node_ids: Optional[Sequence[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    chunk: int = 50000,
+) -> Iterator[tuple]:
+    """Rows of another GCE DB's telemetry table (export columns without the id)."""
+    conn = connect_readonly(path)
+    try:
+        for rows in iter_telemetry_chunks(conn, node_ids=node_ids, since=since, until=until, chunk=chunk):
+            for r in rows:
+                yield r[1:]
+    finally:
+        conn.close()
+
+
+def _filtered(rows: Iterator[tuple], node_ids, since, until) -> Iterator[tuple]:
+    wanted = set(node_ids) if node_ids else None
+    for row in rows:
+        if wanted is not None and row[0] not in wanted:
+            continue
+        if since is not None and (row[1] is None or row[1] < since):
+            continue
+        if until is not None and (row[1] is None or row[1] >= until):
+            continue
+        yield row
+
+
+def iter_source(path: Path, fmt: Optional[str] = None, node_ids=None, since=None, until=None) -> Iterator[tuple]:
+    """IMPORT_COLUMNS rows of one source file, filtered by node and host time."""
+    fmt = fmt or detect_format(path)
+    if fmt == "sqlite":
+        return iter_sqlite(path, node_ids=node_ids, since=since, until=until)
+    rows = iter_csv(path) if fmt == "csv" else iter_jsonl(path)
+    return _filtered(rows, node_ids, since, until)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk import telemetry into a GCE SQLite DB")
+    ap.add_argument("sources", nargs="+", type=Path, help="CSV/JSONL exports or GCE SQLite DBs")
+    ap.add_argument("--db", type=Path, default=Path("gce_data.sqlite3"), help="Target SQLite DB")
+    ap.add_argument("--format", choices=IMPORT_FORMATS, help="Source format (default: from extension)")
+    ap.add_argument("--nodes", help="Node list/range filter, e.g. '1,4,10-20'")
+    ap.add_argument("--since", help="ISO UTC time or look-back like '90d'")
+    ap.add_argument("--until", help="ISO UTC time or look-back like '1d'")
+    ap.add_argument("--batch", type=int, default=100000, help="Rows per transaction")
+    ap.add_argument("--keep-indexes", action="store_true", help="Maintain secondary indexes during the import")
+    args = ap.parse_args()
+
+    try:
+        fmts = [args.format or detect_format(p) for p in args.sources]
+    except ValueError as exc:
+        ap.error(str(exc))
+    missing = [str(p) for p in args.sources if not p.exists()]
+    if missing:
+        ap.error(f"source not found: {missing[0]}")
+    node_ids = parse_node_list(args.nodes) if args.nodes else None
+    since = parse_time_arg(args.since) if args.since else None
+    until = parse_time_arg(args.until) if args.until else None
+
+    t0 = time.perf_counter()
+
+    def report(read: int, inserted: int):
+        rate = read / max(time.perf_counter() - t0, 1e-6)
+        print(f"\r{read} read, {inserted} new, {read - inserted} duplicate ({rate:.0f} rows/s)", end="", file=sys.stderr)
+
+    store = GceStore(args.db)
+    try:
+        rows = (row for path, fmt in zip(args.sources, fmts) for row in iter_source(path, fmt, node_ids, since, until))
+        read, inserted = store.bulk_import(
+            rows, batch_size=args.batch, defer_indexes=not args.keep_indexes, progress=report
+        )
+    finally:
+        store.close()
+    print(file=sys.stderr)
+    print(
+        f"{read} rows read, {inserted} imported, {read - inserted} duplicates skipped "
+        f"in {time.perf_counter() - t0:.1f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
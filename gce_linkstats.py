@@ -0,0 +1,120 @@
+"""
+Incremental packet-loss and link-quality tracking per RSN node.
+
+Each telemetry frame carries the node's 32-bit `cycle` counter. The gap
+to the previous cycle seen from the same node gives the number of missed
+uplinks without any table scan. Wrap of the counter is handled with
+modular arithmetic. A small step back (late retransmit, a second
+gateway's copy) is counted as a duplicate and leaves the sequence alone;
+a reset toward 0 or a jump too large to be loss is counted as a node
+reboot and starts a new sequence.
+"""
+
+from __future__ import annotations
+
+import bisect
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from gce_series import MAX_NODES
+
+CYCLE_MOD = 1 << 32
+# gaps acima disso são tratados como reboot/reset do contador, não perda
+MAX_CYCLE_GAP = 1000
+# limites (dBm) dos bins do histograma de RSSI: <=-110, (-110,-100], ..., >-40
+RSSI_BIN_EDGES = (-110, -100, -90, -80, -70, -60, -50, -40)
+
+NodeStatsRow = Tuple[int, int, int, int, int, Optional[int], int, Optional[int], Optional[int], str]
+
+
+class LinkStatsTracker:
+    """
+    Running link statistics for every node_id, kept in flat arrays.
+
+    update() is O(1) per frame and returns the node's row ready to be
+    upserted into node_stats: (node_id, received, lost, duplicates,
+    reboots, last_cycle, rssi_sum, rssi_min, rssi_max, rssi_hist).
+    """
+
+    def __init__(self, max_gap: int = MAX_CYCLE_GAP):
+        self.max_gap = int(max_gap)
+        self._received = np.zeros(MAX_NODES, dtype=np.int64)
+        self._lost = np.zeros(MAX_NODES, dtype=np.int64)
+        self._dups = np.zeros(MAX_NODES, dtype=np.int64)
+        self._reboots = np.zeros(MAX_NODES, dtype=np.int64)
+        self._last_cycle = np.full(MAX_NODES, -1, dtype=np.int64)
+        self._rssi_sum = np.zeros(MAX_NODES, dtype=np.int64)
+        self._rssi_min = np.full(MAX_NODES, 127, dtype=np.int64)
+        self._rssi_max = np.full(MAX_NODES, -128, dtype=np.int64)
+        self._hist = np.zeros((MAX_NODES, len(RSSI_BIN_EDGES) + 1), dtype=np.int64)
+
+    def seed(self, rows: Iterable[NodeStatsRow]):
+        """Restore state from persisted node_stats rows."""
+        for node_id, received, lost, dups, reboots, last_cycle, rssi_sum, rssi_min, rssi_max, hist in rows:
+            self._received[node_id] = received or 0
+            self._lost[node_id] = lost or 0
+            self._dups[node_id] = dups or 0
+            self._reboots[node_id] = reboots or 0
+            self._last_cycle[node_id] = -1 if last_cycle is None else last_cycle
+            self._rssi_sum[node_id] = rssi_sum or 0
+            self._rssi_min[node_id] = 127 if rssi_min is None else rssi_min
+            self._rssi_max[node_id] = -128 if rssi_max is None else rssi_max
+            counts = [int(v) for v in hist.split(",")] if hist else []
+            if len(counts) == self._hist.shape[1]:
+                self._hist[node_id] = counts
+
+    def update(self, node_id: int, cycle: int, rssi: int) -> NodeStatsRow:
+        last = int(self._last_cycle[node_id])
+        cycle = int(cycle) % CYCLE_MOD
+        if last >= 0:
+            gap = (cycle - last) % CYCLE_MOD
+            if gap == 0:
+                self._dups[node_id] += 1
+                return self.row(node_id)
+            if gap <= self.max_gap:
+                self._lost[node_id] += gap - 1
+            else:
+                back = CYCLE_MOD - gap
+                # pouco atrás e longe de 0: cópia atrasada, não reboot
+                if back <= self.max_gap and cycle >= back:
+                    self._dups[node_id] += 1
+                    return self.row(node_id)
+                self._reboots[node_id] += 1
+        self._last_cycle[node_id] = cycle
+        self._received[node_id] += 1
+        rssi = int(rssi)
+        self._rssi_sum[node_id] += rssi
+        if rssi < self._rssi_min[node_id]:
+            self._rssi_min[node_id] = rssi
+        if rssi > self._rssi_max[node_id]:
+            self._rssi_max[node_id] = rssi
+        self._hist[node_id, bisect.bisect_left(RSSI_BIN_EDGES, rssi)] += 1
+        return self.row(node_id)
+
+    def row(self, node_id: int) -> NodeStatsRow:
+        received = int(self._received[node_id])
+        last = int(self._last_cycle[node_id])
+        return (
+            node_id,
+            received,
+            int(self._lost[node_id]),
+            int(self._dups[node_id]),
+            int(self._reboots[node_id]),
+            None if last < 0 else last,
+            int(self._rssi_sum[node_id]),
+            int(self._rssi_min[node_id]) if received else None,
+            int(self._rssi_max[node_id]) if received else None,
+            ",".join(str(int(v)) for v in self._hist[node_id]),
+        )
+
+    def loss_pct(self) -> np.ndarray:
+        """Loss percentage for every node_id (NaN for nodes never seen)."""
+        total = self._received + self._lost
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pct = 100.0 * self._lost / total
+        pct[total == 0] = np.nan
+        return pct
+
+    def nodes(self) -> List[int]:
+        return np.flatnonzero(self._received).tolist()
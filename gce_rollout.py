@@ -0,0 +1,252 @@
+"""
+Fleet-wide config rollout on top of the downlink scheduler.
+
+A rollout applies one config profile (RsnConfig dict without node_id) to a
+set of nodes chosen by list/range ("1,4,10-20", "all") and/or a query over
+the node table ("fw<3 seen<2h"). Nodes are handed to the DownlinkScheduler
+never more than `max_in_flight` unacked at a time; each command then goes
+out on its node's next wake-up, paced by the scheduler's link pacing, and
+is resolved by the node's CONFIG_ACK. Drive it with tick() from a timer/loop.
+Nodes whose acknowledged config already matches are skipped (stage_rollout).
+"""
+
+from __future__ import annotations
+
+import operator
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from gce_downlink import ACKED, CANCELLED, FAILED, DownlinkCommand, DownlinkScheduler
+from rsn_proto import CONFIG_ACK_OK, RsnConfig
+
+WAITING = "waiting"
+REJECTED = "rejected"
+
+_QUERY_FIELDS = {
+    "node": "node_id",
+    "hw": "hw_version",
+    "fw": "fw_version",
+    "rssi": "last_rssi",
+    "loss": "loss_pct",
+    "reboots": "reboots",
+    "seen": "last_seen",
+}
+_OPS = {
+    "<=": operator.le,
+    ">=": operator.ge,
+    "!=": operator.ne,
+    "=": operator.eq,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+_TERM_RE = re.compile(r"^(\w+)\s*(<=|>=|!=|=|<|>)\s*(\S+)$")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_node_list(spec: str) -> List[int]:
+    """'1,4,10-20' -> sorted node ids (1..255)."""
+    ids = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = (int(v) for v in part.split("-", 1))
+            if lo > hi:
+                raise ValueError(f"invalid node range: {part}")
+            ids.update(range(lo, hi + 1))
+        else:
+            ids.add(int(part))
+    bad = [n for n in ids if n < 1 or n > 255]
+    if bad:
+        raise ValueError(f"node id out of range: {bad[0]}")
+    return sorted(ids)
+
+
+def parse_duration_s(text: str) -> float:
+    """'90', '30s', '15m', '2h', '7d' -> seconds."""
+    text = text.strip().lower()
+    if text and text[-1] in _DURATION_UNITS:
+        return float(text[:-1]) * _DURATION_UNITS[text[-1]]
+    return float(text)
+
+
+def _node_age_s(last_seen, now: float) -> Optional[float]:
+    if not last_seen:
+        return None
+    try:
+        # last_seen é gravado em UTC sem tzinfo
+        return now - datetime.fromisoformat(str(last_seen)).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def select_nodes(nodes: Iterable[Dict[str, object]], query: str, now: Optional[float] = None) -> List[int]:
+    """
+    Filter list_nodes() rows with space-separated terms, all of which must hold.
+
+    Keys: node, hw, fw, rssi, loss, reboots, seen (age, e.g. seen<2h).
+    Operators: = != < <= > >=. Nodes missing a value never match its term.
+    """
+    now = time.time() if now is None else now
+    terms = []
+    for token in query.split():
+        m = _TERM_RE.match(token)
+        if not m or m.group(1) not in _QUERY_FIELDS:
+            raise ValueError(f"invalid node query term: {token}")
+        key, op, raw = m.groups()
+        value = parse_duration_s(raw) if key == "seen" else float(raw)
+        terms.append((key, _OPS[op], value))
+    selected = []
+    for node in nodes:
+        for key, op, value in terms:
+            field = node.get(_QUERY_FIELDS[key])
+            actual = _node_age_s(field, now) if key == "seen" else field
+            if actual is None or not op(float(actual), value):
+                break
+        else:
+            selected.append(int(node["node_id"]))
+    return sorted(selected)
+
+
+def resolve_targets(
+    nodes: Sequence[Dict[str, object]], node_spec: Optional[str] = None, query: Optional[str] = None
+) -> List[int]:
+    """Combine a list/range spec ('all' = every known node) with an optional query filter."""
+    known = [int(n["node_id"]) for n in nodes]
+    if node_spec and node_spec.strip().lower() != "all":
+        targets = parse_node_list(node_spec)
+    elif node_spec or query:
+        targets = known
+    else:
+        raise ValueError("no nodes selected")
+    if query:
+        matching = set(select_nodes(nodes, query))
+        targets = [n for n in targets if n in matching]
+    return targets
+
+
+def stage_rollout(
+    store, node_ids: Iterable[int], profile: Dict[str, int], *, force: bool = False
+) -> Tuple[Dict[int, RsnConfig], List[int], List[int]]:
+    """
+    Build each node's RsnConfig from the profile and record it as desired state.
+
+    Returns (configs, to_send, unchanged): nodes whose acknowledged config
+    already matches are left out unless force is set or the profile carries
+    reset_flags (a one-shot action, not state).
+    """
+    configs = {int(n): RsnConfig.from_dict(node_id=int(n), cfg=profile) for n in node_ids}
+    store.set_desired_configs({n: cfg.to_bytes() for n, cfg in configs.items()})
+    if force or profile.get("reset_flags"):
+        return configs, list(configs), []
+    differs = set(store.nodes_needing_config({n: cfg.to_bytes() for n, cfg in configs.items()}))
+    to_send = [n for n in configs if n in differs]
+    unchanged = [n for n in configs if n not in differs]
+    return configs, to_send, unchanged
+
+
+@dataclass
+class RolloutProgress:
+    total: int
+    waiting: int
+    in_flight: int
+    acked: int
+    rejected: int
+    failed: int
+    unchanged: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.waiting == 0 and self.in_flight == 0
+
+    def describe(self) -> str:
+        return (
+            f"{self.acked + self.rejected + self.failed}/{self.total} ok={self.acked} "
+            f"rejected={self.rejected} failed={self.failed} in_flight={self.in_flight} unchanged={self.unchanged}"
+        )
+
+
+class ConfigRollout:
+    """
+    Windowed rollout of one payload per node through a DownlinkScheduler.
+
+    build_payload(node_id) returns the CONFIG payload for that node. Progress is
+    read from the scheduler's command objects, which are updated on CONFIG_ACK.
+    """
+
+    def __init__(
+        self,
+        scheduler: DownlinkScheduler,
+        node_ids: Iterable[int],
+        build_payload: Callable[[int], bytes],
+        *,
+        max_in_flight: int = 16,
+        handshake_payload: Optional[Callable[[int], bytes]] = None,
+        unchanged: Iterable[int] = (),
+    ):
+        self._scheduler = scheduler
+        self._build_payload = build_payload
+        self._handshake_payload = handshake_payload
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.node_ids = list(dict.fromkeys(int(n) for n in node_ids))
+        self.unchanged = list(unchanged)
+        self._waiting: Deque[int] = deque(self.node_ids)
+        self._commands: Dict[int, DownlinkCommand] = {}
+        self._handshakes: Dict[int, DownlinkCommand] = {}
+        self.started_at = time.time()
+
+    def tick(self) -> RolloutProgress:
+        """Release more nodes if the in-flight window allows; return progress."""
+        in_flight = sum(1 for cmd in self._commands.values() if not cmd.done)
+        while self._waiting and in_flight < self.max_in_flight:
+            node_id = self._waiting.popleft()
+            if self._handshake_payload is not None:
+                self._handshakes[node_id] = self._scheduler.enqueue(node_id, "handshake", self._handshake_payload(node_id))
+            self._commands[node_id] = self._scheduler.enqueue(node_id, "config", self._build_payload(node_id))
+            in_flight += 1
+        return self.progress()
+
+    def cancel(self):
+        """Stop releasing nodes and drop this rollout's commands that are still open."""
+        self._waiting.clear()
+        # só os comandos deste rollout: outros comandos do nó continuam na fila
+        for cmd in [*self._handshakes.values(), *self._commands.values()]:
+            self._scheduler.cancel_command(cmd)
+
+    def state_of(self, node_id: int) -> str:
+        cmd = self._commands.get(node_id)
+        if cmd is None:
+            return WAITING if node_id in self._waiting else CANCELLED
+        if cmd.state == ACKED and cmd.ack_status != CONFIG_ACK_OK:
+            return REJECTED
+        return cmd.state
+
+    def progress(self) -> RolloutProgress:
+        counts: Dict[str, int] = {}
+        for node_id in self.node_ids:
+            state = self.state_of(node_id)
+            counts[state] = counts.get(state, 0) + 1
+        in_flight = sum(n for state, n in counts.items() if state not in (WAITING, ACKED, REJECTED, FAILED, CANCELLED))
+        return RolloutProgress(
+            total=len(self.node_ids),
+            waiting=counts.get(WAITING, 0),
+            in_flight=in_flight,
+            acked=counts.get(ACKED, 0),
+            rejected=counts.get(REJECTED, 0),
+            failed=counts.get(FAILED, 0) + counts.get(CANCELLED, 0),
+            unchanged=len(self.unchanged),
+        )
+
+    def results(self) -> List[Tuple[int, str, int, Optional[int]]]:
+        """(node_id, state, attempts, ack_status) for every target."""
+        out = []
+        for node_id in self.node_ids:
+            cmd = self._commands.get(node_id)
+            out.append(
+                (node_id, self.state_of(node_id), cmd.attempts if cmd else 0, cmd.ack_status if cmd else None)
+            )
+        return out
@@ -1,14 +1,30 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
 from PySide6 import QtWidgets
 import pyqtgraph as pg
 
 import gce_calib
+from gce_calib_utils import (
+    ADC_MAX_12BIT,
+    CalibrationCache,
+    NtcModel,
+    apply_linear,
+    ntc_raw_to_temp_array,
+    vbat_raw_to_mv_array,
+)
 from gce_model import TelemetryRecord
+from gce_series import (
+    STAT_INDEX,
+    TelemetryRing,
+    bucket_edges_x,
+    bucket_starts,
+    envelope_decimate,
+    peak_decimate,
+)
 
 CALIB_LIMITS = {
     "soil": (0.0, 100.0),
@@ -16,6 +32,14 @@ CALIB_LIMITS = {
     "ntc": (0.0, 50.0),
 }
 
+WINDOW_DELTAS = {
+    "10m": timedelta(minutes=10),
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+}
+
 
 class SensorDetailChart(QtWidgets.QWidget):
     def __init__(self, parent=None):
@@ -25,13 +49,15 @@ class SensorDetailChart(QtWidgets.QWidget):
         self.plot.addLegend()
         self.curve_mean = self.plot.plot([], [], pen=pg.mkPen(color="c", width=2), name="mean")
         self.curve_med = self.plot.plot([], [], pen=pg.mkPen(color="m", width=1, style=pg.QtCore.Qt.DashLine), name="median")
-        self.curve_std_top = self.plot.plot([], [], pen=pg.mkPen(color="y", width=1, style=pg.QtCore.Qt.DotLine), name="+std")
-        self.curve_std_bot = self.plot.plot([], [], pen=pg.mkPen(color="y", width=1, style=pg.QtCore.Qt.DotLine), name="-std")
-        self.fill_minmax = pg.FillBetweenItem(self.curve_std_bot, self.curve_std_top, brush=(255, 255, 0, 50))
+        self.curve_max = self.plot.plot([], [], pen=pg.mkPen(color="y", width=1, style=pg.QtCore.Qt.DotLine), name="max")
+        self.curve_min = self.plot.plot([], [], pen=pg.mkPen(color="y", width=1, style=pg.QtCore.Qt.DotLine), name="min")
+        self.fill_minmax = pg.FillBetweenItem(self.curve_min, self.curve_max, brush=(255, 255, 0, 50))
         self.plot.addItem(self.fill_minmax)
         self.info_text = pg.TextItem("", anchor=(0, 1))
         self.plot.addItem(self.info_text)
         self.plot.scene().sigMouseMoved.connect(self._on_mouse_move)
+        # redecima ao dar zoom/pan
+        self.plot.plotItem.vb.sigXRangeChanged.connect(self._render_lod)
 
         # buffers para tooltip
         self._x_rel = np.array([], dtype=float)
@@ -40,6 +66,18 @@ class SensorDetailChart(QtWidgets.QWidget):
         self._std_arr = np.array([], dtype=float)
         self._min_arr = np.array([], dtype=float)
         self._max_arr = np.array([], dtype=float)
+        # envelope desenhado: min/max do registro, ou média±std quando faltam
+        self._top_arr = np.array([], dtype=float)
+        self._bot_arr = np.array([], dtype=float)
+        # acima de ~2 pontos por pixel as curvas são decimadas por min/max
+        self.lod_points_per_px = 2
+        # conversão física para nós sem coeficientes lineares (vbat em V, ntc em °C)
+        self.vbat_divider: Optional[Tuple[float, float]] = None  # (vref em V, razão do divisor)
+        self.ntc_model: Optional[NtcModel] = None
+
+        # ring buffers por nó, alimentados só com registros novos
+        self._rings: Dict[int, TelemetryRing] = {}
+        self.ring_capacity = 16384
 
         self.node_combo = QtWidgets.QComboBox()
         self.sensor_combo = QtWidgets.QComboBox()
@@ -79,14 +117,77 @@ class SensorDetailChart(QtWidgets.QWidget):
         finally:
             self.node_combo.blockSignals(False)
 
+    def append_records(self, node_id: int, records: List[TelemetryRecord]) -> int:
+        """Stream new records (oldest first) into the node's ring buffer."""
+        return self._ring_for(node_id).extend_records(records)
+
+    def _ring_for(self, node_id: int) -> TelemetryRing:
+        ring = self._rings.get(node_id)
+        if ring is None:
+            ring = TelemetryRing(self.ring_capacity)
+            self._rings[node_id] = ring
+        return ring
+
+    def _sync_ring(self, node_id: int, records: List[TelemetryRecord]) -> TelemetryRing:
+        """Append only the tail of records newer than what the ring already holds."""
+        ring = self._ring_for(node_id)
+        last = ring.last_ts
+        if last is None:
+            ring.extend_records(records)
+            return ring
+        start = len(records)
+        while start > 0 and records[start - 1].ts.timestamp() > last:
+            start -= 1
+        if start < len(records):
+            ring.extend_records(records[start:])
+        return ring
+
+    def _calibration(self, calib_data, node_id: int, metric: str) -> Optional[Tuple[float, float]]:
+        if isinstance(calib_data, CalibrationCache):
+            sensor = metric.split("_", 1)[0]
+            return calib_data.get(node_id, sensor) if calib_data.has(node_id, sensor) else None
+        try:
+            slope, offset = gce_calib.get_coeff(calib_data, node_id, metric)
+            return float(slope), float(offset)
+        except Exception:
+            return None
+
+    def _convert(self, calib_data, node_id: int, sensor: str, mean_arr, med_arr, min_arr, max_arr, std_arr):
+        """
+        Calibrate whole arrays: the node's linear coefficients when it has any,
+        else the vbat divider / NTC LUT when configured, else raw values.
+        """
+        coeff = self._calibration(calib_data, node_id, f"{sensor}_mean")
+        if coeff is not None:
+            slope, offset = coeff
+            conv = [apply_linear(arr, slope, offset) for arr in (mean_arr, med_arr, min_arr, max_arr)]
+            std_arr = std_arr * abs(slope)
+        elif sensor == "vbat" and self.vbat_divider is not None:
+            vref, ratio = self.vbat_divider
+            conv = [
+                vbat_raw_to_mv_array(arr, vref=vref, divider_ratio=ratio) / 1000.0
+                for arr in (mean_arr, med_arr, min_arr, max_arr)
+            ]
+            std_arr = std_arr * (vref * ratio / ADC_MAX_12BIT)
+        elif sensor == "ntc" and self.ntc_model is not None:
+            model = self.ntc_model
+            conv = [ntc_raw_to_temp_array(arr, model) for arr in (mean_arr, med_arr, min_arr, max_arr)]
+            # curva não linear: desvio pela inclinação local em torno da média
+            std_arr = np.abs(ntc_raw_to_temp_array(mean_arr + std_arr, model) - ntc_raw_to_temp_array(mean_arr - std_arr, model)) / 2
+        else:
+            return mean_arr, med_arr, min_arr, max_arr, std_arr
+        mean_arr, med_arr, lo, hi = conv
+        # conversões decrescentes (slope < 0, NTC no lado baixo) invertem min e max
+        return mean_arr, med_arr, np.fmin(lo, hi), np.fmax(lo, hi), std_arr
+
     def refresh(self, history: Dict[int, List[TelemetryRecord]], calib_data, default_node: int | None = None, calib_limits=None, raw_limits=(0, 4095)):
         if self.node_combo.count() == 0 and default_node is not None:
             self.node_combo.addItem(str(default_node))
         if not self.node_combo.currentText():
             self.curve_mean.setData([], [])
             self.curve_med.setData([], [])
-            self.curve_std_top.setData([], [])
-            self.curve_std_bot.setData([], [])
+            self.curve_max.setData([], [])
+            self.curve_min.setData([], [])
             return
 
         try:
@@ -95,124 +196,45 @@ class SensorDetailChart(QtWidgets.QWidget):
             return
         sensor = self.sensor_combo.currentText()
         metric = f"{sensor}_mean"
-        metric_min = f"{sensor}_min"
-        metric_max = f"{sensor}_max"
-        metric_std = f"{sensor}_std"
-        metric_med = f"{sensor}_median"
-
-        window = self.window_combo.currentText()
-        delta = {
-            "10m": timedelta(minutes=10),
-            "1h": timedelta(hours=1),
-            "6h": timedelta(hours=6),
-            "24h": timedelta(hours=24),
-            "7d": timedelta(days=7),
-        }.get(window, timedelta(hours=24))
-        cutoff = datetime.now() - delta
+
+        delta = WINDOW_DELTAS.get(self.window_combo.currentText(), timedelta(hours=24))
+        cutoff = (datetime.now() - delta).timestamp()
         apply_calib = self.calib_checkbox.isChecked()
         calib_metric = metric in {"soil_mean", "vbat_mean", "ntc_mean"}
-        calib_slope = None
-        if apply_calib and calib_metric:
-            try:
-                calib_slope, _ = gce_calib.get_coeff(calib_data, node_id, metric)
-                calib_slope = abs(float(calib_slope))
-            except Exception:
-                calib_slope = None
-
-        xs = []
-        mean_vals = []
-        med_vals = []
-        std_top = []
-        std_bot = []
-        min_list = []
-        max_list = []
-        std_vals = []
-        for rec in history.get(node_id, []):
-            if rec.ts < cutoff:
-                continue
-            m = getattr(rec, metric, None)
-            if m is None:
-                continue
-            try:
-                val_mean = float(m)
-            except Exception:
-                continue
-            if apply_calib and calib_metric:
-                val_mean = gce_calib.apply_calibration(calib_data, node_id, metric, val_mean)
-            xs.append(rec.ts)
-            mean_vals.append(val_mean)
-
-            med = getattr(rec, metric_med, None)
-            if med is not None:
-                try:
-                    val_med = float(med)
-                    if apply_calib and calib_metric:
-                        val_med = gce_calib.apply_calibration(calib_data, node_id, metric, val_med)
-                    med_vals.append(val_med)
-                except Exception:
-                    med_vals.append(np.nan)
-            else:
-                med_vals.append(np.nan)
-
-            stdv = getattr(rec, metric_std, None)
-            if stdv is not None:
-                try:
-                    val_std = float(stdv)
-                    if apply_calib and calib_metric and calib_slope is not None:
-                        val_std = calib_slope * val_std
-                    top = val_mean + val_std
-                    bot = val_mean - val_std
-                    std_top.append(top)
-                    std_bot.append(bot)
-                    std_vals.append(val_std)
-                except Exception:
-                    std_top.append(np.nan)
-                    std_bot.append(np.nan)
-                    std_vals.append(np.nan)
-            else:
-                std_top.append(np.nan)
-                std_bot.append(np.nan)
-                std_vals.append(np.nan)
 
-            # min/max
-            mn = getattr(rec, metric_min, None)
-            mx = getattr(rec, metric_max, None)
-            try:
-                v_min = float(mn) if mn is not None else np.nan
-                if apply_calib and calib_metric and v_min == v_min:
-                    v_min = gce_calib.apply_calibration(calib_data, node_id, metric, v_min)
-                min_list.append(v_min)
-            except Exception:
-                min_list.append(np.nan)
-            try:
-                v_max = float(mx) if mx is not None else np.nan
-                if apply_calib and calib_metric and v_max == v_max:
-                    v_max = gce_calib.apply_calibration(calib_data, node_id, metric, v_max)
-                max_list.append(v_max)
-            except Exception:
-                max_list.append(np.nan)
+        ring = self._sync_ring(node_id, history.get(node_id, []))
+        ts, blocks = ring.window(cutoff)
+        block = blocks.get(sensor)
+        if block is None:
+            ts = ts[:0]
+        else:
+            # descarta pontos sem média, como no carregamento por registro
+            valid = np.isfinite(block[:, STAT_INDEX["mean"]])
+            if not valid.all():
+                ts = ts[valid]
+                block = block[valid]
 
-        if not xs:
+        if ts.size == 0:
             self.curve_mean.setData([], [])
             self.curve_med.setData([], [])
-            self.curve_std_top.setData([], [])
-            self.curve_std_bot.setData([], [])
+            self.curve_max.setData([], [])
+            self.curve_min.setData([], [])
             return
 
-        t0 = xs[0].timestamp()
-        x_rel = np.asarray([(x.timestamp() - t0) / 60.0 for x in xs], dtype=float)
-        mean_arr = np.asarray(mean_vals, dtype=float)
-        med_arr = np.asarray(med_vals, dtype=float)
-        top_arr = np.asarray(std_top, dtype=float)
-        bot_arr = np.asarray(std_bot, dtype=float)
-        min_arr = np.asarray(min_list, dtype=float)
-        max_arr = np.asarray(max_list, dtype=float)
-        std_arr = np.asarray(std_vals, dtype=float)
-
-        self.curve_mean.setData(x_rel, mean_arr)
-        self.curve_med.setData(x_rel, med_arr)
-        self.curve_std_top.setData(x_rel, top_arr)
-        self.curve_std_bot.setData(x_rel, bot_arr)
+        mean_arr = block[:, STAT_INDEX["mean"]].astype(float)
+        med_arr = block[:, STAT_INDEX["median"]].astype(float)
+        min_arr = block[:, STAT_INDEX["min"]].astype(float)
+        max_arr = block[:, STAT_INDEX["max"]].astype(float)
+        std_arr = block[:, STAT_INDEX["std"]].astype(float)
+        if apply_calib and calib_metric:
+            mean_arr, med_arr, min_arr, max_arr, std_arr = self._convert(
+                calib_data, node_id, sensor, mean_arr, med_arr, min_arr, max_arr, std_arr
+            )
+        top_arr = np.where(np.isfinite(max_arr), max_arr, mean_arr + std_arr)
+        bot_arr = np.where(np.isfinite(min_arr), min_arr, mean_arr - std_arr)
+
+        x_rel = (ts - ts[0]) / 60.0
+
         self.plot.setLabel("bottom", "tempo", "min")
 
         self._x_rel = x_rel
@@ -221,6 +243,8 @@ class SensorDetailChart(QtWidgets.QWidget):
         self._std_arr = std_arr
         self._min_arr = min_arr
         self._max_arr = max_arr
+        self._top_arr = top_arr
+        self._bot_arr = bot_arr
 
         # autoajuste de escala
         y_candidates = np.concatenate(
@@ -268,6 +292,42 @@ class SensorDetailChart(QtWidgets.QWidget):
             yRange=y_range,
             padding=0,
         )
+        self._render_lod()
+
+    def _render_lod(self, *_args):
+        """
+        Push the visible slice to the curves, decimated to the view width.
+
+        Each pixel bucket keeps the min and max of mean/median, in the order
+        they occur, and the lowest min / highest max of the envelope, so spikes
+        and the envelope survive decimation.
+        The full-resolution arrays stay in self._x_rel/... for the tooltip.
+        """
+        x = self._x_rel
+        if x.size == 0:
+            return
+        vb = self.plot.plotItem.vb
+        x_lo, x_hi = vb.viewRange()[0]
+        # um ponto extra de cada lado para a linha não cortar na borda
+        i0 = max(int(np.searchsorted(x, x_lo, side="left")) - 1, 0)
+        i1 = min(int(np.searchsorted(x, x_hi, side="right")) + 1, x.size)
+        if i1 <= i0:
+            i0, i1 = 0, x.size
+        width_px = max(int(vb.width()), 100)
+        xs = x[i0:i1]
+        if xs.size <= width_px * self.lod_points_per_px:
+            self.curve_mean.setData(xs, self._mean_arr[i0:i1])
+            self.curve_med.setData(xs, self._med_arr[i0:i1])
+            self.curve_max.setData(xs, self._top_arr[i0:i1])
+            self.curve_min.setData(xs, self._bot_arr[i0:i1])
+            return
+        starts = bucket_starts(xs.size, width_px)
+        x_dec = bucket_edges_x(xs, starts)
+        bot_dec, top_dec = envelope_decimate(self._bot_arr[i0:i1], self._top_arr[i0:i1], starts)
+        self.curve_mean.setData(x_dec, peak_decimate(self._mean_arr[i0:i1], starts))
+        self.curve_med.setData(x_dec, peak_decimate(self._med_arr[i0:i1], starts))
+        self.curve_max.setData(x_dec, top_dec)
+        self.curve_min.setData(x_dec, bot_dec)
 
     def _on_mouse_move(self, evt):
         if not hasattr(self, "_x_rel"):
@@ -278,7 +338,12 @@ class SensorDetailChart(QtWidgets.QWidget):
             x = mouse_point.x()
             if self._x_rel.size == 0:
                 return
-            idx = int(np.abs(self._x_rel - x).argmin())
+            # x_rel é crescente: busca binária + vizinho mais próximo
+            idx = int(np.searchsorted(self._x_rel, x))
+            if idx >= self._x_rel.size:
+                idx = self._x_rel.size - 1
+            elif idx > 0 and (x - self._x_rel[idx - 1]) < (self._x_rel[idx] - x):
+                idx -= 1
             try:
                 mean_val = self._mean_arr[idx]
             except Exception:
@@ -0,0 +1,293 @@
+"""
+Columnar ring buffers for streaming RSN telemetry into charts.
+
+Values are kept raw (ADC counts) per sensor as float32 columns
+(mean, median, min, max, std) next to a float64 epoch-seconds column.
+Calibration is applied by the consumer on whole slices.
+
+Also holds the min/max-per-bucket decimation helpers used to draw long
+windows at roughly one bucket per screen pixel, and the node x time grid
+behind the fleet overview.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+SENSORS = ("soil", "vbat", "ntc")
+STATS = ("mean", "median", "min", "max", "std")
+STAT_INDEX = {name: i for i, name in enumerate(STATS)}
+
+_RECORD_FIELDS = tuple(f"{sensor}_{stat}" for sensor in SENSORS for stat in STATS)
+
+
+def _as_float(value) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except Exception:
+        return np.nan
+
+
+class TelemetryRing:
+    """
+    Fixed-capacity, chronological ring of telemetry columns for one node.
+
+    Every slot is written twice (at i and i + capacity), so the newest
+    `len(ring)` samples are always one contiguous slice and reads never copy.
+    Appends cost O(new samples); the oldest samples are overwritten once full.
+    """
+
+    def __init__(self, capacity: int = 16384):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = int(capacity)
+        self._ts = np.full(2 * self.capacity, np.nan, dtype=np.float64)
+        self._vals = {
+            sensor: np.full((2 * self.capacity, len(STATS)), np.nan, dtype=np.float32) for sensor in SENSORS
+        }
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        """Timestamp (epoch s) of the newest sample, or None when empty."""
+        if self._size == 0:
+            return None
+        return float(self._ts[self._head + self.capacity - 1])
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def extend(self, ts: np.ndarray, values: Dict[str, np.ndarray]):
+        """
+        Append n samples in chronological order.
+        ts: shape (n,) epoch seconds; values: sensor -> shape (n, len(STATS)).
+        """
+        ts = np.asarray(ts, dtype=np.float64)
+        n = ts.size
+        if n == 0:
+            return
+        if n > self.capacity:
+            ts = ts[-self.capacity:]
+            values = {k: np.asarray(v)[-self.capacity:] for k, v in values.items()}
+            n = self.capacity
+        pos = (self._head + np.arange(n)) % self.capacity
+        self._ts[pos] = ts
+        self._ts[pos + self.capacity] = ts
+        for sensor, buf in self._vals.items():
+            block = values.get(sensor)
+            if block is None:
+                buf[pos] = np.nan
+                buf[pos + self.capacity] = np.nan
+                continue
+            block = np.asarray(block, dtype=np.float32)
+            buf[pos] = block
+            buf[pos + self.capacity] = block
+        self._head = int((self._head + n) % self.capacity)
+        self._size = min(self.capacity, self._size + n)
+
+    def extend_records(self, records: Iterable) -> int:
+        """
+        Append record objects exposing ts (datetime) and <sensor>_<stat> attributes.
+        Records not newer than last_ts are skipped. Returns number appended.
+        """
+        last = self.last_ts
+        ts_list = []
+        rows = []
+        for rec in records:
+            ts = rec.ts.timestamp()
+            if last is not None and ts <= last:
+                continue
+            last = ts
+            ts_list.append(ts)
+            rows.append([_as_float(getattr(rec, field, None)) for field in _RECORD_FIELDS])
+        if not ts_list:
+            return 0
+        flat = np.asarray(rows, dtype=np.float32).reshape(len(rows), len(SENSORS), len(STATS))
+        self.extend(
+            np.asarray(ts_list, dtype=np.float64),
+            {sensor: flat[:, i, :] for i, sensor in enumerate(SENSORS)},
+        )
+        return len(ts_list)
+
+    def window(self, since_ts: Optional[float] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Return views (no copy) of samples with ts >= since_ts, oldest first:
+        (ts, {sensor: array (n, len(STATS))}).
+        """
+        end = self._head + self.capacity
+        start = end - self._size
+        ts = self._ts[start:end]
+        if since_ts is not None and ts.size:
+            start += int(np.searchsorted(ts, since_ts, side="left"))
+            ts = self._ts[start:end]
+        return ts, {sensor: buf[start:end] for sensor, buf in self._vals.items()}
+
+
+def bucket_starts(count: int, n_buckets: int) -> np.ndarray:
+    """Start offsets of n_buckets contiguous, near-equal index buckets over count samples."""
+    n_buckets = max(1, min(int(n_buckets), int(count)))
+    return np.unique(np.linspace(0, count, n_buckets, endpoint=False).astype(np.intp))
+
+
+def _interleave(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    out = np.empty(a.size * 2, dtype=np.result_type(a, b))
+    out[0::2] = a
+    out[1::2] = b
+    return out
+
+
+def bucket_edges_x(x: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """x of the first and last sample of every bucket, interleaved (2 points per bucket)."""
+    ends = np.append(starts[1:], x.size) - 1
+    return _interleave(x[starts], x[ends])
+
+
+def peak_decimate(y: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Per-bucket min and max of y, interleaved to pair with bucket_edges_x and
+    emitted in the order they occur in the bucket. NaNs are ignored.
+    """
+    lo = np.fmin.reduceat(y, starts)
+    hi = np.fmax.reduceat(y, starts)
+    # primeira posição do mínimo e do máximo em cada bucket
+    bucket = np.repeat(np.arange(starts.size), np.diff(np.append(starts, y.size)))
+    pos = np.arange(y.size)
+    never = y.size
+    first_lo = np.minimum.reduceat(np.where(y == lo[bucket], pos, never), starts)
+    first_hi = np.minimum.reduceat(np.where(y == hi[bucket], pos, never), starts)
+    lo_first = first_lo <= first_hi
+    return _interleave(np.where(lo_first, lo, hi), np.where(lo_first, hi, lo))
+
+
+def envelope_decimate(low: np.ndarray, high: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-bucket lower/upper envelope (min of low, max of high), each repeated to pair with bucket_edges_x."""
+    lo = np.fmin.reduceat(low, starts)
+    hi = np.fmax.reduceat(high, starts)
+    return np.repeat(lo, 2), np.repeat(hi, 2)
+
+
+MAX_NODES = 256  # node_id is a single byte on the wire
+
+
+class FleetGrid:
+    """
+    Node x time-bucket rollup of per-sensor mean values for the fleet overview.
+
+    Rows are indexed directly by node_id; columns are fixed-width time buckets
+    ending at the current bucket. Sums and counts are kept separately so
+    rollup rows and single new samples can both be folded in with np.add.at.
+    Each sensor keeps its own count so NULL values do not pull a cell toward 0.
+    """
+
+    def __init__(self, bucket_s: int, n_buckets: int):
+        if bucket_s <= 0 or n_buckets <= 0:
+            raise ValueError("bucket_s and n_buckets must be > 0")
+        self.bucket_s = int(bucket_s)
+        self.n_buckets = int(n_buckets)
+        self._sum = {sensor: np.zeros((MAX_NODES, self.n_buckets), dtype=np.float64) for sensor in SENSORS}
+        self._count = np.zeros((MAX_NODES, self.n_buckets), dtype=np.int32)
+        self._sensor_count = {sensor: np.zeros((MAX_NODES, self.n_buckets), dtype=np.int32) for sensor in SENSORS}
+        self.t0 = 0
+        self.last_id = 0
+
+    @property
+    def span_s(self) -> int:
+        return self.bucket_s * self.n_buckets
+
+    def reset(self, now_ts: float):
+        """Empty the grid so its last bucket contains now_ts."""
+        for arr in self._sum.values():
+            arr.fill(0.0)
+        for arr in self._sensor_count.values():
+            arr.fill(0)
+        self._count.fill(0)
+        self.t0 = (int(now_ts) // self.bucket_s + 1) * self.bucket_s - self.span_s
+        self.last_id = 0
+
+    def advance(self, now_ts: float):
+        """Shift buckets left so the last one contains now_ts."""
+        end = self.t0 + self.span_s
+        if now_ts < end:
+            return
+        shift = (int(now_ts) - end) // self.bucket_s + 1
+        if shift >= self.n_buckets:
+            last_id = self.last_id
+            self.reset(now_ts)
+            self.last_id = last_id
+            return
+        for arr in (*self._sum.values(), *self._sensor_count.values(), self._count):
+            arr[:, :-shift] = arr[:, shift:]
+            arr[:, -shift:] = 0
+        self.t0 += shift * self.bucket_s
+
+    def _fold(
+        self,
+        node_ids: np.ndarray,
+        ts: np.ndarray,
+        counts: np.ndarray,
+        sums: Dict[str, np.ndarray],
+        sensor_counts: Dict[str, np.ndarray],
+    ):
+        col = (ts.astype(np.int64) - self.t0) // self.bucket_s
+        keep = (col >= 0) & (col < self.n_buckets) & (node_ids >= 0) & (node_ids < MAX_NODES)
+        rows = node_ids[keep]
+        col = col[keep]
+        np.add.at(self._count, (rows, col), counts[keep])
+        for sensor, arr in self._sum.items():
+            vals = sums[sensor][keep]
+            np.add.at(arr, (rows, col), np.nan_to_num(vals))
+            np.add.at(self._sensor_count[sensor], (rows, col), sensor_counts[sensor][keep])
+
+    def add_rollup(self, rows: Iterable):
+        """
+        Fold pre-aggregated rows (node_id, bucket_start_epoch, count,
+        soil_sum, vbat_sum, ntc_sum, max_id, soil_count, vbat_count, ntc_count)
+        into the grid.
+        """
+        data = np.asarray(list(rows), dtype=np.float64)
+        if data.size == 0:
+            return
+        self._fold(
+            data[:, 0].astype(np.int64),
+            data[:, 1],
+            data[:, 2].astype(np.int32),
+            {sensor: data[:, 3 + i] for i, sensor in enumerate(SENSORS)},
+            {sensor: data[:, 7 + i].astype(np.int32) for i, sensor in enumerate(SENSORS)},
+        )
+        self.last_id = max(self.last_id, int(data[:, 6].max()))
+
+    def add_samples(self, rows: Iterable):
+        """Fold raw rows (id, node_id, ts_epoch, soil_mean, vbat_mean, ntc_mean) into the grid."""
+        data = np.asarray(list(rows), dtype=np.float64)
+        if data.size == 0:
+            return
+        self._fold(
+            data[:, 1].astype(np.int64),
+            data[:, 2],
+            np.ones(data.shape[0], dtype=np.int32),
+            {sensor: data[:, 3 + i] for i, sensor in enumerate(SENSORS)},
+            {sensor: np.isfinite(data[:, 3 + i]).astype(np.int32) for i, sensor in enumerate(SENSORS)},
+        )
+        self.last_id = max(self.last_id, int(data[:, 0].max()))
+
+    def node_ids(self) -> np.ndarray:
+        """Node ids with at least one sample in the grid, ascending."""
+        return np.flatnonzero(self._count.any(axis=1))
+
+    def image(self, sensor: str, node_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Mean per (node, bucket) as float32, NaN where a bucket has no samples."""
+        rows = self.node_ids() if node_ids is None else node_ids
+        count = self._sensor_count[sensor][rows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self._sum[sensor][rows] / count
+        mean[count == 0] = np.nan
+        return mean.astype(np.float32)
@@ -1,16 +1,134 @@
 """
 Lightweight SQLite store for GCE.
 Keeps nodes, telemetry, and config acks.
+
+One writer connection handles every insert/update; queries go through
+read-only connections (one per calling thread) so WAL readers never queue
+behind ingest.
+
+Calibration coefficients are versioned rows (per node, sensor and
+effective-from time); calibrated hourly/daily rollups are materialized
+from them on demand and invalidated when a coefficient changes.
+
+node_config keeps, per node, the desired RsnConfig bytes, the last bytes
+sent and the last bytes the node acknowledged, so downlinks can be limited
+to nodes whose applied config differs.
+
+Optionally, telemetry older than a horizon is archived by archive_telemetry()
+into per-node, fixed-time compressed columnar chunks (telemetry_chunks, see
+gce_chunks); read_columns() and rollups read both tiers.
+
+Raw DEBUG sample streams are kept as chunked uint16 blobs per node session
+(debug_sessions/debug_chunks), not one row per sample.
+
+node_latest holds, per node, the last telemetry values, last_seen/last_rssi
+and frame/ack counts; it is written in the same commit as each frame or ack
+and mirrored in memory, so list_nodes() and latest_readings() run no SQL.
+The nodes row itself is only rewritten when a node's versions change.
+
+Telemetry frames are unique on (node_id, cycle, rsn_ts_ms): retransmitted
+copies are dropped by add_telemetry() and bulk_import() (see gce_import
+for the CLI) and counted in ingest_stats(). Archived frames keep their key
+in telemetry_archived_keys, so copies of them are dropped too.
 """
 
 from __future__ import annotations
 
+import bisect
+import math
 import sqlite3
-from datetime import datetime
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gce_calib_utils import CalibrationCache, apply_linear, linear_coeffs_at
+from gce_chunks import CHUNK_COLUMNS, decode_chunk, encode_chunk
+from gce_health import HealthEvent
+from gce_linkstats import NodeStatsRow
+from gce_series import SENSORS
+from rsn_proto import CONFIG_ACK_OK, RsnHello, RsnTelemetry, RsnConfigAck
+
+
+# Sample time in epoch seconds: aligned event time when known, else host receive time.
+_EVENT_EPOCH_SQL = "COALESCE(event_ts_ms / 1000, CAST(strftime('%s', ts_host) AS INTEGER))"
+
+# Host receive time (ISO ts_host) as epoch ms, and the sample time used for chunking.
+_HOST_MS_SQL = "CAST(ROUND((julianday(ts_host) - 2440587.5) * 86400000) AS INTEGER)"
+_EPOCH_MS_SQL = f"COALESCE(event_ts_ms, {_HOST_MS_SQL})"
+# Key columns of telemetry_archived_keys for a frame; NULLs become -1 (a
+# WITHOUT ROWID key cannot hold NULL) and host_ms only tells apart frames
+# without a cycle, as in bulk_import(). {c}/{r}/{h} are cycle, rsn_ts_ms, ts_host.
+_ARCHIVED_KEY_SQL = "COALESCE({c}, -1), COALESCE({r}, -1), CASE WHEN {c} IS NULL THEN " + _HOST_MS_SQL.replace(
+    "ts_host", "{h}"
+) + " ELSE 0 END"
+# CHUNK_COLUMNS as read from the telemetry table.
+_CHUNK_SELECT = ", ".join(
+    {"epoch_ms": _EPOCH_MS_SQL, "host_ms": _HOST_MS_SQL}.get(name, name) for name in CHUNK_COLUMNS
+)
+
+# Telemetry columns accepted by bulk_import(), in row order.
+IMPORT_COLUMNS: Tuple[str, ...] = (
+    "node_id", "ts_host", "event_ts_ms", "tgw_ts_ms", "rsn_ts_ms", "cycle", "rssi",
+    "soil_mean", "soil_median", "soil_min", "soil_max", "soil_std",
+    "vbat_mean", "vbat_median", "vbat_min", "vbat_max", "vbat_std",
+    "ntc_mean", "ntc_median", "ntc_min", "ntc_max", "ntc_std",
+    "batt_status", "flags", "last_rssi",
+)
+# Frame keys remembered per node by add_telemetry() before asking SQLite.
+RECENT_FRAMES_PER_NODE = 64
+# Secondary telemetry indexes dropped during bulk_import(defer_indexes=True).
+_DEFERRED_INDEXES = ("idx_telemetry_node_id", "idx_telemetry_ts_host", "idx_telemetry_event_ts")
+# Columns mirrored in memory from nodes and node_latest.
+_NODE_KEYS = ("node_id", "first_seen", "last_seen", "last_rssi", "hw_version", "fw_version", "capabilities")
+_LATEST_KEYS = (
+    "node_id", "last_seen", "last_rssi", "telemetry_id", "ts_host", "event_ts_ms", "cycle", "rsn_ts_ms",
+    "batt_status", "flags", "soil_mean", "vbat_mean", "ntc_mean", "frames", "acks",
+)
+
+
+def _iso_to_epoch(value: str) -> float:
+    """Naive UTC ISO timestamps (as written by the store) to epoch seconds."""
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _archived_keys(node_id: int, cycle: np.ndarray, rsn: np.ndarray, host_ms: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """telemetry_archived_keys rows for chunk columns (float, NaN for NULL); see _ARCHIVED_KEY_SQL."""
+    no_cycle = np.isnan(cycle)
+    c = np.where(no_cycle, -1, np.nan_to_num(cycle)).astype(np.int64)
+    r = np.where(np.isnan(rsn), -1, np.nan_to_num(rsn)).astype(np.int64)
+    h = np.where(no_cycle, np.nan_to_num(host_ms), 0).astype(np.int64)
+    return [(int(node_id), *key) for key in zip(c.tolist(), r.tolist(), h.tolist())]
+
+
+def connect_readonly(db_path: Path, timeout: float = 5.0) -> sqlite3.Connection:
+    """Open a read-only connection to an existing GCE database."""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False)
+
+
+class _ReaderSlot:
+    """Thread-local holder of a read connection; dropped (and closed) when its thread ends."""
 
-from rsn_proto import RsnHello, RsnTelemetry, RsnConfigAck
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _close_reader(conn: sqlite3.Connection, readers: List[sqlite3.Connection], lock: threading.Lock):
+    with lock:
+        if conn in readers:
+            readers.remove(conn)
+    try:
+        conn.close()
+    except Exception:
+        pass
 
 
 class GceStore:
@@ -20,13 +138,54 @@ class GceStore:
         self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self._conn.execute("PRAGMA journal_mode=WAL;")
         self._create_schema()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._calib_cache = CalibrationCache()
+        self._calib_lock = threading.Lock()
+        self._calib_version: Optional[int] = None
+        self._calib_next_change: Optional[float] = None
+        # incrementado a cada invalidação de rollups (calibração, importação)
+        self._rollup_generation = 0
+        # últimas chaves (cycle, rsn_ts_ms) por nó: a maioria das cópias nem chega ao SQLite
+        self._recent_frames: Dict[int, Dict[Tuple[int, int], None]] = {}
+        self._ingest_counts = {"inserted": 0, "duplicates_cached": 0, "duplicates_db": 0}
+        # espelho de nodes, node_latest e node_stats: list_nodes() e latest_readings() sem SQL
+        self._node_cache_lock = threading.Lock()
+        self._nodes: Dict[int, Dict[str, object]] = {}
+        self._latest: Dict[int, Dict[str, object]] = {}
+        self._stats: Dict[int, Tuple[int, int, int, Optional[int]]] = {}
+        self._load_node_cache()
 
     def close(self):
+        with self._readers_lock:
+            readers = list(self._readers)
+            self._readers.clear()
+        for conn in readers:
+            try:
+                conn.close()
+            except Exception:
+                pass
         try:
             self._conn.close()
         except Exception:
             pass
 
+    def _read_conn(self) -> sqlite3.Connection:
+        """
+        Read-only connection owned by the calling thread (opened on first use,
+        closed when the thread ends: pool threads retire and are replaced).
+        """
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            conn = connect_readonly(self.db_path)
+            slot = _ReaderSlot(conn)
+            self._local.slot = slot
+            with self._readers_lock:
+                self._readers.append(conn)
+            weakref.finalize(slot, _close_reader, conn, self._readers, self._readers_lock)
+        return slot.conn
+
     def _create_schema(self):
         cur = self._conn.cursor()
         cur.executescript(
@@ -75,10 +234,235 @@ class GceStore:
                 hw_version INTEGER,
                 fw_version INTEGER
             );
+            CREATE TABLE IF NOT EXISTS node_stats (
+                node_id INTEGER PRIMARY KEY,
+                received INTEGER,
+                lost INTEGER,
+                duplicates INTEGER,
+                reboots INTEGER,
+                last_cycle INTEGER,
+                rssi_sum INTEGER,
+                rssi_min INTEGER,
+                rssi_max INTEGER,
+                rssi_hist TEXT
+            );
+            CREATE TABLE IF NOT EXISTS health_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                node_id INTEGER,
+                ts_host TEXT,
+                kind TEXT,
+                sensor TEXT,
+                value REAL,
+                expected REAL,
+                score REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_health_events_node ON health_events(node_id, id);
+            CREATE TABLE IF NOT EXISTS calibration (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                node_id INTEGER NOT NULL,
+                sensor TEXT NOT NULL,
+                slope REAL NOT NULL,
+                offset REAL NOT NULL,
+                effective_from TEXT NOT NULL,
+                created_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_calibration_node
+                ON calibration(node_id, sensor, effective_from);
+            CREATE TABLE IF NOT EXISTS telemetry_rollup (
+                node_id INTEGER NOT NULL,
+                bucket_s INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                count INTEGER,
+                soil_mean REAL,
+                soil_min REAL,
+                soil_max REAL,
+                vbat_mean REAL,
+                vbat_min REAL,
+                vbat_max REAL,
+                ntc_mean REAL,
+                ntc_min REAL,
+                ntc_max REAL,
+                PRIMARY KEY (node_id, bucket_s, bucket_start)
+            );
+            CREATE TABLE IF NOT EXISTS node_config (
+                node_id INTEGER PRIMARY KEY,
+                desired BLOB,
+                desired_at TEXT,
+                sent BLOB,
+                sent_at TEXT,
+                applied BLOB,
+                applied_at TEXT,
+                last_status INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS analytics_daily (
+                node_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                count INTEGER,
+                lost INTEGER,
+                rssi_mean REAL,
+                soil_mean REAL,
+                soil_min REAL,
+                soil_max REAL,
+                vbat_mean REAL,
+                vbat_min REAL,
+                vbat_max REAL,
+                ntc_mean REAL,
+                ntc_min REAL,
+                ntc_max REAL,
+                PRIMARY KEY (node_id, day)
+            );
+            CREATE TABLE IF NOT EXISTS analytics_node (
+                node_id INTEGER PRIMARY KEY,
+                first_day INTEGER,
+                last_day INTEGER,
+                rows INTEGER,
+                lost INTEGER,
+                loss_pct REAL,
+                vbat_mean REAL,
+                vbat_slope_per_day REAL,
+                computed_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS rollup_watermark (
+                node_id INTEGER NOT NULL,
+                bucket_s INTEGER NOT NULL,
+                valid_until INTEGER NOT NULL,
+                PRIMARY KEY (node_id, bucket_s)
+            );
+            CREATE TABLE IF NOT EXISTS debug_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                node_id INTEGER NOT NULL,
+                rsn_session INTEGER NOT NULL,
+                started_at TEXT NOT NULL,
+                last_at TEXT NOT NULL,
+                blocks INTEGER NOT NULL DEFAULT 0,
+                samples INTEGER NOT NULL DEFAULT 0,
+                lost_blocks INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_debug_sessions_node ON debug_sessions(node_id, id);
+            CREATE TABLE IF NOT EXISTS debug_chunks (
+                session_id INTEGER NOT NULL,
+                channel INTEGER NOT NULL,
+                chunk_seq INTEGER NOT NULL,
+                period_ms INTEGER NOT NULL,
+                n_samples INTEGER NOT NULL,
+                blocks BLOB NOT NULL,
+                samples BLOB NOT NULL,
+                PRIMARY KEY (session_id, channel, chunk_seq)
+            );
+            CREATE TABLE IF NOT EXISTS telemetry_chunks (
+                node_id INTEGER NOT NULL,
+                start_epoch INTEGER NOT NULL,
+                end_epoch INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (node_id, start_epoch)
+            );
+            CREATE INDEX IF NOT EXISTS idx_telemetry_chunks_range ON telemetry_chunks(node_id, start_epoch, end_epoch);
+            """
+        )
+        self._conn.commit()
+        fresh_keys = not cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'telemetry_archived_keys'"
+        ).fetchone()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS telemetry_archived_keys (
+                node_id INTEGER NOT NULL,
+                cycle INTEGER NOT NULL,
+                rsn_ts_ms INTEGER NOT NULL,
+                host_ms INTEGER NOT NULL,
+                PRIMARY KEY (node_id, cycle, rsn_ts_ms, host_ms)
+            ) WITHOUT ROWID;
+            """
+        )
+        if fresh_keys:
+            self._rebuild_archived_keys()
+        self._conn.commit()
+        fresh_latest = not cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'node_latest'"
+        ).fetchone()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS node_latest (
+                node_id INTEGER PRIMARY KEY,
+                last_seen TEXT,
+                last_rssi INTEGER,
+                telemetry_id INTEGER,
+                ts_host TEXT,
+                event_ts_ms INTEGER,
+                cycle INTEGER,
+                rsn_ts_ms INTEGER,
+                batt_status INTEGER,
+                flags INTEGER,
+                soil_mean INTEGER,
+                vbat_mean INTEGER,
+                ntc_mean INTEGER,
+                frames INTEGER NOT NULL DEFAULT 0,
+                acks INTEGER NOT NULL DEFAULT 0
+            );
             """
         )
         self._conn.commit()
         self._ensure_column("telemetry", "cycle", "INTEGER")
+        self._ensure_column("telemetry", "rsn_ts_ms", "INTEGER")
+        self._ensure_column("telemetry", "event_ts_ms", "INTEGER")
+        self._ensure_column("config_acks", "cfg", "BLOB")
+        self._ensure_column("rollup_watermark", "max_id", "INTEGER")
+        self._ensure_frame_key()
+        self._create_telemetry_indexes()
+        self._conn.commit()
+        if fresh_latest:
+            self._rebuild_node_latest()
+
+    def _rebuild_archived_keys(self):
+        """Fill telemetry_archived_keys from the chunks (DBs archived before the table existed)."""
+        cur = self._conn.cursor()
+        keys = []
+        for node_id, data in cur.execute("SELECT node_id, data FROM telemetry_chunks").fetchall():
+            cols = decode_chunk(data)
+            cycle = np.asarray(cols["cycle"], dtype=np.float64)
+            rsn = np.asarray(cols["rsn_ts_ms"], dtype=np.float64)
+            host = np.asarray(cols["host_ms"], dtype=np.float64)
+            keys.extend(_archived_keys(node_id, cycle, rsn, host))
+        cur.executemany("INSERT OR IGNORE INTO telemetry_archived_keys VALUES(?, ?, ?, ?)", keys)
+
+    def _ensure_frame_key(self):
+        """
+        One row per frame: (node_id, cycle, rsn_ts_ms) is unique. Older DBs
+        may hold retransmitted copies; the first copy is kept and rollups are
+        recomputed.
+        """
+        cur = self._conn.cursor()
+        cur.execute("PRAGMA index_list(telemetry);")
+        unique = {row[1]: bool(row[2]) for row in cur.fetchall()}
+        if unique.get("idx_telemetry_frame"):
+            return
+        cur.execute(
+            """
+            DELETE FROM telemetry
+            WHERE cycle IS NOT NULL AND rsn_ts_ms IS NOT NULL AND id NOT IN (
+                SELECT MIN(id) FROM telemetry
+                WHERE cycle IS NOT NULL AND rsn_ts_ms IS NOT NULL
+                GROUP BY node_id, cycle, rsn_ts_ms
+            )
+            """
+        )
+        removed = cur.rowcount
+        if removed > 0:
+            cur.execute("DELETE FROM rollup_watermark;")
+        cur.execute("DROP INDEX IF EXISTS idx_telemetry_frame;")
+        cur.execute("CREATE UNIQUE INDEX idx_telemetry_frame ON telemetry(node_id, cycle, rsn_ts_ms);")
+        self._conn.commit()
+        if self._log and removed > 0:
+            self._log.info("telemetry-duplicates-removed", rows=removed)
+
+    def _create_telemetry_indexes(self):
+        cur = self._conn.cursor()
+        # Keyset pagination (node_id = ? AND id < ?) walks this index instead of the table.
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_node_id ON telemetry(node_id, id);")
+        # Time-window scans (fleet rollups) start from here instead of the first row.
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_ts_host ON telemetry(ts_host);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_event_ts ON telemetry(node_id, event_ts_ms);")
 
     def _ensure_column(self, table: str, column: str, definition: str):
         cur = self._conn.cursor()
@@ -88,10 +472,126 @@ class GceStore:
             cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
             self._conn.commit()
 
-    def upsert_node(self, node_id: int, rssi: int, hello: RsnHello):
-        now = datetime.utcnow().isoformat()
+    def _rebuild_node_latest(self, node_ids: Optional[Iterable[int]] = None):
+        """
+        Recompute node_latest from nodes, telemetry and telemetry_chunks (all
+        nodes, or only node_ids). Latest frame = newest ts_host; ack counts are kept.
+        """
         cur = self._conn.cursor()
+        where, params = "", []
+        if node_ids is not None:
+            params = sorted({int(n) for n in node_ids})
+            if not params:
+                return
+            where = f" WHERE node_id IN ({','.join('?' * len(params))})"
+        seen = {r[0]: (r[1], r[2]) for r in cur.execute(f"SELECT node_id, last_seen, last_rssi FROM nodes{where}", params)}
+        archived = dict(cur.execute(f"SELECT node_id, SUM(rows) FROM telemetry_chunks{where} GROUP BY node_id", params))
+        # com MAX(), o SQLite devolve as demais colunas da própria linha máxima
         cur.execute(
+            f"""
+            SELECT node_id, MAX(ts_host), id, event_ts_ms, cycle, rsn_ts_ms, batt_status, flags,
+                   soil_mean, vbat_mean, ntc_mean, rssi, COUNT(*)
+            FROM telemetry{where}
+            GROUP BY node_id
+            """,
+            params,
+        )
+        rows = []
+        for r in cur.fetchall():
+            node_id, ts_host, rssi = r[0], r[1], r[11]
+            last_seen, last_rssi = ts_host, rssi
+            node = seen.pop(node_id, None)
+            if node is not None and node[0] and (ts_host is None or node[0] > ts_host):
+                last_seen, last_rssi = node
+            rows.append((node_id, last_seen, last_rssi, *r[2:11], ts_host, r[12] + (archived.pop(node_id, 0) or 0)))
+        for node_id, (last_seen, last_rssi) in seen.items():
+            rows.append((node_id, last_seen, last_rssi, *([None] * 9), None, archived.pop(node_id, 0) or 0))
+        cur.executemany(
+            """
+            INSERT INTO node_latest(
+                node_id, last_seen, last_rssi, telemetry_id, event_ts_ms, cycle, rsn_ts_ms, batt_status, flags,
+                soil_mean, vbat_mean, ntc_mean, ts_host, frames
+            )
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(node_id) DO UPDATE SET
+                last_seen=NULLIF(MAX(COALESCE(last_seen, ''), COALESCE(excluded.last_seen, '')), ''),
+                last_rssi=CASE WHEN COALESCE(excluded.last_seen, '') >= COALESCE(last_seen, '')
+                               THEN excluded.last_rssi ELSE last_rssi END,
+                telemetry_id=excluded.telemetry_id,
+                ts_host=excluded.ts_host,
+                event_ts_ms=excluded.event_ts_ms,
+                cycle=excluded.cycle,
+                rsn_ts_ms=excluded.rsn_ts_ms,
+                batt_status=excluded.batt_status,
+                flags=excluded.flags,
+                soil_mean=excluded.soil_mean,
+                vbat_mean=excluded.vbat_mean,
+                ntc_mean=excluded.ntc_mean,
+                frames=excluded.frames
+            """,
+            rows,
+        )
+        self._conn.commit()
+
+    def _load_node_cache(self):
+        """(Re)load the in-memory mirror of nodes, node_latest and node_stats."""
+        cur = self._conn.cursor()
+        nodes = {
+            r[0]: dict(zip(_NODE_KEYS, r))
+            for r in cur.execute(f"SELECT {', '.join(_NODE_KEYS)} FROM nodes")
+        }
+        latest = {
+            r[0]: dict(zip(_LATEST_KEYS, r))
+            for r in cur.execute(f"SELECT {', '.join(_LATEST_KEYS)} FROM node_latest")
+        }
+        stats = {r[0]: tuple(r[1:]) for r in cur.execute("SELECT node_id, received, lost, reboots, rssi_sum FROM node_stats")}
+        with self._node_cache_lock:
+            self._nodes, self._latest, self._stats = nodes, latest, stats
+
+    def _touch_latest(self, cur, node_id: int, now: str, rssi: int, acks: int = 0):
+        """Update last_seen/last_rssi (and the ack count) in node_latest; caller commits."""
+        cur.execute(
+            """
+            INSERT INTO node_latest(node_id, last_seen, last_rssi, acks) VALUES(?, ?, ?, ?)
+            ON CONFLICT(node_id) DO UPDATE SET
+                last_seen=excluded.last_seen,
+                last_rssi=excluded.last_rssi,
+                acks=acks + excluded.acks
+            """,
+            (node_id, now, int(rssi), acks),
+        )
+
+    def _cache_latest(self, node_id: int, **fields):
+        with self._node_cache_lock:
+            entry = self._latest.get(node_id)
+            if entry is None:
+                entry = dict.fromkeys(_LATEST_KEYS)
+                entry.update(node_id=node_id, frames=0, acks=0)
+            else:
+                entry = dict(entry)
+            entry["frames"] += fields.pop("frames", 0)
+            entry["acks"] += fields.pop("acks", 0)
+            entry.update(fields)
+            # troca o dict inteiro: leitores podem estar iterando o anterior
+            self._latest[node_id] = entry
+
+    def _write_node(self, node_id: int, now: str, rssi: int, hw_version: int, fw_version: int, capabilities: Optional[int]):
+        """
+        Upsert the nodes row only when the node is new or its versions/capabilities
+        changed (capabilities None = keep). Returns True when a row was written.
+        """
+        with self._node_cache_lock:
+            known = self._nodes.get(node_id)
+        caps = capabilities if capabilities is not None else (known["capabilities"] if known else 0)
+        caps = None if caps is None else int(caps)
+        if (
+            known is not None
+            and known["hw_version"] == hw_version
+            and known["fw_version"] == fw_version
+            and known["capabilities"] == caps
+        ):
+            return False
+        self._conn.execute(
             """
             INSERT INTO nodes(node_id, first_seen, last_seen, last_rssi, hw_version, fw_version, capabilities)
             VALUES(?, ?, ?, ?, ?, ?, ?)
@@ -102,138 +602,1108 @@ class GceStore:
                 fw_version=excluded.fw_version,
                 capabilities=excluded.capabilities
             """,
-            (node_id, now, now, rssi, hello.header.hw_version, hello.header.fw_version, hello.capabilities),
+            (node_id, now, now, int(rssi), int(hw_version), int(fw_version), caps),
         )
+        entry = {
+            "node_id": node_id,
+            "first_seen": known["first_seen"] if known else now,
+            "last_seen": now,
+            "last_rssi": int(rssi),
+            "hw_version": int(hw_version),
+            "fw_version": int(fw_version),
+            "capabilities": caps,
+        }
+        with self._node_cache_lock:
+            self._nodes[node_id] = entry
+        return True
+
+    def upsert_node(self, node_id: int, rssi: int, hello: RsnHello):
+        """Record a HELLO: nodes is only written when the node or its versions/capabilities are new."""
+        now = datetime.utcnow().isoformat()
+        cur = self._conn.cursor()
+        self._write_node(node_id, now, rssi, hello.header.hw_version, hello.header.fw_version, hello.capabilities)
+        self._touch_latest(cur, node_id, now, rssi)
         self._conn.commit()
+        self._cache_latest(node_id, last_seen=now, last_rssi=int(rssi))
         if self._log:
             self._log.info("node-upsert", node_id=node_id, rssi=rssi)
 
-    def add_telemetry(self, node_id: int, rssi: int, tgw_ts_ms: int, telemetry: RsnTelemetry):
+    def add_telemetry(
+        self,
+        node_id: int,
+        rssi: int,
+        tgw_ts_ms: int,
+        telemetry: RsnTelemetry,
+        event_ts_ms: Optional[int] = None,
+        stats: Optional[NodeStatsRow] = None,
+    ) -> bool:
+        """
+        Insert one telemetry frame. event_ts_ms is the aligned sample time
+        (epoch ms, see gce_clock); rollups fall back to ts_host when it is None.
+        stats (LinkStatsTracker.update) is written in the same commit, also
+        for duplicates. Returns False when the frame (node_id, cycle, ts_ms)
+        is already stored.
+        """
+        key = (int(telemetry.cycle), int(telemetry.ts_ms))
+        recent = self._recent_frames.setdefault(node_id, {})
+        if key in recent:
+            self._ingest_counts["duplicates_cached"] += 1
+            if self._log:
+                self._log.info("telem-duplicate", node_id=node_id, cycle=key[0], source="cache")
+            if stats is not None:
+                self.upsert_node_stats(stats)
+            return False
         now = datetime.utcnow().isoformat()
         cur = self._conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO telemetry (
-                node_id, ts_host, tgw_ts_ms, cycle, rssi, batt_status, flags,
-                soil_mean, soil_median, soil_min, soil_max, soil_std,
-                vbat_mean, vbat_median, vbat_min, vbat_max, vbat_std,
-                ntc_mean, ntc_median, ntc_min, ntc_max, ntc_std, last_rssi
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                node_id,
-                now,
-                int(tgw_ts_ms),
-                int(telemetry.cycle),
-                int(rssi),
-                int(telemetry.batt_status),
-                int(telemetry.flags),
-                int(telemetry.soil_mean_raw),
-                int(telemetry.soil_median_raw),
-                int(telemetry.soil_min_raw),
-                int(telemetry.soil_max_raw),
-                int(telemetry.soil_std_raw),
-                int(telemetry.vbat_mean_raw),
-                int(telemetry.vbat_median_raw),
-                int(telemetry.vbat_min_raw),
-                int(telemetry.vbat_max_raw),
-                int(telemetry.vbat_std_raw),
-                int(telemetry.ntc_mean_raw),
-                int(telemetry.ntc_median_raw),
-                int(telemetry.ntc_min_raw),
-                int(telemetry.ntc_max_raw),
-                int(telemetry.ntc_std_raw),
-                int(telemetry.last_rssi),
-            ),
-        )
-        self._conn.commit()
+        try:
+            # cópia de um quadro já arquivado: o índice único não o vê mais
+            archived = cur.execute(
+                "SELECT 1 FROM telemetry_archived_keys WHERE node_id = ? AND cycle = ? AND rsn_ts_ms = ? AND host_ms = 0",
+                (node_id, key[0], key[1]),
+            ).fetchone()
+            if archived is None:
+                cur.execute(
+                    """
+                    INSERT OR IGNORE INTO telemetry (
+                        node_id, ts_host, tgw_ts_ms, cycle, rssi, batt_status, flags,
+                        soil_mean, soil_median, soil_min, soil_max, soil_std,
+                        vbat_mean, vbat_median, vbat_min, vbat_max, vbat_std,
+                        ntc_mean, ntc_median, ntc_min, ntc_max, ntc_std, last_rssi,
+                        rsn_ts_ms, event_ts_ms
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        node_id,
+                        now,
+                        int(tgw_ts_ms),
+                        int(telemetry.cycle),
+                        int(rssi),
+                        int(telemetry.batt_status),
+                        int(telemetry.flags),
+                        int(telemetry.soil_mean_raw),
+                        int(telemetry.soil_median_raw),
+                        int(telemetry.soil_min_raw),
+                        int(telemetry.soil_max_raw),
+                        int(telemetry.soil_std_raw),
+                        int(telemetry.vbat_mean_raw),
+                        int(telemetry.vbat_median_raw),
+                        int(telemetry.vbat_min_raw),
+                        int(telemetry.vbat_max_raw),
+                        int(telemetry.vbat_std_raw),
+                        int(telemetry.ntc_mean_raw),
+                        int(telemetry.ntc_median_raw),
+                        int(telemetry.ntc_min_raw),
+                        int(telemetry.ntc_max_raw),
+                        int(telemetry.ntc_std_raw),
+                        int(telemetry.last_rssi),
+                        int(telemetry.ts_ms),
+                        None if event_ts_ms is None else int(event_ts_ms),
+                    ),
+                )
+            stored = archived is None and cur.rowcount > 0
+            if stored:
+                latest = {
+                    "last_seen": now,
+                    "last_rssi": int(rssi),
+                    "telemetry_id": cur.lastrowid,
+                    "ts_host": now,
+                    "event_ts_ms": None if event_ts_ms is None else int(event_ts_ms),
+                    "cycle": key[0],
+                    "rsn_ts_ms": key[1],
+                    "batt_status": int(telemetry.batt_status),
+                    "flags": int(telemetry.flags),
+                    "soil_mean": int(telemetry.soil_mean_raw),
+                    "vbat_mean": int(telemetry.vbat_mean_raw),
+                    "ntc_mean": int(telemetry.ntc_mean_raw),
+                }
+                cur.execute(
+                    f"""
+                    INSERT INTO node_latest(node_id, {", ".join(latest)}, frames)
+                    VALUES(?, {", ".join("?" * len(latest))}, 1)
+                    ON CONFLICT(node_id) DO UPDATE SET
+                        {", ".join(f"{k}=excluded.{k}" for k in latest)},
+                        frames=frames + 1
+                    """,
+                    (node_id, *latest.values()),
+                )
+            if stats is not None:
+                self._write_node_stats(cur, stats)
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+        if stats is not None:
+            self._cache_node_stats(stats)
+        # só depois do commit: um INSERT que falhou não pode virar "duplicado"
+        recent[key] = None
+        if len(recent) > RECENT_FRAMES_PER_NODE:
+            del recent[next(iter(recent))]
+        if not stored:
+            self._ingest_counts["duplicates_db"] += 1
+            if self._log:
+                self._log.info("telem-duplicate", node_id=node_id, cycle=key[0], source="db" if archived is None else "archive")
+            return False
+        self._cache_latest(node_id, frames=1, **latest)
+        self._ingest_counts["inserted"] += 1
         if self._log:
             self._log.info("telem-insert", node_id=node_id, rssi=rssi)
+        return True
+
+    def ingest_stats(self) -> Dict[str, int]:
+        """Frames inserted and duplicates dropped (by the recent-key cache or by SQLite) since open."""
+        return dict(self._ingest_counts)
+
+    def bulk_import(
+        self,
+        rows: Iterable[Sequence[object]],
+        *,
+        batch_size: int = 100000,
+        defer_indexes: bool = True,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Tuple[int, int]:
+        """
+        Load IMPORT_COLUMNS rows in one transaction per batch_size rows.
 
-    def add_config_ack(self, node_id: int, rssi: int, ack: RsnConfigAck):
+        Rows already stored (same node_id, cycle and rsn_ts_ms; same ts_host
+        when the frame has no cycle) are skipped, also within the input.
+        synchronous is OFF until the import ends, so a power loss can lose
+        the batches of this import (not older data). With defer_indexes the
+        secondary telemetry indexes are dropped and rebuilt once at the end.
+        progress(read, inserted) is called after every batch.
+        Returns (read, inserted).
+        """
+        placeholders = ", ".join(f"?{i}" for i in range(1, len(IMPORT_COLUMNS) + 1))
+        insert_sql = f"""
+            INSERT INTO telemetry ({", ".join(IMPORT_COLUMNS)})
+            SELECT {placeholders}
+            WHERE NOT EXISTS (
+                SELECT 1 FROM telemetry
+                WHERE node_id = ?1 AND cycle IS ?6 AND rsn_ts_ms IS ?5 AND (?6 IS NOT NULL OR ts_host = ?2)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM telemetry_archived_keys
+                WHERE (node_id, cycle, rsn_ts_ms, host_ms) = (?1, {_ARCHIVED_KEY_SQL.format(c="?6", r="?5", h="?2")})
+            )
+        """
+        cur = self._conn.cursor()
+        sync = cur.execute("PRAGMA synchronous;").fetchone()[0]
+        cache = cur.execute("PRAGMA cache_size;").fetchone()[0]
+        cur.execute("PRAGMA synchronous=OFF;")
+        cur.execute("PRAGMA cache_size=-262144;")
+        if defer_indexes:
+            for name in _DEFERRED_INDEXES:
+                cur.execute(f"DROP INDEX IF EXISTS {name};")
+            self._conn.commit()
+        read = inserted = 0
+        seen_nodes: Dict[int, Tuple[str, str]] = {}
+        try:
+            batch: List[Sequence[object]] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    inserted += self._import_batch(cur, insert_sql, batch, seen_nodes)
+                    read += len(batch)
+                    batch = []
+                    if progress:
+                        progress(read, inserted)
+            if batch:
+                inserted += self._import_batch(cur, insert_sql, batch, seen_nodes)
+                read += len(batch)
+                if progress:
+                    progress(read, inserted)
+            # nós desconhecidos entram na tabela; rollups dos nós afetados são refeitos
+            cur.executemany(
+                """
+                INSERT INTO nodes(node_id, first_seen, last_seen) VALUES(?, ?, ?)
+                ON CONFLICT(node_id) DO UPDATE SET
+                    first_seen=MIN(COALESCE(first_seen, excluded.first_seen), excluded.first_seen),
+                    last_seen=MAX(COALESCE(last_seen, excluded.last_seen), excluded.last_seen)
+                """,
+                [(n, lo, hi) for n, (lo, hi) in seen_nodes.items()],
+            )
+            cur.executemany("DELETE FROM rollup_watermark WHERE node_id = ?", [(n,) for n in seen_nodes])
+            self._conn.commit()
+            self._rollup_generation += 1
+        finally:
+            self._conn.rollback()
+            if defer_indexes:
+                self._create_telemetry_indexes()
+                self._conn.commit()
+            cur.execute(f"PRAGMA cache_size={int(cache)};")
+            cur.execute(f"PRAGMA synchronous={int(sync)};")
+        if inserted:
+            self._rebuild_node_latest(seen_nodes)
+            self._load_node_cache()
+        if self._log:
+            self._log.info("bulk-import", read=read, inserted=inserted, nodes=len(seen_nodes))
+        return read, inserted
+
+    def _import_batch(self, cur, insert_sql: str, batch: List[Sequence[object]], seen_nodes) -> int:
+        before = self._conn.total_changes
+        cur.executemany(insert_sql, batch)
+        self._conn.commit()
+        for row in batch:
+            node_id, ts_host = row[0], row[1]
+            if ts_host is None:
+                continue
+            span = seen_nodes.get(node_id)
+            if span is None:
+                seen_nodes[node_id] = (ts_host, ts_host)
+            elif ts_host < span[0]:
+                seen_nodes[node_id] = (ts_host, span[1])
+            elif ts_host > span[1]:
+                seen_nodes[node_id] = (span[0], ts_host)
+        return self._conn.total_changes - before
+
+    def add_config_ack(self, node_id: int, rssi: int, ack: RsnConfigAck, cfg: Optional[bytes] = None):
+        """
+        Record a CONFIG_ACK. cfg is the RsnConfig.to_bytes() it acknowledges,
+        when known; a successful ack makes it the node's applied config.
+        """
         now = datetime.utcnow().isoformat()
         cur = self._conn.cursor()
         cur.execute(
             """
-            INSERT INTO config_acks(node_id, ts_host, rssi, status, hw_version, fw_version)
-            VALUES(?, ?, ?, ?, ?, ?)
+            INSERT INTO config_acks(node_id, ts_host, rssi, status, hw_version, fw_version, cfg)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
             """,
-            (node_id, now, int(rssi), int(ack.status), int(ack.header.hw_version), int(ack.header.fw_version)),
+            (node_id, now, int(rssi), int(ack.status), int(ack.header.hw_version), int(ack.header.fw_version), cfg),
         )
+        if cfg is not None:
+            ok = int(ack.status) == CONFIG_ACK_OK
+            cur.execute(
+                """
+                INSERT INTO node_config(node_id, applied, applied_at, last_status)
+                VALUES(?, ?, ?, ?)
+                ON CONFLICT(node_id) DO UPDATE SET
+                    applied=CASE WHEN ? THEN excluded.applied ELSE applied END,
+                    applied_at=CASE WHEN ? THEN excluded.applied_at ELSE applied_at END,
+                    last_status=excluded.last_status
+                """,
+                (node_id, cfg if ok else None, now if ok else None, int(ack.status), ok, ok),
+            )
+        self._touch_latest(cur, node_id, now, rssi, acks=1)
         self._conn.commit()
+        self._cache_latest(node_id, last_seen=now, last_rssi=int(rssi), acks=1)
         if self._log:
             self._log.info("config-ack", node_id=node_id, status=ack.status)
 
-    def touch_node(self, node_id: int, rssi: int, hw_version: int, fw_version: int):
-        """
-        Update last_seen and last_rssi for nodes when telemetry/acks arrive.
-        Capabilities are left untouched when the node already exists.
-        """
+    def set_desired_configs(self, configs: Dict[int, bytes]):
+        """Record the config each node should run (one commit for the batch)."""
+        if not configs:
+            return
         now = datetime.utcnow().isoformat()
         cur = self._conn.cursor()
-        cur.execute(
+        cur.executemany(
             """
-            INSERT INTO nodes(node_id, first_seen, last_seen, last_rssi, hw_version, fw_version, capabilities)
-            VALUES(?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(node_id) DO UPDATE SET
-                last_seen=excluded.last_seen,
-                last_rssi=excluded.last_rssi,
-                hw_version=excluded.hw_version,
-                fw_version=excluded.fw_version
+            INSERT INTO node_config(node_id, desired, desired_at) VALUES(?, ?, ?)
+            ON CONFLICT(node_id) DO UPDATE SET desired=excluded.desired, desired_at=excluded.desired_at
             """,
-            (node_id, now, now, int(rssi), int(hw_version), int(fw_version), 0),
+            [(int(n), bytes(cfg), now) for n, cfg in configs.items()],
         )
         self._conn.commit()
 
-    def list_nodes(self) -> List[Dict[str, object]]:
-        """Return all nodes ordered by id."""
+    def mark_config_sent(self, node_id: int, cfg: bytes):
+        """Record the config bytes just written to the link for a node."""
+        now = datetime.utcnow().isoformat()
         cur = self._conn.cursor()
         cur.execute(
             """
-            SELECT node_id, last_seen, last_rssi, hw_version, fw_version, capabilities
-            FROM nodes
-            ORDER BY node_id
+            INSERT INTO node_config(node_id, sent, sent_at) VALUES(?, ?, ?)
+            ON CONFLICT(node_id) DO UPDATE SET sent=excluded.sent, sent_at=excluded.sent_at
+            """,
+            (int(node_id), bytes(cfg), now),
+        )
+        self._conn.commit()
+
+    def list_node_configs(self) -> List[Dict[str, object]]:
+        """Desired/sent/applied config per node; in_sync is True when applied == desired."""
+        cur = self._read_conn().cursor()
+        cur.execute(
+            """
+            SELECT node_id, desired, desired_at, sent, sent_at, applied, applied_at, last_status
+            FROM node_config ORDER BY node_id
             """
         )
+        keys = ["node_id", "desired", "desired_at", "sent", "sent_at", "applied", "applied_at", "last_status"]
+        rows = [dict(zip(keys, r)) for r in cur.fetchall()]
+        for row in rows:
+            row["in_sync"] = row["desired"] is not None and row["desired"] == row["applied"]
+        return rows
+
+    def nodes_needing_config(self, configs: Dict[int, bytes]) -> List[int]:
+        """Nodes whose last acknowledged config differs from the given bytes."""
+        cur = self._read_conn().cursor()
+        cur.execute("SELECT node_id, applied FROM node_config WHERE applied IS NOT NULL")
+        applied = {node_id: bytes(cfg) for node_id, cfg in cur.fetchall()}
+        return sorted(n for n, cfg in configs.items() if applied.get(int(n)) != bytes(cfg))
+
+    def upsert_node_stats(self, row: NodeStatsRow):
+        """Persist one node's running link statistics (see LinkStatsTracker.row)."""
+        self._write_node_stats(self._conn.cursor(), row)
+        self._conn.commit()
+        self._cache_node_stats(row)
+
+    @staticmethod
+    def _write_node_stats(cur: sqlite3.Cursor, row: NodeStatsRow):
+        cur.execute(
+            """
+            INSERT INTO node_stats(
+                node_id, received, lost, duplicates, reboots, last_cycle,
+                rssi_sum, rssi_min, rssi_max, rssi_hist
+            )
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(node_id) DO UPDATE SET
+                received=excluded.received,
+                lost=excluded.lost,
+                duplicates=excluded.duplicates,
+                reboots=excluded.reboots,
+                last_cycle=excluded.last_cycle,
+                rssi_sum=excluded.rssi_sum,
+                rssi_min=excluded.rssi_min,
+                rssi_max=excluded.rssi_max,
+                rssi_hist=excluded.rssi_hist
+            """,
+            row,
+        )
+
+    def _cache_node_stats(self, row: NodeStatsRow):
+        with self._node_cache_lock:
+            self._stats[int(row[0])] = (row[1], row[2], row[4], row[6])
+
+    def load_node_stats(self) -> List[NodeStatsRow]:
+        """All node_stats rows, in LinkStatsTracker.seed() order."""
+        cur = self._read_conn().cursor()
+        cur.execute(
+            """
+            SELECT node_id, received, lost, duplicates, reboots, last_cycle,
+                   rssi_sum, rssi_min, rssi_max, rssi_hist
+            FROM node_stats
+            """
+        )
+        return cur.fetchall()
+
+    def add_health_events(self, events: List[HealthEvent]):
+        """Persist detector events (one commit for the batch)."""
+        if not events:
+            return
+        now = datetime.utcnow().isoformat()
+        cur = self._conn.cursor()
+        cur.executemany(
+            """
+            INSERT INTO health_events(node_id, ts_host, kind, sensor, value, expected, score)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(e.node_id, now, e.kind, e.sensor, e.value, e.expected, e.score) for e in events],
+        )
+        self._conn.commit()
+        if self._log:
+            for e in events:
+                self._log.warning("health-event", node_id=e.node_id, kind=e.kind, sensor=e.sensor, score=e.score)
+
+    def list_health_events(self, node_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, object]]:
+        """Return recent health events, newest first."""
+        query = "SELECT id, node_id, ts_host, kind, sensor, value, expected, score FROM health_events"
+        params: List[object] = []
+        if node_id is not None:
+            query += " WHERE node_id = ?"
+            params.append(int(node_id))
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+        cur = self._read_conn().cursor()
+        cur.execute(query, params)
+        keys = ["id", "node_id", "ts_host", "kind", "sensor", "value", "expected", "score"]
+        return [dict(zip(keys, r)) for r in cur.fetchall()]
+
+    def touch_node(self, node_id: int, rssi: int, hw_version: int, fw_version: int):
+        """
+        Register a node seen through telemetry/acks. The nodes row is only
+        written for a new node or new hw/fw versions (capabilities are kept);
+        last_seen and last_rssi live in node_latest, updated by add_telemetry()
+        and add_config_ack().
+        """
+        now = datetime.utcnow().isoformat()
+        if self._write_node(node_id, now, rssi, hw_version, fw_version, None):
+            self._conn.commit()
+
+    def list_nodes(self) -> List[Dict[str, object]]:
+        """Return all nodes ordered by id (from the in-memory cache, no SQL)."""
+        with self._node_cache_lock:
+            nodes, latest, stats = self._nodes, self._latest, self._stats
+            rows = [(nodes[n], latest.get(n), stats.get(n)) for n in sorted(nodes)]
+        result = []
+        for node, last, st in rows:
+            received, lost, reboots, rssi_sum = st if st is not None else (0, 0, 0, None)
+            received, lost = received or 0, lost or 0
+            total = received + lost
+            last_seen, last_rssi = node["last_seen"], node["last_rssi"]
+            if last is not None and last["last_seen"] and (not last_seen or last["last_seen"] >= last_seen):
+                last_seen, last_rssi = last["last_seen"], last["last_rssi"]
+            result.append(
+                {
+                    "node_id": node["node_id"],
+                    "last_seen": last_seen,
+                    "last_rssi": last_rssi,
+                    "hw_version": node["hw_version"],
+                    "fw_version": node["fw_version"],
+                    "capabilities": node["capabilities"],
+                    "loss_pct": round(100.0 * lost / total, 1) if total else None,
+                    "rssi_avg": round(rssi_sum / received, 1) if received and rssi_sum is not None else None,
+                    "reboots": reboots or 0,
+                }
+            )
+        return result
+
+    def latest_readings(self) -> List[Dict[str, object]]:
+        """
+        Last telemetry values, last_seen/last_rssi and frame/ack counts per node
+        (node_latest, from the in-memory cache). telemetry_id may already be archived.
+        """
+        with self._node_cache_lock:
+            latest = self._latest
+            return [dict(latest[n]) for n in sorted(latest)]
+
+    def list_recent_telemetry(self, node_id: int, limit: int = 100) -> List[Dict[str, object]]:
+        """Return recent telemetry rows for a node, newest first."""
+        return self.list_telemetry_page(node_id, limit=limit)
+
+    def list_telemetry_page(
+        self,
+        node_id: int,
+        *,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: int = 200,
+    ) -> List[Dict[str, object]]:
+        """
+        Return one page of telemetry rows for a node, newest first.
+
+        Keyset pagination on the row id: pass the oldest id already loaded as
+        before_id to get the next (older) page, or the newest id as after_id to
+        get the page right above it (rows inserted since, when it is the head).
+        Cost does not grow with the page position.
+        """
+        query = """
+            SELECT id, cycle, tgw_ts_ms, batt_status, flags,
+                   soil_mean, vbat_mean, ntc_mean, rssi
+            FROM telemetry
+            WHERE node_id = ?
+        """
+        params: List[object] = [node_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(int(before_id))
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(int(after_id))
+        # só after_id: a página logo acima dele, não as linhas mais novas do nó
+        ascending = after_id is not None and before_id is None
+        query += f" ORDER BY id {'ASC' if ascending else 'DESC'} LIMIT ?"
+        params.append(int(limit))
+        cur = self._read_conn().cursor()
+        cur.execute(query, params)
         rows = cur.fetchall()
+        if ascending:
+            rows.reverse()
         return [
             {
-                "node_id": r[0],
-                "last_seen": r[1],
-                "last_rssi": r[2],
-                "hw_version": r[3],
-                "fw_version": r[4],
-                "capabilities": r[5],
+                "id": r[0],
+                "cycle": r[1],
+                "tgw_local_ts_ms": r[2],
+                "batt_status": r[3],
+                "flags": r[4],
+                "soil_mean_raw": r[5],
+                "vbat_mean_raw": r[6],
+                "ntc_mean_raw": r[7],
+                "rssi": r[8],
             }
             for r in rows
         ]
 
-    def list_recent_telemetry(self, node_id: int, limit: int = 100) -> List[Dict[str, object]]:
-        """Return recent telemetry rows for a node, newest first."""
+    def fleet_rollup(self, since_epoch: int, bucket_s: int) -> List[tuple]:
+        """
+        Aggregate mean values of every node into fixed time buckets since since_epoch.
+        Rows: (node_id, bucket_start_epoch, count, soil_sum, vbat_sum, ntc_sum, max_id,
+        soil_count, vbat_count, ntc_count); the per-sensor counts leave out NULL values.
+        """
+        since_iso = datetime.utcfromtimestamp(int(since_epoch)).isoformat()
+        cur = self._read_conn().cursor()
+        cur.execute(
+            f"""
+            SELECT node_id,
+                   ({_EVENT_EPOCH_SQL} / ?) * ? AS bucket,
+                   COUNT(*), SUM(soil_mean), SUM(vbat_mean), SUM(ntc_mean), MAX(id),
+                   COUNT(soil_mean), COUNT(vbat_mean), COUNT(ntc_mean)
+            FROM telemetry
+            WHERE ts_host >= ?
+            GROUP BY node_id, bucket
+            """,
+            (int(bucket_s), int(bucket_s), since_iso),
+        )
+        return cur.fetchall()
+
+    def max_telemetry_id(self) -> int:
+        """Highest telemetry row id (0 when empty)."""
+        cur = self._read_conn().cursor()
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM telemetry")
+        return int(cur.fetchone()[0])
+
+    def list_telemetry_means_after(self, after_id: int, limit: int = 5000) -> List[tuple]:
+        """
+        Rows of all nodes inserted after after_id, oldest first.
+        Rows: (id, node_id, ts_epoch, soil_mean, vbat_mean, ntc_mean).
+        """
+        cur = self._read_conn().cursor()
+        cur.execute(
+            f"""
+            SELECT id, node_id, {_EVENT_EPOCH_SQL},
+                   soil_mean, vbat_mean, ntc_mean
+            FROM telemetry
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (int(after_id), int(limit)),
+        )
+        return cur.fetchall()
+
+    def open_debug_session(self, node_id: int, rsn_session: int) -> int:
+        """Start a new debug sample session for a node; returns its id."""
+        now = datetime.utcnow().isoformat()
+        cur = self._conn.cursor()
+        cur.execute(
+            "INSERT INTO debug_sessions(node_id, rsn_session, started_at, last_at) VALUES(?, ?, ?, ?)",
+            (node_id, rsn_session, now, now),
+        )
+        self._conn.commit()
+        if self._log:
+            self._log.info("debug-session-open", node_id=node_id, rsn_session=rsn_session, session_id=cur.lastrowid)
+        return int(cur.lastrowid)
+
+    def add_debug_chunk(
+        self,
+        session_id: int,
+        channel: int,
+        chunk_seq: int,
+        period_ms: int,
+        blocks: bytes,
+        samples: bytes,
+        n_blocks: int,
+        n_samples: int,
+        lost_blocks: int = 0,
+    ):
+        """Store one chunk of raw debug samples (see gce_debug for the blob layout)."""
         cur = self._conn.cursor()
         cur.execute(
             """
-            SELECT cycle, tgw_ts_ms, batt_status, flags,
-                   soil_mean, vbat_mean, ntc_mean, rssi
+            INSERT OR REPLACE INTO debug_chunks(session_id, channel, chunk_seq, period_ms, n_samples, blocks, samples)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            (session_id, channel, chunk_seq, period_ms, n_samples, sqlite3.Binary(blocks), sqlite3.Binary(samples)),
+        )
+        cur.execute(
+            """
+            UPDATE debug_sessions
+            SET last_at=?, blocks=blocks + ?, samples=samples + ?, lost_blocks=lost_blocks + ?
+            WHERE id=?
+            """,
+            (datetime.utcnow().isoformat(), n_blocks, n_samples, lost_blocks, session_id),
+        )
+        self._conn.commit()
+        if self._log:
+            self._log.info("debug-chunk", session_id=session_id, channel=channel, chunk=chunk_seq, samples=n_samples)
+
+    def list_debug_sessions(self, node_id: Optional[int] = None) -> List[Dict[str, object]]:
+        """Debug sample sessions, newest first."""
+        query = """
+            SELECT id, node_id, rsn_session, started_at, last_at, blocks, samples, lost_blocks
+            FROM debug_sessions
+        """
+        params: List[object] = []
+        if node_id is not None:
+            query += " WHERE node_id = ?"
+            params.append(int(node_id))
+        query += " ORDER BY id DESC"
+        cur = self._read_conn().cursor()
+        cur.execute(query, params)
+        keys = ["session_id", "node_id", "rsn_session", "started_at", "last_at", "blocks", "samples", "lost_blocks"]
+        return [dict(zip(keys, r)) for r in cur.fetchall()]
+
+    def load_debug_chunks(self, session_id: int, channel: int) -> List[tuple]:
+        """(period_ms, blocks, samples) blobs of one session/channel, in order."""
+        cur = self._read_conn().cursor()
+        cur.execute(
+            """
+            SELECT period_ms, blocks, samples FROM debug_chunks
+            WHERE session_id = ? AND channel = ?
+            ORDER BY chunk_seq
+            """,
+            (int(session_id), int(channel)),
+        )
+        return cur.fetchall()
+
+    def list_telemetry_between(self, node_id: int, since: str, until: str) -> List[Dict[str, object]]:
+        """Telemetry rows of a node received in [since, until] (host time, ISO UTC), oldest first."""
+        cur = self._read_conn().cursor()
+        cur.execute(
+            """
+            SELECT id, ts_host, rsn_ts_ms, cycle,
+                   soil_mean, soil_min, soil_max, soil_std,
+                   vbat_mean, vbat_min, vbat_max, vbat_std,
+                   ntc_mean, ntc_min, ntc_max, ntc_std
             FROM telemetry
+            WHERE node_id = ? AND ts_host >= ? AND ts_host <= ?
+            ORDER BY id
+            """,
+            (int(node_id), since, until),
+        )
+        keys = ["id", "ts_host", "rsn_ts_ms", "cycle"] + [f"{s}_{stat}" for s in SENSORS for stat in ("mean", "min", "max", "std")]
+        return [dict(zip(keys, r)) for r in cur.fetchall()]
+
+    def save_analytics(self, daily: List[tuple], summary: List[tuple]):
+        """Replace offline analytics results (see gce_analytics) in one transaction."""
+        now = datetime.utcnow().isoformat()
+        cur = self._conn.cursor()
+        cur.execute("DELETE FROM analytics_daily")
+        cur.execute("DELETE FROM analytics_node")
+        cur.executemany(f"INSERT INTO analytics_daily VALUES({','.join('?' * 14)})", daily)
+        cur.executemany(
+            f"INSERT INTO analytics_node VALUES({','.join('?' * 9)})", [(*row, now) for row in summary]
+        )
+        self._conn.commit()
+        if self._log:
+            self._log.info("analytics-saved", nodes=len(summary), days=len(daily))
+
+    def set_calibration(
+        self,
+        node_id: int,
+        sensor: str,
+        slope: float,
+        offset: float,
+        effective_from: Optional[datetime] = None,
+    ):
+        """
+        Record new linear coefficients for a node/sensor, valid from effective_from
+        (naive UTC, default now). Earlier rows are kept as history. Rollups of the
+        node from that time on are marked stale.
+        """
+        if sensor not in SENSORS:
+            raise ValueError(f"unknown sensor: {sensor}")
+        now = datetime.utcnow()
+        effective = (effective_from or now).isoformat()
+        cur = self._conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO calibration(node_id, sensor, slope, offset, effective_from, created_at)
+            VALUES(?, ?, ?, ?, ?, ?)
+            """,
+            (int(node_id), sensor, float(slope), float(offset), effective, now.isoformat()),
+        )
+        cur.execute(
+            """
+            UPDATE rollup_watermark
+            SET valid_until = MIN(valid_until, (? / bucket_s) * bucket_s)
             WHERE node_id = ?
-            ORDER BY id DESC
-            LIMIT ?
             """,
-            (node_id, limit),
+            (int(_iso_to_epoch(effective)), int(node_id)),
         )
-        rows = cur.fetchall()
+        self._conn.commit()
+        self._rollup_generation += 1
+        with self._calib_lock:
+            self._calib_version = None
+        if self._log:
+            self._log.info("calibration-set", node_id=node_id, sensor=sensor, slope=slope, offset=offset)
+
+    def list_calibration(self, node_id: Optional[int] = None) -> List[Dict[str, object]]:
+        """Return calibration history, oldest first."""
+        query = "SELECT id, node_id, sensor, slope, offset, effective_from, created_at FROM calibration"
+        params: List[object] = []
+        if node_id is not None:
+            query += " WHERE node_id = ?"
+            params.append(int(node_id))
+        query += " ORDER BY node_id, sensor, effective_from, id"
+        cur = self._read_conn().cursor()
+        cur.execute(query, params)
         return [
             {
-                "cycle": r[0],
-                "tgw_local_ts_ms": r[1],
-                "batt_status": r[2],
-                "flags": r[3],
-                "soil_mean_raw": r[4],
-                "vbat_mean_raw": r[5],
-                "ntc_mean_raw": r[6],
-                "rssi": r[7],
+                "id": r[0],
+                "node_id": r[1],
+                "sensor": r[2],
+                "slope": r[3],
+                "offset": r[4],
+                "effective_from": r[5],
+                "created_at": r[6],
             }
-            for r in rows
+            for r in cur.fetchall()
         ]
+
+    def _calibration_history(self) -> Dict[Tuple[int, str], Tuple[List[float], List[Tuple[float, float]]]]:
+        """(node, sensor) -> (sorted effective epochs, matching (slope, offset))."""
+        history: Dict[Tuple[int, str], Tuple[List[float], List[Tuple[float, float]]]] = {}
+        for row in self.list_calibration():
+            starts, coeffs = history.setdefault((row["node_id"], row["sensor"]), ([], []))
+            starts.append(_iso_to_epoch(row["effective_from"]))
+            coeffs.append((row["slope"], row["offset"]))
+        return history
+
+    def calibration_cache(self) -> CalibrationCache:
+        """
+        Process-wide cache of the coefficients in effect now.
+
+        The same object is returned every time and refreshed in place when the
+        calibration table changes (new row, here or from another process) or a
+        future effective_from is reached; check its `version` to detect changes.
+        """
+        cur = self._read_conn().cursor()
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM calibration")
+        version = int(cur.fetchone()[0])
+        now = time.time()
+        with self._calib_lock:
+            fresh = self._calib_version == version and (
+                self._calib_next_change is None or now < self._calib_next_change
+            )
+            if fresh:
+                return self._calib_cache
+            entries = []
+            next_change = None
+            for (node_id, sensor), (starts, coeffs) in self._calibration_history().items():
+                idx = bisect.bisect_right(starts, now) - 1
+                if idx >= 0:
+                    entries.append((node_id, sensor, coeffs[idx][0], coeffs[idx][1]))
+                if idx + 1 < len(starts):
+                    upcoming = starts[idx + 1]
+                    next_change = upcoming if next_change is None else min(next_change, upcoming)
+            self._calib_cache.load(entries)
+            self._calib_version = version
+            self._calib_next_change = next_change
+            return self._calib_cache
+
+    def materialize_rollups(self, bucket_s: int = 3600, lock=None) -> int:
+        """
+        Write calibrated per-node rollups (count, mean/min/max per sensor) into
+        telemetry_rollup. Each bucket uses the coefficients in effect at its
+        start. Only buckets at or after each node's watermark are recomputed
+        (the last, possibly partial, bucket is always redone); rows stored since
+        the last run (id > max_id) with an older event time lower the watermark
+        to their bucket. The reads run without `lock` (the caller's writer lock);
+        it is only held for the writes. Returns rows written.
+        """
+        bucket_s = int(bucket_s)
+        generation = self._rollup_generation
+        cur = self._read_conn().cursor()
+        max_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM telemetry").fetchone()[0]
+        cur.execute("SELECT node_id, valid_until, max_id FROM rollup_watermark WHERE bucket_s = ?", (bucket_s,))
+        wm = cur.fetchall()
+        marks = {r[0]: r[1] for r in wm}
+        if wm:
+            # linhas chegadas depois da última rodada com tempo de evento anterior à marca
+            cur.execute(
+                f"""
+                SELECT node_id, MIN({_EVENT_EPOCH_SQL}) FROM telemetry
+                WHERE id > ? AND id <= ?
+                GROUP BY node_id
+                """,
+                (min(r[2] or 0 for r in wm), max_id),
+            )
+            for node_id, first_epoch in cur.fetchall():
+                if node_id in marks and first_epoch is not None:
+                    marks[node_id] = min(marks[node_id], (int(first_epoch) // bucket_s) * bucket_s)
+        cur.execute("SELECT node_id FROM telemetry UNION SELECT node_id FROM telemetry_chunks")
+        node_ids = [r[0] for r in cur.fetchall()]
+        if not node_ids:
+            return 0
+        inner = f"""
+            SELECT node_id, {_EVENT_EPOCH_SQL} AS epoch,
+                   soil_mean, soil_min, soil_max, vbat_mean, vbat_min, vbat_max, ntc_mean, ntc_min, ntc_max
+            FROM telemetry WHERE node_id = ?
+        """
+        outer = f"""
+            SELECT node_id,
+                   (epoch / {bucket_s}) * {bucket_s} AS bucket,
+                   COUNT(*),
+                   AVG(soil_mean), MIN(soil_min), MAX(soil_max),
+                   AVG(vbat_mean), MIN(vbat_min), MAX(vbat_max),
+                   AVG(ntc_mean), MIN(ntc_min), MAX(ntc_max)
+            FROM ({{}})
+            GROUP BY bucket
+        """
+        # duas faixas de índice (idx_telemetry_event_ts): tempo de evento, ou hora de recepção sem ele
+        since_sql = outer.format(
+            f"{inner} AND event_ts_ms >= ? UNION ALL {inner} AND event_ts_ms IS NULL AND ts_host >= ?"
+        )
+        all_sql = outer.format(inner)
+        sql_rows: List[tuple] = []
+        for node_id in node_ids:
+            mark = marks.get(node_id)
+            if mark is None:
+                cur.execute(all_sql, (node_id,))
+            else:
+                iso = datetime.utcfromtimestamp(int(mark)).isoformat()
+                cur.execute(since_sql, (node_id, int(mark) * 1000, node_id, iso))
+            sql_rows.extend(cur.fetchall())
+        rows = self._merge_archived_buckets(sql_rows, bucket_s, marks)
+        history = self._calibration_history()
+
+        rows = [r for r in rows if marks.get(r[0]) is None or int(r[1]) >= marks[r[0]]]
+        out = []
+        new_marks: Dict[int, int] = {}
+        if rows:
+            node_ids = np.array([r[0] for r in rows], dtype=np.int64)
+            buckets = np.array([int(r[1]) for r in rows], dtype=np.int64)
+            # None vira NaN; colunas: mean, min, max de cada sensor
+            values = np.array([r[3:] for r in rows], dtype=np.float64).reshape(len(rows), len(SENSORS), 3)
+            for i, sensor in enumerate(SENSORS):
+                slope = np.ones(len(rows))
+                offset = np.zeros(len(rows))
+                for node_id in np.unique(node_ids):
+                    cal = history.get((int(node_id), sensor))
+                    if cal is not None:
+                        sel = node_ids == node_id
+                        slope[sel], offset[sel] = linear_coeffs_at(buckets[sel], cal[0], cal[1])
+                conv = apply_linear(values[:, i, :], slope[:, None], offset[:, None])
+                # coeficiente negativo inverte min e max
+                flip = slope < 0
+                conv[flip, 1], conv[flip, 2] = conv[flip, 2], conv[flip, 1]
+                values[:, i, :] = conv
+            flat = values.reshape(len(rows), -1)
+            for row, conv in zip(rows, flat.tolist()):
+                node_id, bucket = row[0], int(row[1])
+                out.append([node_id, bucket_s, bucket, row[2], *(None if math.isnan(v) else v for v in conv)])
+                new_marks[node_id] = max(new_marks.get(node_id, bucket), bucket)
+
+        with lock if lock is not None else nullcontext():
+            if generation != self._rollup_generation:
+                # coeficientes/dados mudaram durante a leitura: a próxima rodada refaz
+                return 0
+            self._write_rollups(bucket_s, out, marks, new_marks, max_id)
+        if self._log:
+            self._log.info("rollups-materialized", bucket_s=bucket_s, rows=len(out))
+        return len(out)
+
+    def _write_rollups(self, bucket_s: int, out: List[list], marks: Dict[int, int], new_marks: Dict[int, int], max_id: int):
+        wcur = self._conn.cursor()
+        wcur.executemany(
+            """
+            INSERT OR REPLACE INTO telemetry_rollup(
+                node_id, bucket_s, bucket_start, count,
+                soil_mean, soil_min, soil_max,
+                vbat_mean, vbat_min, vbat_max,
+                ntc_mean, ntc_min, ntc_max
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            out,
+        )
+        # marcas rebaixadas por linhas atrasadas valem mesmo se o nó não tiver balde novo
+        final = {n: m for n, m in marks.items()}
+        final.update(new_marks)
+        wcur.executemany(
+            """
+            INSERT INTO rollup_watermark(node_id, bucket_s, valid_until, max_id) VALUES(?, ?, ?, ?)
+            ON CONFLICT(node_id, bucket_s) DO UPDATE SET valid_until=excluded.valid_until, max_id=excluded.max_id
+            """,
+            [(n, bucket_s, b, max_id) for n, b in final.items()],
+        )
+        self._conn.commit()
+
+    def _merge_archived_buckets(self, rows: List[tuple], bucket_s: int, marks: Dict[int, int]) -> List[tuple]:
+        """Add raw per-bucket aggregates of archived chunks past each node's watermark (marks) to the SQL ones."""
+        cur = self._read_conn().cursor()
+        cur.execute("SELECT node_id, start_epoch, end_epoch FROM telemetry_chunks")
+        wanted = [(n, start) for n, start, end in cur.fetchall() if marks.get(n) is None or end > marks[n]]
+        archived = []
+        for node_id, start in wanted:
+            cur.execute("SELECT data FROM telemetry_chunks WHERE node_id = ? AND start_epoch = ?", (node_id, start))
+            archived.append((node_id, cur.fetchone()[0]))
+        if not archived:
+            return rows
+        merged: Dict[Tuple[int, int], List[object]] = {(r[0], int(r[1])): list(r) for r in rows}
+        names = ["epoch_ms"] + [f"{s}_{stat}" for s in SENSORS for stat in ("mean", "min", "max")]
+        for node_id, data in archived:
+            cols = decode_chunk(data, names)
+            bucket = (cols["epoch_ms"] // 1000 // bucket_s) * bucket_s
+            starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+            counts = np.diff(np.r_[starts, bucket.size])
+            stats = []
+            for sensor in SENSORS:
+                mean = cols[f"{sensor}_mean"].astype(np.float64)
+                valid = ~np.isnan(mean)
+                n = np.add.reduceat(valid.astype(np.float64), starts)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    avg = np.add.reduceat(np.where(valid, mean, 0.0), starts) / n
+                lo = np.fmin.reduceat(cols[f"{sensor}_min"].astype(np.float64), starts)
+                hi = np.fmax.reduceat(cols[f"{sensor}_max"].astype(np.float64), starts)
+                stats.append((avg, lo, hi))
+            for i, start in enumerate(starts):
+                key = (node_id, int(bucket[start]))
+                values = [None if np.isnan(v[i]) else float(v[i]) for triple in stats for v in triple]
+                prev = merged.get(key)
+                if prev is None:
+                    merged[key] = [node_id, key[1], int(counts[i])] + values
+                    continue
+                # bucket com linhas nas duas camadas: média ponderada pela contagem
+                c0, c1 = prev[2], int(counts[i])
+                for j, value in enumerate(values):
+                    old = prev[3 + j]
+                    if value is None or old is None:
+                        prev[3 + j] = old if value is None else value
+                    elif j % 3 == 0:
+                        prev[3 + j] = (old * c0 + value * c1) / (c0 + c1)
+                    else:
+                        prev[3 + j] = min(old, value) if j % 3 == 1 else max(old, value)
+                prev[2] = c0 + c1
+        return sorted(merged.values(), key=lambda r: (r[0], r[1]))
+
+    def archive_telemetry(self, before_epoch: float, chunk_s: int = 3600) -> Tuple[int, int]:
+        """
+        Move telemetry older than before_epoch (rounded down to chunk_s) from
+        the row table into compressed per-node chunks of chunk_s seconds.
+        Rollups are brought up to date first; read_columns() and
+        materialize_rollups() see both tiers. Returns (rows, chunks).
+        """
+        chunk_s = int(chunk_s)
+        cutoff_ms = int(before_epoch // chunk_s * chunk_s) * 1000
+        cur = self._read_conn().cursor()
+        cur.execute("SELECT DISTINCT bucket_s FROM rollup_watermark")
+        for bucket_s in {3600} | {r[0] for r in cur.fetchall()}:
+            self.materialize_rollups(bucket_s)
+        cur.execute("SELECT DISTINCT node_id FROM telemetry")
+        node_ids = [r[0] for r in cur.fetchall()]
+        total_rows = total_chunks = 0
+        wcur = self._conn.cursor()
+        for node_id in node_ids:
+            cur.execute(
+                f"SELECT id, {_CHUNK_SELECT} FROM telemetry WHERE node_id = ? AND {_EPOCH_MS_SQL} < ?",
+                (node_id, cutoff_ms),
+            )
+            fetched = cur.fetchall()
+            if not fetched:
+                continue
+            max_id = max(r[0] for r in fetched)
+            table = np.array([r[1:] for r in fetched], dtype=np.float64)
+            table = table[np.argsort(table[:, 0], kind="stable")]
+            starts_s = (table[:, 0] // 1000 // chunk_s * chunk_s).astype(np.int64)
+            bounds = np.flatnonzero(np.r_[True, starts_s[1:] != starts_s[:-1]])
+            for lo, hi in zip(bounds, np.r_[bounds[1:], starts_s.size]):
+                start = int(starts_s[lo])
+                chunk = table[lo:hi]
+                wcur.execute("SELECT data FROM telemetry_chunks WHERE node_id = ? AND start_epoch = ?", (node_id, start))
+                existing = wcur.fetchone()
+                if existing is not None:
+                    # linhas atrasadas: junta com o chunk já arquivado
+                    old = decode_chunk(existing[0])
+                    chunk = np.vstack([np.column_stack([old[n] for n in CHUNK_COLUMNS]).astype(np.float64), chunk])
+                    chunk = chunk[np.argsort(chunk[:, 0], kind="stable")]
+                wcur.execute(
+                    "INSERT OR REPLACE INTO telemetry_chunks(node_id, start_epoch, end_epoch, rows, data) VALUES(?, ?, ?, ?, ?)",
+                    (node_id, start, start + chunk_s, chunk.shape[0], sqlite3.Binary(encode_chunk(chunk))),
+                )
+                total_chunks += 1
+            names = {n: i for i, n in enumerate(CHUNK_COLUMNS)}
+            wcur.executemany(
+                "INSERT OR IGNORE INTO telemetry_archived_keys VALUES(?, ?, ?, ?)",
+                _archived_keys(node_id, table[:, names["cycle"]], table[:, names["rsn_ts_ms"]], table[:, names["host_ms"]]),
+            )
+            wcur.execute(
+                f"DELETE FROM telemetry WHERE node_id = ? AND id <= ? AND {_EPOCH_MS_SQL} < ?",
+                (node_id, max_id, cutoff_ms),
+            )
+            self._conn.commit()
+            total_rows += len(fetched)
+        if self._log:
+            self._log.info("telemetry-archived", rows=total_rows, chunks=total_chunks, chunk_s=chunk_s)
+        return total_rows, total_chunks
+
+    def vacuum(self):
+        """Rebuild the DB file so pages freed by archiving are returned to the OS."""
+        self._conn.commit()
+        self._conn.execute("VACUUM;")
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        if self._log:
+            self._log.info("db-vacuum")
+
+    def read_columns(
+        self,
+        node_id: int,
+        since_epoch: Optional[float] = None,
+        until_epoch: Optional[float] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Columnar telemetry of one node in [since, until) by sample time, from
+        archived chunks (decoded whole) and the row table, in time order.
+        Keys are CHUNK_COLUMNS (or the requested subset); epoch_ms is always included.
+        """
+        names = list(dict.fromkeys(["epoch_ms"] + list(columns or CHUNK_COLUMNS)))
+        lo_ms = -(2**62) if since_epoch is None else int(since_epoch * 1000)
+        hi_ms = 2**62 if until_epoch is None else int(until_epoch * 1000)
+        cur = self._read_conn().cursor()
+        cur.execute(
+            """
+            SELECT data FROM telemetry_chunks
+            WHERE node_id = ? AND start_epoch < ? AND end_epoch > ?
+            ORDER BY start_epoch
+            """,
+            (int(node_id), hi_ms // 1000 + 1, lo_ms // 1000),
+        )
+        parts = [decode_chunk(r[0], names) for r in cur.fetchall()]
+        select = ", ".join({"epoch_ms": _EPOCH_MS_SQL, "host_ms": _HOST_MS_SQL}.get(n, n) for n in names)
+        cur.execute(
+            f"SELECT {select} FROM telemetry WHERE node_id = ? AND {_EPOCH_MS_SQL} >= ? AND {_EPOCH_MS_SQL} < ?",
+            (int(node_id), lo_ms, hi_ms),
+        )
+        fetched = cur.fetchall()
+        if fetched:
+            table = np.array(fetched, dtype=np.float64)
+            parts.append({n: table[:, j] for j, n in enumerate(names)})
+        if not parts:
+            return {n: np.empty(0, dtype=np.int64) for n in names}
+        out = {n: np.concatenate([p[n].astype(np.float64) for p in parts]) for n in names}
+        keep = (out["epoch_ms"] >= lo_ms) & (out["epoch_ms"] < hi_ms)
+        order = np.argsort(out["epoch_ms"][keep], kind="stable")
+        return {n: (v[keep][order] if np.isnan(v).any() else v[keep][order].astype(np.int64)) for n, v in out.items()}
+
+    def list_rollups(
+        self,
+        node_id: Optional[int] = None,
+        bucket_s: int = 3600,
+        since_epoch: Optional[int] = None,
+    ) -> List[Dict[str, object]]:
+        """Return materialized calibrated rollups, oldest bucket first."""
+        query = """
+            SELECT node_id, bucket_start, count,
+                   soil_mean, soil_min, soil_max,
+                   vbat_mean, vbat_min, vbat_max,
+                   ntc_mean, ntc_min, ntc_max
+            FROM telemetry_rollup
+            WHERE bucket_s = ?
+        """
+        params: List[object] = [int(bucket_s)]
+        if node_id is not None:
+            query += " AND node_id = ?"
+            params.append(int(node_id))
+        if since_epoch is not None:
+            query += " AND bucket_start >= ?"
+            params.append(int(since_epoch))
+        query += " ORDER BY node_id, bucket_start"
+        cur = self._read_conn().cursor()
+        cur.execute(query, params)
+        keys = ["node_id", "bucket_start", "count"] + [f"{s}_{stat}" for s in SENSORS for stat in ("mean", "min", "max")]
+        return [dict(zip(keys, r)) for r in cur.fetchall()]
+
+    def list_battery_series(self, bucket_s: int = 3600, since_epoch: Optional[int] = None) -> List[tuple]:
+        """(node_id, bucket_start, count, vbat_mean, ntc_mean) rollups of all nodes, by node then bucket."""
+        query = """
+            SELECT node_id, bucket_start, count, vbat_mean, ntc_mean
+            FROM telemetry_rollup
+            WHERE bucket_s = ? AND vbat_mean IS NOT NULL
+        """
+        params: List[object] = [int(bucket_s)]
+        if since_epoch is not None:
+            query += " AND bucket_start >= ?"
+            params.append(int(since_epoch))
+        query += " ORDER BY node_id, bucket_start"
+        cur = self._read_conn().cursor()
+        cur.execute(query, params)
+        return cur.fetchall()
@@ -4,7 +4,7 @@ Dialog for sending HANDSHAKE/CONFIG to a selected RSN node.
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, Optional
 
 from PySide6.QtWidgets import (
     QDialog,
@@ -22,6 +22,7 @@ from PySide6.QtWidgets import (
 from rsn_proto import RsnConfig
 
 from .controllers import GceBackendController
+from .rollout_panel import RolloutDialog
 
 
 class ConfigDialog(QDialog):
@@ -46,6 +47,7 @@ class ConfigDialog(QDialog):
         self._handshake_btn = QPushButton("Enviar HANDSHAKE", self)
         self._send_btn = QPushButton("Enviar CONFIG", self)
         self._defaults_btn = QPushButton("Restaurar defaults", self)
+        self._rollout_btn = QPushButton("Aplicar em vários nós...", self)
 
         self._build_layout()
         self._wire_signals()
@@ -76,6 +78,7 @@ class ConfigDialog(QDialog):
         bottom.addWidget(self._handshake_btn)
         bottom.addWidget(self._send_btn)
         bottom.addWidget(self._defaults_btn)
+        bottom.addWidget(self._rollout_btn)
         bottom.addStretch()
         bottom.addWidget(buttons)
 
@@ -88,6 +91,7 @@ class ConfigDialog(QDialog):
         self._handshake_btn.clicked.connect(self._on_handshake)
         self._send_btn.clicked.connect(self._on_send_config)
         self._defaults_btn.clicked.connect(self._load_defaults)
+        self._rollout_btn.clicked.connect(self._on_rollout)
 
     def _load_defaults(self):
         cfg = RsnConfig.from_dict(node_id=self._node_id, cfg={})
@@ -101,8 +105,8 @@ class ConfigDialog(QDialog):
         self._debug_mode.setValue(cfg.debug_mode)
         self._reset_flags.setValue(cfg.reset_flags)
 
-    def _current_cfg(self) -> RsnConfig:
-        data = {
+    def _current_profile(self) -> Dict[str, int]:
+        return {
             "sleep_time_s": self._sleep.value(),
             "pwr_up_time_ms": self._pwr_up.value(),
             "settling_time_ms": self._settle.value(),
@@ -113,14 +117,16 @@ class ConfigDialog(QDialog):
             "debug_mode": self._debug_mode.value(),
             "reset_flags": self._reset_flags.value(),
         }
-        return RsnConfig.from_dict(node_id=self._node_id, cfg=data)
+
+    def _current_cfg(self) -> RsnConfig:
+        return RsnConfig.from_dict(node_id=self._node_id, cfg=self._current_profile())
 
     def _on_handshake(self):
         ok = self._controller.send_handshake(self._node_id)
         if ok:
-            QMessageBox.information(self, "Handshake", f"Handshake enviado para nó {self._node_id}")
+            QMessageBox.information(self, "Handshake", f"Handshake enfileirado para nó {self._node_id} (enviado no próximo contato do nó)")
         else:
-            QMessageBox.warning(self, "Handshake", "Falha ao enviar handshake (verifique conexão)")
+            QMessageBox.warning(self, "Handshake", "Falha ao enfileirar handshake")
 
     def _on_send_config(self):
         try:
@@ -128,8 +134,25 @@ class ConfigDialog(QDialog):
         except Exception as exc:
             QMessageBox.warning(self, "Config", f"Config inválida: {exc}")
             return
-        ok = self._controller.send_config(self._node_id, cfg)
+        force = False
+        if self._controller.config_is_applied(self._node_id, cfg):
+            answer = QMessageBox.question(
+                self, "Config", f"Nó {self._node_id} já confirmou esta config. Reenviar mesmo assim?"
+            )
+            if answer != QMessageBox.Yes:
+                return
+            force = True
+        ok = self._controller.send_config(self._node_id, cfg, force=force)
         if ok:
-            QMessageBox.information(self, "Config", f"CONFIG enviado para nó {self._node_id}")
+            QMessageBox.information(self, "Config", f"CONFIG enfileirado para nó {self._node_id} (enviado no próximo contato do nó)")
         else:
-            QMessageBox.warning(self, "Config", "Falha ao enviar CONFIG (verifique conexão)")
+            QMessageBox.warning(self, "Config", "Falha ao enfileirar CONFIG")
+
+    def _on_rollout(self):
+        try:
+            self._current_cfg()
+        except Exception as exc:
+            QMessageBox.warning(self, "Config", f"Config inválida: {exc}")
+            return
+        dlg = RolloutDialog(self._controller, self._current_profile(), default_nodes=str(self._node_id), parent=self)
+        dlg.exec()
@@ -5,16 +5,37 @@ Backend controller that bridges TGW serial uplink, database, and Qt widgets.
 from __future__ import annotations
 
 import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import structlog
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QObject, QTimer, Signal
 
+from gce_backup import create_snapshot
+from gce_battery import (
+    BATTERY_EMPTY_MV,
+    DAY_S,
+    VBAT_DIVIDER_RATIO,
+    VBAT_VREF,
+    BatteryForecast,
+    forecast_fleet,
+    rollups_to_mv,
+)
+from gce_calib_utils import CalibrationCache
+from gce_clock import ClockAligner
+from gce_debug import DebugStreamRecorder, decode_chunks
+from gce_downlink import DownlinkCommand, DownlinkScheduler
+from gce_health import HealthDetector
+from gce_linkstats import LinkStatsTracker
+from gce_rollout import ConfigRollout, stage_rollout
 from gce_store import GceStore
 from rsn_proto import RsnConfig
 from tgw_proto import (
     UpConfigAckFrame,
+    UpDebugFrame,
     UpHelloFrame,
     UpTelemetryFrame,
     build_down_config_payload,
@@ -24,6 +45,10 @@ from tgw_proto import (
 from tgw_uplink_serial import TgwUplinkSerial
 
 from .models import NodeRow, TelemetryRow
+from .workers import AsyncQuery
+
+# intervalo de recálculo da previsão de bateria (fora da thread da GUI)
+FORECAST_INTERVAL_MS = 5 * 60 * 1000
 
 
 class GceBackendController(QObject):
@@ -35,12 +60,38 @@ class GceBackendController(QObject):
     telemetry_updated = Signal(int)
     log_message = Signal(str)
     connection_state_changed = Signal(bool, str)
+    health_event = Signal(int, str)
+    downlink_updated = Signal(int)
+    debug_updated = Signal(int)
+    forecast_updated = Signal()
 
     def __init__(self, db_path: Path | str = Path("gce_data.sqlite3"), parent: Optional[QObject] = None):
         super().__init__(parent)
         self._logger = structlog.get_logger("gce_ui")
         self._store = GceStore(Path(db_path), log=self._logger)
+        # serializes writes only; queries use the store's per-thread read connections
         self._store_lock = threading.Lock()
+        self._health = HealthDetector()
+        self._link_stats = LinkStatsTracker()
+        self._link_stats.seed(self._store.load_node_stats())
+        self._clock = ClockAligner()
+        self._downlink = DownlinkScheduler(self._write_payload, on_change=self._on_downlink_change)
+        self._debug = DebugStreamRecorder(self._store)
+        self._forecast_lock = threading.Lock()
+        self._forecast: Dict[int, BatteryForecast] = {}
+        self.battery_empty_mv = BATTERY_EMPTY_MV
+        # conversão do vbat bruto para nós sem calibração
+        self.vbat_vref = VBAT_VREF
+        self.vbat_divider_ratio = VBAT_DIVIDER_RATIO
+        self.battery_window_days = 14
+        self._forecast_query = AsyncQuery(self)
+        self._forecast_query.result_ready.connect(lambda _result: self.forecast_updated.emit())
+        self._forecast_query.error.connect(lambda msg: self._emit_log("forecast-failed", level="warning", err=msg))
+        self._forecast_timer = QTimer(self)
+        self._forecast_timer.setInterval(FORECAST_INTERVAL_MS)
+        self._forecast_timer.timeout.connect(self._schedule_forecast)
+        self._forecast_timer.start()
+        QTimer.singleShot(0, self._schedule_forecast)
         self._link: Optional[TgwUplinkSerial] = None
         self._connected_port: Optional[str] = None
         self._baud: Optional[int] = None
@@ -52,7 +103,10 @@ class GceBackendController(QObject):
 
     def shutdown(self):
         """Close serial link and DB."""
+        self._forecast_timer.stop()
+        self._forecast_query.cancel()
         self.disconnect_from_tgw()
+        self.flush_debug_streams()
         self._store.close()
 
     def connect_to_tgw(self, port: str, baud: int) -> bool:
@@ -61,6 +115,7 @@ class GceBackendController(QObject):
         try:
             self._link = TgwUplinkSerial(port, baudrate=baud, log=self._logger)
             self._link.open()
+            self._link.start_writer()
             self._link.start_reader(self._on_payload)
         except Exception as exc:
             self._emit_log("connection-error", level="error", err=str(exc))
@@ -88,45 +143,245 @@ class GceBackendController(QObject):
         self.connection_state_changed.emit(False, "Desconectado")
 
     def list_nodes(self) -> List[NodeRow]:
-        """Return all known nodes."""
-        with self._store_lock:
-            return self._store.list_nodes()
+        """Return all known nodes (in-memory caches: no SQL, no writer lock) with their battery forecast."""
+        nodes = self._store.list_nodes()
+        forecast = self.battery_forecast()
+        for node in nodes:
+            fc = forecast.get(int(node["node_id"]))
+            node["days_left"] = fc.days_to_empty if fc is not None else None
+        return nodes
+
+    def latest_readings(self) -> List[Dict[str, object]]:
+        """Last telemetry values and counts per node (store's in-memory cache, no SQL)."""
+        return self._store.latest_readings()
+
+    def battery_forecast(self) -> Dict[int, BatteryForecast]:
+        """Last computed days-to-empty per node (no SQL; see refresh_battery_forecast)."""
+        with self._forecast_lock:
+            return self._forecast
+
+    def refresh_battery_forecast(self) -> Dict[int, BatteryForecast]:
+        """
+        Recompute the forecast from calibrated hourly rollups; nodes without a
+        vbat calibration use the divider conversion (vbat_vref,
+        vbat_divider_ratio). Runs on the pool every FORECAST_INTERVAL_MS.
+        """
+        now = time.time()
+        self.materialize_rollups(3600)
+        since = int(now - self.battery_window_days * DAY_S)
+        cache = self.calibration_cache()
+        rows = rollups_to_mv(
+            self._store.list_battery_series(3600, since_epoch=since),
+            lambda node_id: cache.has(node_id, "vbat"),
+            vref=self.vbat_vref,
+            divider_ratio=self.vbat_divider_ratio,
+        )
+        forecast = forecast_fleet(rows, empty_level=self.battery_empty_mv, now_epoch=now)
+        with self._forecast_lock:
+            self._forecast = forecast
+        return forecast
+
+    def _schedule_forecast(self):
+        self._forecast_query.submit(self.refresh_battery_forecast)
+
+    def ingest_stats(self) -> Dict[str, int]:
+        """Frames inserted and duplicates dropped since the DB was opened."""
+        return self._store.ingest_stats()
 
     def list_recent_telemetry(self, node_id: int, limit: int = 100) -> List[TelemetryRow]:
         """Return last telemetry rows for a node."""
+        return self._store.list_recent_telemetry(node_id, limit=limit)
+
+    def list_telemetry_page(
+        self,
+        node_id: int,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: int = 200,
+    ) -> List[TelemetryRow]:
+        """Return one keyset page of telemetry rows for a node, newest first."""
+        return self._store.list_telemetry_page(node_id, before_id=before_id, after_id=after_id, limit=limit)
+
+    def fleet_rollup(self, since_epoch: int, bucket_s: int) -> List[tuple]:
+        """Per-node, per-bucket sums and per-sensor counts of mean values for the fleet overview."""
+        return self._store.fleet_rollup(since_epoch, bucket_s)
+
+    def max_telemetry_id(self) -> int:
+        """Highest telemetry row id (0 when empty)."""
+        return self._store.max_telemetry_id()
+
+    def list_telemetry_means_after(self, after_id: int, limit: int = 5000) -> List[tuple]:
+        """Mean values of rows of all nodes inserted after after_id."""
+        return self._store.list_telemetry_means_after(after_id, limit=limit)
+
+    def calibration_cache(self) -> CalibrationCache:
+        """Coefficients in effect now; refreshed in place when the calibration table changes."""
+        return self._store.calibration_cache()
+
+    def set_calibration(
+        self,
+        node_id: int,
+        sensor: str,
+        slope: float,
+        offset: float,
+        effective_from: Optional[datetime] = None,
+    ):
+        """Store new linear coefficients for a node/sensor."""
         with self._store_lock:
-            return self._store.list_recent_telemetry(node_id, limit=limit)
+            self._store.set_calibration(node_id, sensor, slope, offset, effective_from=effective_from)
+        self._emit_log("calibration-set", node_id=node_id, sensor=sensor, slope=slope, offset=offset)
 
-    def send_config(self, node_id: int, cfg: RsnConfig) -> bool:
-        """Send configuration frame to a node."""
-        if not self._link:
-            self._emit_log("send-config-failed", level="warning", reason="not-connected")
-            return False
-        payload = build_down_config_payload(node_id, cfg)
-        try:
-            self._link.send_payload(payload)
-        except Exception as exc:
-            self._emit_log("send-config-error", level="error", err=str(exc))
-            return False
-        self._emit_log("config-sent", node_id=node_id)
-        return True
+    def create_snapshot(self, out_dir: Path | str) -> Path:
+        """
+        Read-only point-in-time copy of the DB into out_dir (see gce_backup).
+        Needs no writer lock: ingest keeps running during the copy.
+        """
+        t0 = time.perf_counter()
+        path = create_snapshot(self._store.db_path, Path(out_dir))
+        self._emit_log("snapshot-created", path=str(path), seconds=round(time.perf_counter() - t0, 1))
+        return path
 
-    def send_handshake(self, node_id: int) -> bool:
-        """Send optional handshake frame."""
-        if not self._link:
-            self._emit_log("send-handshake-failed", level="warning", reason="not-connected")
-            return False
-        payload = build_down_handshake_payload(node_id)
-        try:
-            self._link.send_payload(payload)
-        except Exception as exc:
-            self._emit_log("send-handshake-error", level="error", err=str(exc))
+    def materialize_rollups(self, bucket_s: int = 3600) -> int:
+        """Bring calibrated rollups up to date (the writer lock is only held for the writes)."""
+        return self._store.materialize_rollups(bucket_s, lock=self._store_lock)
+
+    def list_rollups(
+        self, node_id: Optional[int] = None, bucket_s: int = 3600, since_epoch: Optional[int] = None
+    ) -> List[Dict[str, object]]:
+        """Return materialized calibrated rollups."""
+        return self._store.list_rollups(node_id, bucket_s=bucket_s, since_epoch=since_epoch)
+
+    def list_debug_sessions(self, node_id: Optional[int] = None) -> List[Dict[str, object]]:
+        """Recorded DEBUG sample sessions, newest first."""
+        return self._store.list_debug_sessions(node_id)
+
+    def load_debug_stream(self, session_id: int, channel: int):
+        """(t_ms node clock, uint16 samples, lost blocks) of one session/channel."""
+        return decode_chunks(self._store.load_debug_chunks(session_id, channel))
+
+    def list_telemetry_between(self, node_id: int, since: str, until: str) -> List[TelemetryRow]:
+        """Telemetry summaries of a node received in [since, until] (ISO UTC)."""
+        return self._store.list_telemetry_between(node_id, since, until)
+
+    def flush_debug_streams(self) -> int:
+        """Write buffered DEBUG samples now (e.g. before viewing them)."""
+        with self._store_lock:
+            return self._debug.flush()
+
+    def list_health_events(self, node_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, object]]:
+        """Return recent anomaly/health events, newest first."""
+        return self._store.list_health_events(node_id, limit=limit)
+
+    def send_config(self, node_id: int, cfg: RsnConfig, immediate: bool = False, force: bool = False) -> bool:
+        """
+        Queue a configuration frame for the node's next wake-up (or send it now).
+        Skipped, unless force is set, when the node already acked the same bytes.
+        """
+        cfg_bytes = cfg.to_bytes()
+        with self._store_lock:
+            self._store.set_desired_configs({node_id: cfg_bytes})
+        if not force and not cfg.reset_flags and self.config_is_applied(node_id, cfg):
+            self._emit_log("config-unchanged", node_id=node_id)
+            return True
+        return self._send_downlink(node_id, "config", build_down_config_payload(node_id, cfg), immediate)
+
+    def config_is_applied(self, node_id: int, cfg: RsnConfig) -> bool:
+        """True when the node's last acknowledged config equals cfg."""
+        return not self._store.nodes_needing_config({node_id: cfg.to_bytes()})
+
+    def list_node_configs(self) -> List[Dict[str, object]]:
+        """Desired/sent/applied config per node."""
+        return self._store.list_node_configs()
+
+    def send_handshake(self, node_id: int, immediate: bool = False) -> bool:
+        """Queue an optional handshake frame for the node's next wake-up (or send it now)."""
+        return self._send_downlink(node_id, "handshake", build_down_handshake_payload(node_id), immediate)
+
+    def start_rollout(
+        self,
+        node_ids: List[int],
+        profile: Dict[str, int],
+        *,
+        max_in_flight: int = 16,
+        pace_s: float = 0.5,
+        handshake: bool = False,
+        force: bool = False,
+    ) -> ConfigRollout:
+        """
+        Apply one config profile to many nodes; drive the result with tick().
+        pace_s becomes the minimum interval between downlink writes on the link.
+        """
+        with self._store_lock:
+            configs, to_send, unchanged = stage_rollout(self._store, node_ids, profile, force=force)
+        rollout = ConfigRollout(
+            self._downlink,
+            to_send,
+            lambda n: build_down_config_payload(n, configs[n]),
+            max_in_flight=max_in_flight,
+            handshake_payload=build_down_handshake_payload if handshake else None,
+            unchanged=unchanged,
+        )
+        self._downlink.pace_s = float(pace_s)
+        self._emit_log(
+            "rollout-started", nodes=len(to_send), unchanged=len(unchanged), max_in_flight=max_in_flight, pace_s=pace_s
+        )
+        return rollout
+
+    def pending_downlink(self, node_id: Optional[int] = None) -> List[DownlinkCommand]:
+        """Commands waiting for a wake-up or for their CONFIG_ACK."""
+        return self._downlink.pending(node_id)
+
+    def cancel_downlink(self, node_id: int) -> int:
+        """Drop queued commands of a node."""
+        return self._downlink.cancel(node_id)
+
+    def _send_downlink(self, node_id: int, kind: str, payload: bytes, immediate: bool) -> bool:
+        if not immediate:
+            self._downlink.enqueue(node_id, kind, payload)
+            return True
+        if self._link is None:
+            self._emit_log(f"send-{kind}-failed", level="warning", reason="not-connected")
             return False
-        self._emit_log("handshake-sent", node_id=node_id)
+        # não bloqueia quem chama (thread da GUI): o resultado chega pelo Future
+        future = self._write_payload(payload)
+        future.add_done_callback(lambda f: self._on_immediate_written(node_id, kind, f))
         return True
 
+    def _on_immediate_written(self, node_id: int, kind: str, future: Future):
+        exc = None if future.cancelled() else future.exception()
+        if exc is not None:
+            self._emit_log(f"send-{kind}-error", level="error", node_id=node_id, err=str(exc) or type(exc).__name__)
+        else:
+            self._emit_log(f"{kind}-sent", node_id=node_id)
+
+    def _write_payload(self, payload: bytes) -> Future:
+        """Queue a payload on the link's writer thread."""
+        link = self._link
+        if link is None:
+            future: Future = Future()
+            future.set_exception(RuntimeError("not-connected"))
+            return future
+        return link.submit_payload(payload)
+
+    def _on_downlink_change(self, cmd: DownlinkCommand):
+        fields: Dict[str, object] = {"node_id": cmd.node_id, "kind": cmd.kind, "attempt": cmd.attempts}
+        if cmd.ack_status is not None:
+            fields["status"] = cmd.ack_status
+        if cmd.error:
+            fields["err"] = cmd.error
+        level = "warning" if cmd.state == "failed" or cmd.error else "info"
+        self._emit_log(f"downlink-{cmd.state}", level=level, **fields)
+        if cmd.state == "sent" and cmd.config_bytes is not None:
+            try:
+                with self._store_lock:
+                    self._store.mark_config_sent(cmd.node_id, cmd.config_bytes)
+            except Exception as exc:
+                self._emit_log("store-error", level="error", err=str(exc))
+        self.downlink_updated.emit(cmd.node_id)
+
     def _on_payload(self, payload: bytes):
         """Handle raw payload from serial reader thread."""
+        host_ms = int(time.time() * 1000)
         try:
             frame = parse_up_payload(payload)
         except Exception as exc:
@@ -135,24 +390,57 @@ class GceBackendController(QObject):
 
         try:
             if isinstance(frame, UpHelloFrame):
+                # o nó só escuta logo após transmitir: libera a fila antes de gravar
+                self._downlink.on_uplink(frame.node_id)
                 with self._store_lock:
                     self._store.upsert_node(frame.node_id, frame.rssi, frame.hello)
                 self.node_updated.emit(frame.node_id)
                 self._emit_log("hello-received", node_id=frame.node_id, rssi=frame.rssi)
             elif isinstance(frame, UpTelemetryFrame):
+                self._downlink.on_uplink(frame.node_id)
+                event_ts_ms = self._clock.align(frame.node_id, frame.tgw_local_ts_ms, frame.telemetry.ts_ms, host_ms)
+                events = []
                 with self._store_lock:
-                    self._store.add_telemetry(frame.node_id, frame.rssi, frame.tgw_local_ts_ms, frame.telemetry)
-                    self._store.touch_node(frame.node_id, frame.rssi, frame.telemetry.header.hw_version, frame.telemetry.header.fw_version)
+                    stats = self._link_stats.update(frame.node_id, frame.telemetry.cycle, frame.rssi)
+                    stored = self._store.add_telemetry(
+                        frame.node_id,
+                        frame.rssi,
+                        frame.tgw_local_ts_ms,
+                        frame.telemetry,
+                        event_ts_ms=event_ts_ms,
+                        stats=stats,
+                    )
+                    if stored:
+                        # cópias repetidas não alimentam o detector de anomalias
+                        events = self._health.update(frame.node_id, frame.telemetry)
+                        self._store.touch_node(frame.node_id, frame.rssi, frame.telemetry.header.hw_version, frame.telemetry.header.fw_version)
+                        self._store.add_health_events(events)
+                if not stored:
+                    self._emit_log("telemetry-duplicate", node_id=frame.node_id, cycle=frame.telemetry.cycle)
+                    return
                 self.telemetry_updated.emit(frame.node_id)
+                for event in events:
+                    self.health_event.emit(event.node_id, event.kind)
+                    self._emit_log("health-event", level="warning", node_id=event.node_id, detail=event.describe())
                 self._emit_log(
                     "telemetry-received",
                     node_id=frame.node_id,
                     rssi=frame.rssi,
                     tgw_ts_ms=frame.tgw_local_ts_ms,
                 )
+            elif isinstance(frame, UpDebugFrame):
+                # alta taxa: sem log por bloco, sinal só quando um chunk é gravado
+                self._downlink.on_uplink(frame.node_id)
+                with self._store_lock:
+                    written = self._debug.add(frame)
+                if written:
+                    self.debug_updated.emit(frame.node_id)
             elif isinstance(frame, UpConfigAckFrame):
+                cmd = self._downlink.on_config_ack(frame.node_id, frame.ack.status)
                 with self._store_lock:
-                    self._store.add_config_ack(frame.node_id, frame.rssi, frame.ack)
+                    self._store.add_config_ack(
+                        frame.node_id, frame.rssi, frame.ack, cfg=cmd.config_bytes if cmd else None
+                    )
                     self._store.touch_node(frame.node_id, frame.rssi, frame.ack.header.hw_version, frame.ack.header.fw_version)
                 self.node_updated.emit(frame.node_id)
                 self._emit_log("config-ack-received", node_id=frame.node_id, status=frame.ack.status)
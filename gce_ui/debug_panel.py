@@ -0,0 +1,153 @@
+"""
+Viewer for recorded RSN DEBUG sample streams.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+import pyqtgraph as pg
+from PySide6.QtWidgets import QComboBox, QDialog, QHBoxLayout, QLabel, QPushButton, QVBoxLayout
+
+from gce_debug import channel_name
+from rsn_proto import DEBUG_CHANNELS
+
+from .controllers import GceBackendController
+from .workers import AsyncQuery
+
+
+class DebugStreamDialog(QDialog):
+    """
+    Raw debug samples of one node session/channel, with the node's telemetry
+    summaries (mean, min..max) received during the session on the same time axis.
+    """
+
+    def __init__(self, controller: GceBackendController, node_id: int, parent=None):
+        super().__init__(parent)
+        self._controller = controller
+        self._node_id = node_id
+        self._sessions: List[Dict[str, object]] = []
+        self._sessions_query = AsyncQuery(self)
+        self._stream_query = AsyncQuery(self)
+        self.setWindowTitle(f"Amostras de debug – nó {node_id}")
+
+        self._session_combo = QComboBox(self)
+        self._channel_combo = QComboBox(self)
+        for i, name in enumerate(DEBUG_CHANNELS):
+            self._channel_combo.addItem(name, i)
+        self._reload_btn = QPushButton("Atualizar", self)
+        self._stats = QLabel("", self)
+
+        self._plot = pg.PlotWidget(self)
+        self._plot.showGrid(x=True, y=True, alpha=0.3)
+        self._plot.setLabel("bottom", "tempo do nó (s)")
+        self._plot.setLabel("left", "ADC bruto")
+        self._plot.addLegend()
+        self._raw_curve = self._plot.plot([], [], pen=pg.mkPen("#4c9be8"), name="amostras")
+        self._raw_curve.setDownsampling(auto=True, method="peak")
+        self._raw_curve.setClipToView(True)
+        self._mean_points = self._plot.plot(
+            [], [], pen=None, symbol="o", symbolSize=7, symbolBrush="#e8604c", name="média (telemetria)"
+        )
+        self._range_bars = pg.ErrorBarItem(x=np.empty(0), y=np.empty(0), pen=pg.mkPen("#e8604c"), beam=0.0)
+        self._plot.addItem(self._range_bars)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Sessão", self))
+        top.addWidget(self._session_combo, stretch=1)
+        top.addWidget(QLabel("Canal", self))
+        top.addWidget(self._channel_combo)
+        top.addWidget(self._reload_btn)
+        layout = QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self._plot, stretch=1)
+        layout.addWidget(self._stats)
+        self.resize(900, 520)
+
+        self._sessions_query.result_ready.connect(self._on_sessions)
+        self._stream_query.result_ready.connect(self._on_stream)
+        self._stream_query.error.connect(lambda msg: self._stats.setText(f"Erro: {msg}"))
+        self._session_combo.currentIndexChanged.connect(self._load_stream)
+        self._channel_combo.currentIndexChanged.connect(self._load_stream)
+        self._reload_btn.clicked.connect(self.reload)
+        controller.debug_updated.connect(self._on_debug_updated)
+        self.reload()
+
+    def reload(self):
+        node_id = self._node_id
+        self._sessions_query.submit(lambda: self._controller.list_debug_sessions(node_id))
+
+    def _on_debug_updated(self, node_id: int):
+        # só acompanha ao vivo quando a sessão mais recente está aberta
+        if node_id == self._node_id and self._session_combo.currentIndex() <= 0:
+            self.reload()
+
+    def _on_sessions(self, sessions):
+        if sessions is None:
+            return
+        current = self._session_combo.currentData()
+        self._sessions = sessions
+        self._session_combo.blockSignals(True)
+        self._session_combo.clear()
+        for s in sessions:
+            self._session_combo.addItem(
+                f"#{s['session_id']} (sessão {s['rsn_session']}) {s['started_at']} – "
+                f"{s['samples']} amostras, {s['lost_blocks']} blocos perdidos",
+                s["session_id"],
+            )
+        index = self._session_combo.findData(current) if current is not None else 0
+        self._session_combo.setCurrentIndex(max(index, 0))
+        self._session_combo.blockSignals(False)
+        if not sessions:
+            self._stats.setText("Nenhuma sessão de debug gravada para este nó.")
+            return
+        self._load_stream()
+
+    def _load_stream(self):
+        session_id = self._session_combo.currentData()
+        if session_id is None:
+            return
+        session = next(s for s in self._sessions if s["session_id"] == session_id)
+        channel = self._channel_combo.currentData()
+        node_id = self._node_id
+        controller = self._controller
+        # a sessão mais recente pode ainda estar recebendo blocos
+        until = "9999" if self._session_combo.currentIndex() == 0 else str(session["last_at"])
+
+        def query():
+            controller.flush_debug_streams()
+            t_ms, samples, lost = controller.load_debug_stream(session_id, channel)
+            summaries = controller.list_telemetry_between(node_id, str(session["started_at"]), until)
+            return session_id, channel, t_ms, samples, lost, summaries
+
+        self._stream_query.submit(query)
+
+    def _on_stream(self, result):
+        if result is None:
+            return
+        session_id, channel, t_ms, samples, lost, summaries = result
+        name = channel_name(channel)
+        x = t_ms / 1000.0
+        self._raw_curve.setData(x, samples.astype(np.float64))
+
+        rows = [r for r in summaries if r.get("rsn_ts_ms") is not None and r.get(f"{name}_mean") is not None]
+        if rows:
+            sx = np.array([r["rsn_ts_ms"] for r in rows], dtype=np.float64) / 1000.0
+            mean = np.array([r[f"{name}_mean"] for r in rows], dtype=np.float64)
+            lo = np.array([r[f"{name}_min"] for r in rows], dtype=np.float64)
+            hi = np.array([r[f"{name}_max"] for r in rows], dtype=np.float64)
+            self._mean_points.setData(sx, mean)
+            self._range_bars.setData(x=sx, y=mean, top=hi - mean, bottom=mean - lo)
+        else:
+            self._mean_points.setData([], [])
+            self._range_bars.setData(x=np.empty(0), y=np.empty(0))
+
+        if samples.size:
+            self._stats.setText(
+                f"{name}: {samples.size} amostras, média {samples.mean():.1f}, desvio {samples.std():.1f}, "
+                f"min {samples.min()}, max {samples.max()}, {lost} blocos perdidos; "
+                f"{len(rows)} resumos de telemetria na sessão"
+            )
+        else:
+            self._stats.setText(f"{name}: sem amostras nesta sessão")
@@ -0,0 +1,171 @@
+"""
+Fleet overview: node x time heatmap of soil/vbat/ntc means for all nodes.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pyqtgraph as pg
+from PySide6.QtCore import QRectF, QTimer
+from PySide6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+
+from gce_series import SENSORS, FleetGrid
+
+from .controllers import GceBackendController
+from .workers import AsyncQuery
+
+# janela -> (tamanho do bucket em s, número de buckets)
+FLEET_WINDOWS = {
+    "6h": (300, 72),
+    "24h": (900, 96),
+    "7d": (3600, 168),
+}
+
+
+class FleetOverviewPanel(QWidget):
+    """
+    Heatmap with one row per node and one column per time bucket.
+
+    The grid is loaded once per window from a SQL rollup, then only rows
+    newer than the last seen id are folded in as telemetry arrives. The
+    whole fleet is drawn as a single ImageItem. The status line (nodes
+    active in the last hour, fleet median of the latest value) comes from the
+    store's in-memory latest-state cache.
+    """
+
+    def __init__(self, controller: GceBackendController, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self._controller = controller
+        self._grid: Optional[FleetGrid] = None
+
+        self._sensor_combo = QComboBox(self)
+        self._sensor_combo.addItems(list(SENSORS))
+        self._window_combo = QComboBox(self)
+        self._window_combo.addItems(list(FLEET_WINDOWS))
+        self._window_combo.setCurrentText("24h")
+        self._status_label = QLabel("", self)
+
+        self._plot = pg.PlotWidget(self)
+        self._plot.setLabel("bottom", "tempo", "h")
+        self._plot.setLabel("left", "nó")
+        self._plot.invertY(True)
+        self._image = pg.ImageItem()
+        self._image.setColorMap(pg.colormap.get("viridis"))
+        self._plot.addItem(self._image)
+
+        self._load_query = AsyncQuery(self)
+        self._load_query.result_ready.connect(self._on_loaded)
+        self._load_query.error.connect(self._on_query_error)
+        self._tail_query = AsyncQuery(self)
+        self._tail_query.result_ready.connect(self._on_tail)
+        self._tail_query.error.connect(self._on_query_error)
+
+        # agrupa rajadas de telemetria numa única consulta incremental
+        self._tail_timer = QTimer(self)
+        self._tail_timer.setSingleShot(True)
+        self._tail_timer.setInterval(1000)
+        self._tail_timer.timeout.connect(self._fetch_tail)
+
+        self._layout_widgets()
+        self._sensor_combo.currentTextChanged.connect(lambda _text: self._render())
+        self._window_combo.currentTextChanged.connect(lambda _text: self.reload())
+        self._controller.telemetry_updated.connect(self._on_telemetry_updated)
+
+    def reload(self):
+        """Rebuild the grid for the selected window from a store rollup."""
+        bucket_s, n_buckets = FLEET_WINDOWS[self._window_combo.currentText()]
+        self._tail_query.cancel()
+        now = time.time()
+        grid = FleetGrid(bucket_s, n_buckets)
+        grid.reset(now)
+        controller = self._controller
+
+        def load():
+            max_id = controller.max_telemetry_id()
+            grid.add_rollup(controller.fleet_rollup(grid.t0, bucket_s))
+            grid.last_id = max(grid.last_id, max_id)
+            return grid
+
+        self._load_query.submit(load)
+
+    def _layout_widgets(self):
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Sensor:", self))
+        top.addWidget(self._sensor_combo)
+        top.addWidget(QLabel("Janela:", self))
+        top.addWidget(self._window_combo)
+        top.addStretch()
+        top.addWidget(self._status_label)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.addLayout(top)
+        layout.addWidget(self._plot, stretch=1)
+        self.setLayout(layout)
+
+    def _on_loaded(self, grid: FleetGrid):
+        self._grid = grid
+        self._render()
+
+    def _on_telemetry_updated(self, _node_id: int):
+        if self._grid is not None and not self._tail_timer.isActive():
+            self._tail_timer.start()
+
+    def _fetch_tail(self):
+        grid = self._grid
+        if grid is None:
+            return
+        after_id = grid.last_id
+        self._tail_query.submit(lambda: (grid, self._controller.list_telemetry_means_after(after_id)))
+
+    def _on_tail(self, result):
+        grid, rows = result
+        if grid is not self._grid:
+            return
+        grid.advance(time.time())
+        grid.add_samples(rows)
+        self._render()
+        if len(rows) >= 5000:
+            self._fetch_tail()
+
+    def _render(self):
+        grid = self._grid
+        if grid is None:
+            return
+        node_ids = grid.node_ids()
+        self._status_label.setText(self._latest_summary(node_ids.size))
+        if node_ids.size == 0:
+            self._image.clear()
+            return
+        img = grid.image(self._sensor_combo.currentText(), node_ids)
+        finite = img[np.isfinite(img)]
+        levels = (0.0, 1.0)
+        if finite.size:
+            lo, hi = np.percentile(finite, [2, 98])
+            levels = (float(lo), float(hi) if hi > lo else float(lo) + 1.0)
+        # ImageItem indexa [x, y]: tempo no eixo x, nós no eixo y
+        self._image.setImage(img.T, levels=levels, autoLevels=False)
+        span_h = grid.span_s / 3600.0
+        self._image.setRect(QRectF(-span_h, 0, span_h, float(node_ids.size)))
+        step = max(1, node_ids.size // 25)
+        ticks = [(i + 0.5, str(int(n))) for i, n in enumerate(node_ids) if i % step == 0]
+        self._plot.getAxis("left").setTicks([ticks])
+
+    def _latest_summary(self, n_nodes: int) -> str:
+        sensor = self._sensor_combo.currentText()
+        latest = self._controller.latest_readings()
+        # last_seen é ISO UTC sem tzinfo: comparação de strings basta
+        cutoff = datetime.utcfromtimestamp(time.time() - 3600).isoformat()
+        active = sum(1 for r in latest if r["last_seen"] and r["last_seen"] >= cutoff)
+        values = [r[f"{sensor}_mean"] for r in latest if r[f"{sensor}_mean"] is not None]
+        text = f"{n_nodes} nós, {active} ativos na última hora"
+        if values:
+            text += f", último {sensor}: mediana {float(np.median(values)):.0f}"
+        return text
+
+    def _on_query_error(self, message: str):
+        self._controller.log_message.emit(f"fleet-query-failed err={message}")
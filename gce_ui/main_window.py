@@ -4,16 +4,29 @@ Main window composition for the GCE Dashboard.
 
 from __future__ import annotations
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QThreadPool, Qt
 from PySide6.QtGui import QAction
-from PySide6.QtWidgets import QHBoxLayout, QPushButton, QMainWindow, QMessageBox, QSplitter, QVBoxLayout, QWidget
+from PySide6.QtWidgets import (
+    QFileDialog,
+    QHBoxLayout,
+    QPushButton,
+    QMainWindow,
+    QMessageBox,
+    QSplitter,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget,
+)
 
 from .connection_panel import ConnectionPanel
 from .controllers import GceBackendController
 from .config_panel import ConfigDialog
+from .debug_panel import DebugStreamDialog
+from .fleet_panel import FleetOverviewPanel
 from .log_panel import LogPanel
 from .nodes_panel import NodesPanel
 from .telemetry_panel import TelemetryPanel
+from .workers import AsyncQuery
 
 
 class MainWindow(QMainWindow):
@@ -27,18 +40,27 @@ class MainWindow(QMainWindow):
         self._connection_panel = ConnectionPanel(self._controller)
         self._nodes_panel = NodesPanel(self._controller)
         self._telemetry_panel = TelemetryPanel(self._controller)
+        self._fleet_panel = FleetOverviewPanel(self._controller)
         self._log_panel = LogPanel()
         self._config_btn = QPushButton("Configurar nó...", self)
         self._config_btn.setEnabled(False)
+        self._debug_btn = QPushButton("Amostras de debug...", self)
+        self._debug_btn.setEnabled(False)
         self._current_node_id = None
+        # o snapshot usa sua própria conexão de leitura: a ingestão continua durante a cópia
+        self._snapshot_query = AsyncQuery(self)
+        self._snapshot_query.error.connect(lambda msg: self._log_panel.append_log(f"snapshot-failed err={msg}"))
 
         self._build_menu()
         self._wire_signals()
         self._build_layout()
 
         self._nodes_panel.refresh()
+        self._fleet_panel.reload()
 
     def closeEvent(self, event):  # type: ignore[override]
+        # let in-flight panel queries finish before the store is closed
+        QThreadPool.globalInstance().waitForDone(2000)
         self._controller.shutdown()
         super().closeEvent(event)
 
@@ -46,6 +68,10 @@ class MainWindow(QMainWindow):
         menu_bar = self.menuBar()
 
         file_menu = menu_bar.addMenu("Arquivo")
+        snapshot_action = QAction("Criar snapshot do banco...", self)
+        snapshot_action.triggered.connect(self._create_snapshot)
+        file_menu.addAction(snapshot_action)
+        file_menu.addSeparator()
         exit_action = QAction("Sair", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -61,13 +87,17 @@ class MainWindow(QMainWindow):
         top = QHBoxLayout()
         top.addWidget(self._connection_panel, stretch=1)
         top.addStretch()
+        top.addWidget(self._debug_btn)
         top.addWidget(self._config_btn)
         layout.addLayout(top)
 
         vertical_split = QSplitter(Qt.Vertical, central)
         horizontal_split = QSplitter(Qt.Horizontal, vertical_split)
         horizontal_split.addWidget(self._nodes_panel)
-        horizontal_split.addWidget(self._telemetry_panel)
+        tabs = QTabWidget(horizontal_split)
+        tabs.addTab(self._telemetry_panel, "Telemetria")
+        tabs.addTab(self._fleet_panel, "Frota")
+        horizontal_split.addWidget(tabs)
         horizontal_split.setStretchFactor(0, 1)
         horizontal_split.setStretchFactor(1, 1)
 
@@ -84,9 +114,11 @@ class MainWindow(QMainWindow):
         self._nodes_panel.node_selected.connect(self._on_node_selected)
         self._controller.node_updated.connect(self._handle_node_updated)
         self._controller.telemetry_updated.connect(self._handle_telemetry_updated)
+        self._controller.forecast_updated.connect(self._nodes_panel.refresh)
         self._controller.log_message.connect(self._log_panel.append_log)
         self._controller.connection_state_changed.connect(self._connection_panel.update_status)
         self._config_btn.clicked.connect(self._open_config_dialog)
+        self._debug_btn.clicked.connect(self._open_debug_dialog)
 
     def _handle_node_updated(self, node_id: int):
         self._nodes_panel.refresh()
@@ -100,6 +132,13 @@ class MainWindow(QMainWindow):
         self._nodes_panel.refresh()
         self._update_config_btn_state()
 
+    def _create_snapshot(self):
+        out_dir = QFileDialog.getExistingDirectory(self, "Pasta para o snapshot")
+        if not out_dir:
+            return
+        controller = self._controller
+        self._snapshot_query.submit(lambda: controller.create_snapshot(out_dir))
+
     def _show_about(self):
         QMessageBox.information(
             self,
@@ -109,6 +148,7 @@ class MainWindow(QMainWindow):
 
     def _update_config_btn_state(self):
         self._config_btn.setEnabled(self._nodes_panel.current_node_id is not None)
+        self._debug_btn.setEnabled(self._nodes_panel.current_node_id is not None)
 
     def _on_node_selected(self, node_id: int):
         self._current_node_id = node_id
@@ -121,3 +161,10 @@ class MainWindow(QMainWindow):
             return
         dlg = ConfigDialog(self._controller, node_id, self)
         dlg.exec()
+
+    def _open_debug_dialog(self):
+        node_id = self._nodes_panel.current_node_id
+        if node_id is None:
+            return
+        dlg = DebugStreamDialog(self._controller, node_id, self)
+        dlg.show()
@@ -6,16 +6,31 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
 
 NodeRow = Dict[str, Any]
 TelemetryRow = Dict[str, Any]
 
+TELEMETRY_PAGE_SIZE = 200
+# linhas mantidas em memória; páginas além disso são descartadas e relidas ao voltar
+TELEMETRY_MAX_ROWS = 10 * TELEMETRY_PAGE_SIZE
+
 
 class NodesTableModel(QAbstractTableModel):
     """Table model for RSN nodes stored in the database."""
 
-    headers = ["node_id", "last_seen", "last_rssi", "hw_version", "fw_version", "capabilities"]
+    headers = [
+        "node_id",
+        "last_seen",
+        "last_rssi",
+        "rssi_avg",
+        "loss_pct",
+        "reboots",
+        "days_left",
+        "hw_version",
+        "fw_version",
+        "capabilities",
+    ]
 
     def __init__(self, nodes: Optional[List[NodeRow]] = None, parent=None):
         super().__init__(parent)
@@ -33,7 +48,13 @@ class NodesTableModel(QAbstractTableModel):
         key = self.headers[index.column()]
         value = self._nodes[index.row()].get(key, "")
         if key == "capabilities":
-            return f"0x{int(value):04X}"
+            return "-" if value is None else f"0x{int(value):04X}"
+        if value is None:
+            return "-"
+        if key == "loss_pct":
+            return f"{value:.1f}%"
+        if key == "days_left":
+            return ">365" if value > 365 else f"{value:.1f}"
         return str(value)
 
     def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):  # type: ignore[override]
@@ -43,6 +64,10 @@ class NodesTableModel(QAbstractTableModel):
             "node_id": "Node",
             "last_seen": "Last Seen (UTC)",
             "last_rssi": "RSSI",
+            "rssi_avg": "RSSI avg",
+            "loss_pct": "Loss",
+            "reboots": "Reboots",
+            "days_left": "Batt (days)",
             "hw_version": "HW",
             "fw_version": "FW",
             "capabilities": "Caps",
@@ -51,10 +76,18 @@ class NodesTableModel(QAbstractTableModel):
         return titles.get(key, key)
 
     def update_data(self, nodes: List[NodeRow]):
-        """Replace table content."""
-        self.beginResetModel()
+        """Replace table content; same node list = only changed rows are repainted."""
+        old = self._nodes
+        if [n.get("node_id") for n in old] != [n.get("node_id") for n in nodes]:
+            self.beginResetModel()
+            self._nodes = nodes
+            self.endResetModel()
+            return
         self._nodes = nodes
-        self.endResetModel()
+        last_col = len(self.headers) - 1
+        for row, (before, after) in enumerate(zip(old, nodes)):
+            if before != after:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col))
 
     def node_id_at(self, row: int) -> Optional[int]:
         if row < 0 or row >= len(self._nodes):
@@ -66,7 +99,20 @@ class NodesTableModel(QAbstractTableModel):
 
 
 class TelemetryTableModel(QAbstractTableModel):
-    """Table model for telemetry of a single node."""
+    """
+    Table model for telemetry of a single node.
+
+    Rows are kept newest first and paged in lazily: when the view scrolls to
+    the bottom, Qt calls fetchMore() and the model emits page_requested with
+    the oldest loaded row id. The owner answers with append_page().
+
+    At most max_rows are held: appending drops rows from the newest end and
+    prepending from the oldest end. Dropped newer rows are fetched back with
+    fetch_newer() (newer_page_requested, answered with prepend_rows()).
+    """
+
+    page_requested = Signal(object)
+    newer_page_requested = Signal(object)
 
     headers = [
         "cycle",
@@ -79,9 +125,14 @@ class TelemetryTableModel(QAbstractTableModel):
         "rssi",
     ]
 
-    def __init__(self, rows: Optional[List[TelemetryRow]] = None, parent=None):
+    def __init__(self, rows: Optional[List[TelemetryRow]] = None, parent=None, max_rows: int = TELEMETRY_MAX_ROWS):
         super().__init__(parent)
         self._rows: List[TelemetryRow] = rows or []
+        self.max_rows = max(int(max_rows), 2 * TELEMETRY_PAGE_SIZE)
+        self._has_more = False
+        self._fetch_pending = False
+        self._has_newer = False
+        self._newer_pending = False
 
     def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
         return 0 if parent.isValid() else len(self._rows)
@@ -94,6 +145,8 @@ class TelemetryTableModel(QAbstractTableModel):
             return None
         key = self.headers[index.column()]
         value = self._rows[index.row()].get(key, "")
+        if value is None:
+            return "-"
         if key == "flags":
             return f"0x{int(value):02X}"
         return str(value)
@@ -114,8 +167,90 @@ class TelemetryTableModel(QAbstractTableModel):
         key = self.headers[section]
         return titles.get(key, key)
 
-    def update_data(self, rows: List[TelemetryRow]):
-        """Replace table content."""
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:  # type: ignore[override]
+        if parent.isValid():
+            return False
+        return self._has_more and not self._fetch_pending
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):  # type: ignore[override]
+        if not self.canFetchMore(parent):
+            return
+        self._fetch_pending = True
+        self.page_requested.emit(self.oldest_id)
+
+    @property
+    def has_newer(self) -> bool:
+        """True when newer rows were dropped and the head is not loaded."""
+        return self._has_newer
+
+    def fetch_newer(self):
+        """Ask for the page right above the newest loaded row, if rows were dropped there."""
+        if not self._has_newer or self._newer_pending:
+            return
+        self._newer_pending = True
+        self.newer_page_requested.emit(self.newest_id)
+
+    def update_data(self, rows: List[TelemetryRow], has_more: bool = False):
+        """Replace table content with a first page."""
         self.beginResetModel()
         self._rows = rows
+        self._has_more = has_more
+        self._fetch_pending = False
+        self._has_newer = False
+        self._newer_pending = False
         self.endResetModel()
+
+    def append_page(self, rows: List[TelemetryRow], has_more: bool) -> int:
+        """Append an older page (answer to page_requested); returns how many newer rows were dropped."""
+        self._fetch_pending = False
+        self._has_more = has_more
+        if not rows:
+            return 0
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+        return self._trim(newest=True)
+
+    def prepend_rows(self, rows: List[TelemetryRow], has_newer: Optional[bool] = None) -> int:
+        """
+        Insert rows newer than the current head (newest first). has_newer is
+        given when answering newer_page_requested. Returns how many older rows
+        were dropped.
+        """
+        if has_newer is not None:
+            self._newer_pending = False
+            self._has_newer = has_newer
+        if not rows:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+        self._rows[0:0] = rows
+        self.endInsertRows()
+        return self._trim(newest=False)
+
+    def _trim(self, newest: bool) -> int:
+        excess = len(self._rows) - self.max_rows
+        if excess <= 0:
+            return 0
+        if newest:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._rows[:excess]
+            self._has_newer = True
+            # uma página mais nova pedida antes do corte não encaixa mais
+            self._newer_pending = False
+        else:
+            first = len(self._rows) - excess
+            self.beginRemoveRows(QModelIndex(), first, len(self._rows) - 1)
+            del self._rows[first:]
+            self._has_more = True
+            self._fetch_pending = False
+        self.endRemoveRows()
+        return excess
+
+    @property
+    def newest_id(self) -> Optional[int]:
+        return self._rows[0].get("id") if self._rows else None
+
+    @property
+    def oldest_id(self) -> Optional[int]:
+        return self._rows[-1].get("id") if self._rows else None
@@ -11,6 +11,7 @@ from PySide6.QtWidgets import QAbstractItemView, QHeaderView, QTableView, QVBoxL
 
 from .controllers import GceBackendController
 from .models import NodesTableModel
+from .workers import AsyncQuery
 
 
 class NodesPanel(QWidget):
@@ -24,15 +25,23 @@ class NodesPanel(QWidget):
         self._model = NodesTableModel()
         self._table = QTableView(self)
         self._current_node: Optional[int] = None
+        self._query = AsyncQuery(self)
+        self._query.result_ready.connect(self._on_nodes_loaded)
+        self._query.error.connect(self._on_query_error)
         self._setup_table()
         self._layout_widgets()
 
     def refresh(self):
-        """Fetch latest nodes from store."""
-        nodes = self._controller.list_nodes()
+        """Fetch latest nodes from store on the thread pool."""
+        self._query.submit(self._controller.list_nodes)
+
+    def _on_nodes_loaded(self, nodes):
         self._model.update_data(nodes)
         self._auto_select_first()
 
+    def _on_query_error(self, message: str):
+        self._controller.log_message.emit(f"nodes-query-failed err={message}")
+
     def _setup_table(self):
         self._table.setModel(self._model)
         self._table.setSelectionBehavior(QAbstractItemView.SelectRows)
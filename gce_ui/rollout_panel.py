@@ -0,0 +1,198 @@
+"""
+Dialog for rolling out one CONFIG profile to many RSN nodes.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QCheckBox,
+    QDialog,
+    QDoubleSpinBox,
+    QFormLayout,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+
+from gce_rollout import ConfigRollout, resolve_targets
+
+from .controllers import GceBackendController
+
+# rótulos exibidos para os estados do rollout
+_STATE_LABELS = {
+    "waiting": "aguardando",
+    "pending": "na fila",
+    "writing": "escrevendo",
+    "sent": "enviado",
+    "acked": "ok",
+    "rejected": "rejeitado",
+    "failed": "falhou",
+    "cancelled": "cancelado",
+}
+
+
+class RolloutDialog(QDialog):
+    """Select nodes, start a paced rollout and follow its acks."""
+
+    def __init__(self, controller: GceBackendController, profile: Dict[str, int], default_nodes: str = "", parent=None):
+        super().__init__(parent)
+        self._controller = controller
+        self._profile = dict(profile)
+        self._rollout: Optional[ConfigRollout] = None
+        self._targets: List[int] = []
+        self.setWindowTitle("Rollout de CONFIG")
+
+        self._profile_label = QLabel(", ".join(f"{k}={v}" for k, v in self._profile.items()), self)
+        self._profile_label.setWordWrap(True)
+        self._nodes_edit = QLineEdit(default_nodes, self)
+        self._nodes_edit.setPlaceholderText("ex.: 1,4,10-20 ou all")
+        self._query_edit = QLineEdit(self)
+        self._query_edit.setPlaceholderText("ex.: fw<3 seen<2h loss>5")
+        self._in_flight = QSpinBox(self)
+        self._in_flight.setRange(1, 255)
+        self._in_flight.setValue(16)
+        self._pace = QDoubleSpinBox(self)
+        self._pace.setRange(0.0, 60.0)
+        self._pace.setSingleStep(0.1)
+        self._pace.setValue(0.5)
+        self._pace.setSuffix(" s")
+        self._handshake = QCheckBox("Enviar HANDSHAKE antes", self)
+        self._force = QCheckBox("Reenviar a nós que já confirmaram esta config", self)
+
+        self._preview_btn = QPushButton("Selecionar nós", self)
+        self._start_btn = QPushButton("Iniciar", self)
+        self._cancel_btn = QPushButton("Cancelar rollout", self)
+        self._close_btn = QPushButton("Fechar", self)
+        self._start_btn.setEnabled(False)
+        self._cancel_btn.setEnabled(False)
+
+        self._progress = QProgressBar(self)
+        self._status = QLabel("", self)
+        self._table = QTableWidget(0, 4, self)
+        self._table.setHorizontalHeaderLabels(["Node", "Estado", "Tentativas", "Status ACK"])
+        self._table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self._table.verticalHeader().setVisible(False)
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(500)
+        self._timer.timeout.connect(self._on_tick)
+
+        self._build_layout()
+        self._preview_btn.clicked.connect(self._on_preview)
+        self._start_btn.clicked.connect(self._on_start)
+        self._cancel_btn.clicked.connect(self._on_cancel)
+        self._close_btn.clicked.connect(self.reject)
+
+    def _build_layout(self):
+        form = QFormLayout()
+        form.addRow("Perfil", self._profile_label)
+        form.addRow("Nós", self._nodes_edit)
+        form.addRow("Filtro", self._query_edit)
+        form.addRow("Máx. sem ACK", self._in_flight)
+        form.addRow("Intervalo", self._pace)
+        form.addRow("", self._handshake)
+        form.addRow("", self._force)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self._preview_btn)
+        buttons.addWidget(self._start_btn)
+        buttons.addWidget(self._cancel_btn)
+        buttons.addStretch()
+        buttons.addWidget(self._close_btn)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addLayout(buttons)
+        layout.addWidget(self._progress)
+        layout.addWidget(self._status)
+        layout.addWidget(self._table)
+        self.setLayout(layout)
+        self.resize(560, 520)
+
+    def _on_preview(self):
+        try:
+            self._targets = resolve_targets(
+                self._controller.list_nodes(),
+                self._nodes_edit.text().strip() or None,
+                self._query_edit.text().strip() or None,
+            )
+        except ValueError as exc:
+            QMessageBox.warning(self, "Rollout", f"Seleção inválida: {exc}")
+            return
+        self._fill_table([(n, "waiting", 0, None) for n in self._targets])
+        self._status.setText(f"{len(self._targets)} nós selecionados")
+        self._start_btn.setEnabled(bool(self._targets) and self._rollout is None)
+
+    def _on_start(self):
+        if not self._targets:
+            return
+        try:
+            self._rollout = self._controller.start_rollout(
+                self._targets,
+                self._profile,
+                max_in_flight=self._in_flight.value(),
+                pace_s=self._pace.value(),
+                handshake=self._handshake.isChecked(),
+                force=self._force.isChecked(),
+            )
+        except Exception as exc:
+            QMessageBox.warning(self, "Rollout", f"Falha ao iniciar rollout: {exc}")
+            return
+        for widget in (self._nodes_edit, self._query_edit, self._in_flight, self._pace, self._handshake, self._force):
+            widget.setEnabled(False)
+        self._preview_btn.setEnabled(False)
+        self._start_btn.setEnabled(False)
+        self._cancel_btn.setEnabled(True)
+        self._progress.setRange(0, max(1, len(self._rollout.node_ids)))
+        self._timer.start()
+        self._on_tick()
+
+    def _on_cancel(self):
+        if self._rollout is not None:
+            self._rollout.cancel()
+            self._on_tick()
+
+    def _on_tick(self):
+        if self._rollout is None:
+            return
+        progress = self._rollout.tick()
+        self._fill_table(self._rollout.results())
+        self._progress.setValue(progress.acked + progress.rejected + progress.failed)
+        self._status.setText(progress.describe())
+        if progress.finished:
+            self._timer.stop()
+            self._cancel_btn.setEnabled(False)
+            self._controller.log_message.emit(f"rollout-finished {progress.describe()}")
+
+    def _fill_table(self, results):
+        self._table.setRowCount(len(results))
+        for row, (node_id, state, attempts, ack_status) in enumerate(results):
+            values = (str(node_id), _STATE_LABELS.get(state, state), str(attempts), "-" if ack_status is None else str(ack_status))
+            for col, text in enumerate(values):
+                item = self._table.item(row, col)
+                if item is None:
+                    self._table.setItem(row, col, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+
+    def reject(self):  # type: ignore[override]
+        if self._rollout is not None and self._timer.isActive():
+            answer = QMessageBox.question(self, "Rollout", "Cancelar o rollout em andamento?")
+            if answer != QMessageBox.Yes:
+                return
+            self._rollout.cancel()
+            self._timer.stop()
+        super().reject()
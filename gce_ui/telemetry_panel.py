@@ -9,11 +9,18 @@ from typing import Optional
 from PySide6.QtWidgets import QAbstractItemView, QLabel, QTableView, QVBoxLayout, QWidget, QHeaderView
 
 from .controllers import GceBackendController
-from .models import TelemetryTableModel
+from .models import TELEMETRY_PAGE_SIZE, TelemetryTableModel
+from .workers import AsyncQuery
 
 
 class TelemetryPanel(QWidget):
-    """Table view for telemetry entries of a single node."""
+    """
+    Table view for telemetry entries of a single node.
+
+    Queries run on the thread pool; results for a node that is no longer
+    selected are dropped. The model holds a bounded window of rows: scrolling
+    back to the top re-fetches newer pages the window dropped.
+    """
 
     def __init__(self, controller: GceBackendController, parent: Optional[QWidget] = None):
         super().__init__(parent)
@@ -22,6 +29,9 @@ class TelemetryPanel(QWidget):
         self._table = QTableView(self)
         self._no_selection_label = QLabel("Selecione um nó para ver telemetria", self)
         self._current_node: Optional[int] = None
+        self._loaded_node: Optional[int] = None
+        self._head_query = AsyncQuery(self)
+        self._page_query = AsyncQuery(self)
 
         self._setup_table()
         self._layout_widgets()
@@ -33,21 +43,122 @@ class TelemetryPanel(QWidget):
 
     def set_node(self, node_id: int):
         """Set active node and refresh telemetry list."""
+        if node_id != self._current_node:
+            self._head_query.cancel()
+            self._page_query.cancel()
         self._current_node = node_id
         self.refresh()
 
     def refresh(self):
-        """Reload telemetry for the selected node."""
+        """Reload telemetry for the selected node, keeping already paged rows."""
         if self._current_node is None:
+            self._head_query.cancel()
+            self._page_query.cancel()
+            self._loaded_node = None
             self._model.update_data([])
             self._no_selection_label.show()
             self._table.hide()
             return
-        rows = self._controller.list_recent_telemetry(self._current_node)
-        self._model.update_data(rows)
+        node_id = self._current_node
+        newest_id = self._model.newest_id
+        if self._loaded_node == node_id and self._model.has_newer:
+            return  # a cabeça não está carregada; chega ao rolar para o topo
+        if self._loaded_node != node_id or newest_id is None:
+            self._head_query.submit(
+                lambda: ("reset", node_id, None, self._controller.list_telemetry_page(node_id, limit=TELEMETRY_PAGE_SIZE))
+            )
+        else:
+            self._head_query.submit(
+                lambda: (
+                    "head",
+                    node_id,
+                    newest_id,
+                    self._controller.list_telemetry_page(node_id, after_id=newest_id, limit=TELEMETRY_PAGE_SIZE),
+                )
+            )
+
+    def _on_newer_requested(self, after_id):
+        node_id = self._loaded_node
+        if node_id is None or after_id is None:
+            self._model.prepend_rows([], has_newer=False)
+            return
+        self._head_query.submit(
+            lambda: (
+                "newer",
+                node_id,
+                after_id,
+                self._controller.list_telemetry_page(node_id, after_id=after_id, limit=TELEMETRY_PAGE_SIZE),
+            )
+        )
+
+    def _on_head_result(self, result):
+        mode, node_id, after_id, rows = result
+        if node_id != self._current_node:
+            return
+        if mode == "newer":
+            if self._loaded_node != node_id or self._model.newest_id != after_id:
+                return
+            self._model.prepend_rows(rows, has_newer=len(rows) == TELEMETRY_PAGE_SIZE)
+            # mantém na tela a linha que estava no topo
+            if rows:
+                self._table.scrollTo(self._model.index(len(rows), 0), QAbstractItemView.PositionAtTop)
+            return
+        if mode == "head":
+            if self._loaded_node != node_id or self._model.newest_id != after_id:
+                return
+            if len(rows) >= TELEMETRY_PAGE_SIZE:
+                # too far behind to splice the gap; start over from the head
+                self._loaded_node = None
+                self.refresh()
+                return
+            self._model.prepend_rows(rows)
+            return
+        self._page_query.cancel()
+        self._loaded_node = node_id
+        self._model.update_data(rows, has_more=len(rows) == TELEMETRY_PAGE_SIZE)
         self._no_selection_label.hide()
         self._table.show()
 
+    def _on_page_requested(self, before_id):
+        node_id = self._loaded_node
+        if node_id is None or before_id is None:
+            self._model.append_page([], has_more=False)
+            return
+        self._page_query.submit(
+            lambda: (
+                node_id,
+                before_id,
+                self._controller.list_telemetry_page(node_id, before_id=before_id, limit=TELEMETRY_PAGE_SIZE),
+            )
+        )
+
+    def _on_page_result(self, result):
+        node_id, before_id, rows = result
+        if node_id != self._loaded_node or before_id != self._model.oldest_id:
+            return
+        top_row = self._table.rowAt(0)
+        dropped = self._model.append_page(rows, has_more=len(rows) == TELEMETRY_PAGE_SIZE)
+        if dropped and top_row >= dropped:
+            # linhas sumiram acima da tela: mantém a mesma linha no topo
+            self._table.scrollTo(self._model.index(top_row - dropped, 0), QAbstractItemView.PositionAtTop)
+
+    def _on_scrolled(self, value: int):
+        if value == self._table.verticalScrollBar().minimum():
+            self._model.fetch_newer()
+
+    def _on_head_error(self, message: str):
+        if self._model.has_newer:
+            # libera um novo pedido da página mais nova
+            self._model.prepend_rows([], has_newer=True)
+        self._on_query_error(message)
+
+    def _on_page_error(self, message: str):
+        self._model.append_page([], has_more=False)
+        self._on_query_error(message)
+
+    def _on_query_error(self, message: str):
+        self._controller.log_message.emit(f"telemetry-query-failed err={message}")
+
     def _setup_table(self):
         self._table.setModel(self._model)
         self._table.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -57,6 +168,13 @@ class TelemetryPanel(QWidget):
         header.setSectionResizeMode(QHeaderView.Stretch)
         self._table.verticalHeader().setVisible(False)
         self._table.hide()
+        self._model.page_requested.connect(self._on_page_requested)
+        self._model.newer_page_requested.connect(self._on_newer_requested)
+        self._table.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self._head_query.result_ready.connect(self._on_head_result)
+        self._page_query.result_ready.connect(self._on_page_result)
+        self._head_query.error.connect(self._on_head_error)
+        self._page_query.error.connect(self._on_page_error)
 
     def _layout_widgets(self):
         layout = QVBoxLayout(self)
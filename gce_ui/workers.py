@@ -0,0 +1,106 @@
+"""
+Background query helpers so store reads never run on the Qt GUI thread.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class _QuerySignals(QObject):
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+
+
+class _QueryTask(QRunnable):
+    def __init__(self, ticket: int, fn: Callable[[], Any], signals: _QuerySignals, is_current: Callable[[int], bool]):
+        super().__init__()
+        self._ticket = ticket
+        self._fn = fn
+        self._signals = signals
+        self._is_current = is_current
+
+    def run(self):
+        if not self._is_current(self._ticket):
+            # superseded before it started: skip the query entirely
+            self._signals.finished.emit(self._ticket, None)
+            return
+        try:
+            result = self._fn()
+        except Exception as exc:
+            self._signals.failed.emit(self._ticket, str(exc))
+            return
+        self._signals.finished.emit(self._ticket, result)
+
+
+class AsyncQuery(QObject):
+    """
+    Runs one kind of query on a QThreadPool and delivers only the latest result.
+
+    At most one task is in flight; submitting while busy replaces the queued
+    request, so bursts of refreshes collapse into one query. cancel() drops any
+    in-flight result (e.g. when the selected node changes).
+    """
+
+    result_ready = Signal(object)
+    error = Signal(str)
+
+    def __init__(self, parent: Optional[QObject] = None, pool: Optional[QThreadPool] = None):
+        super().__init__(parent)
+        self._pool = pool or QThreadPool.globalInstance()
+        self._signals = _QuerySignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._ticket_lock = threading.Lock()
+        self._ticket = 0
+        self._running = False
+        self._queued: Optional[Tuple[int, Callable[[], Any]]] = None
+
+    def submit(self, fn: Callable[[], Any]) -> int:
+        """Schedule fn() on the pool; its return value is emitted via result_ready."""
+        with self._ticket_lock:
+            self._ticket += 1
+            ticket = self._ticket
+        if self._running:
+            self._queued = (ticket, fn)
+        else:
+            self._start(ticket, fn)
+        return ticket
+
+    def cancel(self):
+        """Invalidate queued and in-flight work; their results are discarded."""
+        with self._ticket_lock:
+            self._ticket += 1
+        self._queued = None
+
+    @property
+    def busy(self) -> bool:
+        return self._running
+
+    def _is_current(self, ticket: int) -> bool:
+        with self._ticket_lock:
+            return ticket == self._ticket
+
+    def _start(self, ticket: int, fn: Callable[[], Any]):
+        self._running = True
+        self._pool.start(_QueryTask(ticket, fn, self._signals, self._is_current))
+
+    def _start_queued(self):
+        self._running = False
+        if self._queued is not None:
+            ticket, fn = self._queued
+            self._queued = None
+            self._start(ticket, fn)
+
+    def _on_finished(self, ticket: int, result: Any):
+        self._start_queued()
+        if self._is_current(ticket):
+            self.result_ready.emit(result)
+
+    def _on_failed(self, ticket: int, message: str):
+        self._start_queued()
+        if self._is_current(ticket):
+            self.error.emit(message)
@@ -3,11 +3,19 @@ from __future__ import annotations
 import argparse
 import json
 import sys
+import threading
 import time
 from pathlib import Path
 
 import structlog
 
+from gce_backup import create_snapshot
+from gce_clock import ClockAligner
+from gce_debug import DebugStreamRecorder
+from gce_downlink import DownlinkScheduler
+from gce_health import HealthDetector
+from gce_linkstats import LinkStatsTracker
+from gce_rollout import ConfigRollout, parse_duration_s, resolve_targets, stage_rollout
 from gce_store import GceStore
 from rsn_proto import RsnConfig
 from tgw_proto import (
@@ -17,6 +25,7 @@ from tgw_proto import (
     UpHelloFrame,
     UpTelemetryFrame,
     UpConfigAckFrame,
+    UpDebugFrame,
 )
 from tgw_uplink_serial import TgwUplinkSerial, auto_detect_port
 
@@ -29,6 +38,19 @@ def _parse_args() -> argparse.Namespace:
     parser.add_argument("--send-config", type=Path, help="JSON file with config to send")
     parser.add_argument("--node-id", type=int, help="Node id for sending config/handshake")
     parser.add_argument("--send-handshake", action="store_true", help="Send handshake before config")
+    parser.add_argument(
+        "--immediate",
+        action="store_true",
+        help="Write handshake/config right away instead of waiting for the node's next uplink",
+    )
+    parser.add_argument("--nodes", help="Roll --send-config out to many nodes: list/range ('1,4,10-20') or 'all'")
+    parser.add_argument("--node-query", help="Rollout filter over known nodes, e.g. 'fw<3 seen<2h'")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="Rollout: max unacked configs at once")
+    parser.add_argument("--pace-s", type=float, default=0.5, help="Min seconds between downlink writes on the serial link")
+    parser.add_argument("--force", action="store_true", help="Send even to nodes that already acked the same config")
+    parser.add_argument("--backup-dir", type=Path, help="Write read-only DB snapshots here while listening (see gce_backup)")
+    parser.add_argument("--backup-every", default="24h", help="Snapshot interval with --backup-dir, e.g. '6h'")
+    parser.add_argument("--backup-keep", type=int, default=7, help="Snapshots kept in --backup-dir (0 = all)")
     return parser.parse_args()
 
 
@@ -38,6 +60,40 @@ def _load_config(path: Path, node_id: int) -> RsnConfig:
     return RsnConfig.from_dict(node_id=node_id, cfg=data)
 
 
+def _load_profile(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _send_now(link: TgwUplinkSerial, log, args: argparse.Namespace, cfg: RsnConfig):
+    """Write handshake/config straight to the link (node must already be listening)."""
+    if args.send_handshake:
+        payload = build_down_handshake_payload(args.node_id)
+        try:
+            link.send_payload(payload)
+        except Exception as exc:
+            log.error("handshake-send-failed", err=str(exc))
+        else:
+            log.info("handshake-sent", node_id=args.node_id)
+        time.sleep(0.05)
+    payload = build_down_config_payload(args.node_id, cfg)
+    try:
+        link.send_payload(payload)
+    except Exception as exc:
+        log.error("config-send-failed", err=str(exc))
+    else:
+        log.info(
+            "config-sent",
+            node_id=args.node_id,
+            cfg=str(args.send_config),
+            sleep_s=cfg.sleep_time_s,
+            settle_ms=cfg.settling_time_ms,
+            sample_ms=cfg.sampling_interval_ms,
+            lost_rx_limit=cfg.lost_rx_limit,
+            debug_mode=cfg.debug_mode,
+        )
+
+
 def main():
     args = _parse_args()
     structlog.configure(processors=[structlog.processors.KeyValueRenderer(key_order=["event"])])
@@ -48,7 +104,11 @@ def main():
         log.error("no-serial-port-found")
         sys.exit(1)
 
-    if args.send_config and args.node_id is None:
+    rollout_mode = bool(args.nodes or args.node_query)
+    if rollout_mode and (not args.send_config or args.node_id is not None or args.immediate):
+        log.error("rollout-needs-send-config-without-node-id-or-immediate")
+        sys.exit(1)
+    if args.send_config and args.node_id is None and not rollout_mode:
         log.error("missing-node-id-for-config")
         sys.exit(1)
     if args.node_id is not None and not args.send_config and not args.send_handshake:
@@ -57,67 +117,142 @@ def main():
         log.error("node-id-out-of-range", node_id=args.node_id)
         sys.exit(1)
 
+    try:
+        backup_every_s = parse_duration_s(args.backup_every)
+    except ValueError as exc:
+        log.error("invalid-backup-every", err=str(exc))
+        sys.exit(1)
+
     store = GceStore(args.db, log=log)
     link = TgwUplinkSerial(port, baudrate=args.baud, log=log)
+    health = HealthDetector()
+    link_stats = LinkStatsTracker()
+    link_stats.seed(store.load_node_stats())
+    clock = ClockAligner(gateway=port)
+    # uma única conexão de escrita: leitor serial, callbacks do writer e loop principal
+    # (flush do debug) gravam sob este lock
+    # (reentrante: callbacks do downlink podem rodar na thread que já o detém)
+    store_lock = threading.RLock()
+
+    def on_downlink_change(cmd):
+        log.info(f"downlink-{cmd.state}", node_id=cmd.node_id, kind=cmd.kind, attempt=cmd.attempts, status=cmd.ack_status)
+        if cmd.state == "sent" and cmd.config_bytes is not None:
+            with store_lock:
+                store.mark_config_sent(cmd.node_id, cmd.config_bytes)
+
+    downlink = DownlinkScheduler(link.submit_payload, on_change=on_downlink_change, pace_s=args.pace_s)
+    debug = DebugStreamRecorder(store)
+    backup_thread = None
+    next_backup = time.monotonic()
+
+    def run_backup():
+        t0 = time.perf_counter()
+        try:
+            path = create_snapshot(args.db, args.backup_dir, keep=args.backup_keep)
+        except Exception as exc:
+            log.error("snapshot-failed", err=str(exc))
+        else:
+            log.info("snapshot-created", path=str(path), seconds=round(time.perf_counter() - t0, 1))
 
     def on_payload(payload: bytes):
+        host_ms = int(time.time() * 1000)
         try:
             frame = parse_up_payload(payload)
         except Exception as exc:
             log.warning("frame-parse-failed", err=str(exc))
             return
         if isinstance(frame, UpHelloFrame):
+            downlink.on_uplink(frame.node_id)
             log.info("hello-received", node_id=frame.node_id, rssi=frame.rssi)
-            store.upsert_node(frame.node_id, frame.rssi, frame.hello)
+            with store_lock:
+                store.upsert_node(frame.node_id, frame.rssi, frame.hello)
         elif isinstance(frame, UpTelemetryFrame):
+            downlink.on_uplink(frame.node_id)
             log.info("telemetry-received", node_id=frame.node_id, rssi=frame.rssi, tgw_ts_ms=frame.tgw_local_ts_ms)
-            store.add_telemetry(frame.node_id, frame.rssi, frame.tgw_local_ts_ms, frame.telemetry)
+            event_ts_ms = clock.align(frame.node_id, frame.tgw_local_ts_ms, frame.telemetry.ts_ms, host_ms)
+            with store_lock:
+                stats = link_stats.update(frame.node_id, frame.telemetry.cycle, frame.rssi)
+                if store.add_telemetry(
+                    frame.node_id, frame.rssi, frame.tgw_local_ts_ms, frame.telemetry, event_ts_ms=event_ts_ms, stats=stats
+                ):
+                    store.add_health_events(health.update(frame.node_id, frame.telemetry))
+        elif isinstance(frame, UpDebugFrame):
+            downlink.on_uplink(frame.node_id)
+            with store_lock:
+                debug.add(frame)
         elif isinstance(frame, UpConfigAckFrame):
             log.info("config-ack-received", node_id=frame.node_id, rssi=frame.rssi, status=frame.ack.status)
-            store.add_config_ack(frame.node_id, frame.rssi, frame.ack)
+            cmd = downlink.on_config_ack(frame.node_id, frame.ack.status)
+            with store_lock:
+                store.add_config_ack(frame.node_id, frame.rssi, frame.ack, cfg=cmd.config_bytes if cmd else None)
         else:
             log.warning("unknown-frame", type=type(frame).__name__)
 
     try:
         link.open()
+        link.start_writer()
         link.start_reader(on_payload)
 
         if args.send_config and args.node_id is not None:
             cfg = _load_config(args.send_config, args.node_id)
-            if args.send_handshake:
-                payload = build_down_handshake_payload(args.node_id)
-                try:
-                    link.send_payload(payload)
-                except Exception as exc:
-                    log.error("handshake-send-failed", err=str(exc))
-                else:
-                    log.info("handshake-sent", node_id=args.node_id)
-                time.sleep(0.05)
-            payload = build_down_config_payload(args.node_id, cfg)
-            try:
-                link.send_payload(payload)
-            except Exception as exc:
-                log.error("config-send-failed", err=str(exc))
+            if args.immediate:
+                _send_now(link, log, args, cfg)
             else:
-                log.info(
-                    "config-sent",
-                    node_id=args.node_id,
-                    cfg=str(args.send_config),
-                    sleep_s=cfg.sleep_time_s,
-                    settle_ms=cfg.settling_time_ms,
-                    sample_ms=cfg.sampling_interval_ms,
-                    lost_rx_limit=cfg.lost_rx_limit,
-                    debug_mode=cfg.debug_mode,
-                )
+                with store_lock:
+                    store.set_desired_configs({args.node_id: cfg.to_bytes()})
+                if not args.force and not cfg.reset_flags and not store.nodes_needing_config({args.node_id: cfg.to_bytes()}):
+                    log.info("config-unchanged", node_id=args.node_id, cfg=str(args.send_config))
+                else:
+                    if args.send_handshake:
+                        downlink.enqueue(args.node_id, "handshake", build_down_handshake_payload(args.node_id))
+                    downlink.enqueue(args.node_id, "config", build_down_config_payload(args.node_id, cfg))
+                    log.info("config-queued", node_id=args.node_id, cfg=str(args.send_config), sleep_s=cfg.sleep_time_s)
+
+        rollout = None
+        if rollout_mode:
+            profile = _load_profile(args.send_config)
+            targets = resolve_targets(store.list_nodes(), args.nodes, args.node_query)
+            with store_lock:
+                configs, to_send, unchanged = stage_rollout(store, targets, profile, force=args.force)
+            rollout = ConfigRollout(
+                downlink,
+                to_send,
+                lambda n: build_down_config_payload(n, configs[n]),
+                max_in_flight=args.max_in_flight,
+                handshake_payload=build_down_handshake_payload if args.send_handshake else None,
+                unchanged=unchanged,
+            )
+            log.info("rollout-started", nodes=len(to_send), unchanged=len(unchanged), cfg=str(args.send_config))
 
         log.info("listening", port=port, baud=args.baud, db=str(args.db))
+        last_report = ""
         while True:
             time.sleep(0.5)
+            with store_lock:
+                debug.flush(stale_only=True)
+            # cópia online numa thread à parte: a ingestão não espera por ela
+            if args.backup_dir and time.monotonic() >= next_backup and not (backup_thread and backup_thread.is_alive()):
+                next_backup = time.monotonic() + backup_every_s
+                backup_thread = threading.Thread(target=run_backup, name="gce-backup", daemon=True)
+                backup_thread.start()
+            if rollout is None:
+                continue
+            progress = rollout.tick()
+            report = progress.describe()
+            if report != last_report:
+                log.info("rollout-progress", progress=report)
+                last_report = report
+            if progress.finished:
+                failed = [r for r in rollout.results() if r[1] != "acked"]
+                log.info("rollout-finished", progress=report, failed=[(n, state, status) for n, state, _, status in failed])
+                rollout = None
     except KeyboardInterrupt:
-        log.info("shutdown")
+        log.info("shutdown", **store.ingest_stats())
     finally:
         link.close()
-        store.close()
+        with store_lock:
+            debug.flush()
+            store.close()
 
 
 if __name__ == "__main__":
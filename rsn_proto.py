@@ -12,6 +12,8 @@ from dataclasses import dataclass
 from enum import IntEnum
 from typing import Any, Dict
 
+import numpy as np
+
 RSN_MAX_PACKET_SIZE = 128
 
 
@@ -39,6 +41,14 @@ _telemetry_format = "<BBBBBII" + "BB" + ("H" * 15) + "b"
 TELEMETRY_STRUCT = struct.Struct(_telemetry_format)
 
 CONFIG_ACK_STRUCT = struct.Struct("<BBBBBB")
+# CONFIG_ACK status when the node applied the config
+CONFIG_ACK_OK = 0
+
+# header + session, seq, t0_ms (first sample), period_ms, channel, count; then count x uint16 samples
+DEBUG_STRUCT = struct.Struct("<BBBBBHHIHBB")
+DEBUG_MAX_SAMPLES = (RSN_MAX_PACKET_SIZE - DEBUG_STRUCT.size) // 2
+# channel ids in debug packets
+DEBUG_CHANNELS = ("soil", "vbat", "ntc")
 
 
 @dataclass
@@ -231,3 +241,33 @@ class RsnConfigAck:
         header = RsnHeader(*raw[:5])
         status = raw[5]
         return cls(header=header, status=status)
+
+
+@dataclass
+class RsnDebugBlock:
+    header: RsnHeader
+    session: int
+    seq: int
+    t0_ms: int
+    period_ms: int
+    channel: int
+    samples: np.ndarray  # uint16 view into the received buffer (read-only, no copy)
+
+    @classmethod
+    def from_bytes(cls, data) -> "RsnDebugBlock":
+        if len(data) < DEBUG_STRUCT.size:
+            raise ValueError("debug payload too short")
+        raw = DEBUG_STRUCT.unpack_from(data)
+        count = raw[10]
+        if count > DEBUG_MAX_SAMPLES or len(data) < DEBUG_STRUCT.size + 2 * count:
+            raise ValueError(f"debug payload truncated: {count} samples")
+        samples = np.frombuffer(data, dtype="<u2", count=count, offset=DEBUG_STRUCT.size)
+        return cls(
+            header=RsnHeader(*raw[:5]),
+            session=raw[5],
+            seq=raw[6],
+            t0_ms=raw[7],
+            period_ms=raw[8],
+            channel=raw[9],
+            samples=samples,
+        )
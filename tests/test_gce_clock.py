@@ -0,0 +1,49 @@
+from gce_clock import COUNTER_MOD, ClockAligner, ClockModel
+
+HOST0 = 1_790_000_000_000
+
+
+def _feed(aligner, frames, node_id=1, tgw0=1_000, rsn0=50_000, period_ms=60_000):
+    """Frames every period_ms with a fixed 20 ms link delay; returns the last aligned time."""
+    out = None
+    for i in frames:
+        t = i * period_ms
+        out = aligner.align(node_id, tgw0 + t, rsn0 + t, HOST0 + t + 20)
+    return out
+
+
+def test_out_of_order_duplicate_keeps_the_fit():
+    aligner = ClockAligner(segment_ms=300_000)
+    _feed(aligner, range(40))
+    node = aligner._nodes[1]
+    assert node.locked and aligner.tgw.locked
+    fit = node._fit
+
+    # cópia retransmitida do quadro 35 chega depois do 39, recebida pelo TGW agora
+    t_late, t_now = 35 * 60_000, 40 * 60_000
+    aligned = aligner.align(1, 1_000 + t_now, 50_000 + t_late, HOST0 + t_now + 20)
+
+    assert node.locked and node.resets == 0 and node.reordered == 1
+    assert node._fit == fit
+    assert abs(aligned - (HOST0 + t_late)) <= 20
+    # a sequência normal continua alinhada
+    assert abs(_feed(aligner, [41]) - (HOST0 + 41 * 60_000)) <= 20
+
+
+def test_large_backward_step_is_a_reboot():
+    model = ClockModel(segment_ms=1_000, reorder_ms=10_000)
+    for t in range(0, 5_000, 500):
+        model.observe(3_000_000 + t, HOST0 + t)
+    assert model.locked
+    model.observe(100, HOST0 + 6_000)
+    assert model.resets == 1 and not model.locked
+
+
+def test_late_reading_from_before_a_wrap():
+    model = ClockModel(reorder_ms=10_000)
+    before = model.unwrap(COUNTER_MOD - 1_000)
+    after = model.unwrap(2_000)
+    late = model.unwrap(COUNTER_MOD - 500)
+    assert after - before == 3_000
+    assert late - before == 500
+    assert model.resets == 0 and model.reordered == 1
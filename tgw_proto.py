@@ -6,6 +6,7 @@ Payload types:
   0xA1 UP_RSN_HELLO:   [type][node_id][rssi][rsn_hello_packet_t]
   0xA2 UP_RSN_TELEM:   [type][node_id][rssi][local_ts_ms(4 LE)][rsn_telemetry_packet_t]
   0xA3 UP_RSN_CONFIG_ACK: [type][node_id][rssi][rsn_config_ack_packet_t]
+  0xA4 UP_RSN_DEBUG:   [type][node_id][rssi][local_ts_ms(4 LE)][rsn_debug_packet_t + uint16 samples]
   0xB1 DOWN_RSN_CONFIG: [type][node_id][rsn_config_packet_t]
   0xB2 DOWN_RSN_HANDSHAKE: [type][node_id][rsn_handshake_packet_t(optional)]
 """
@@ -20,6 +21,7 @@ from typing import Union
 from rsn_proto import (
     RsnConfig,
     RsnConfigAck,
+    RsnDebugBlock,
     RsnHello,
     RsnPacketType,
     RsnTelemetry,
@@ -27,6 +29,7 @@ from rsn_proto import (
     HELLO_STRUCT,
     TELEMETRY_STRUCT,
     CONFIG_ACK_STRUCT,
+    DEBUG_STRUCT,
 )
 
 
@@ -34,6 +37,7 @@ class TgwFrameType(IntEnum):
     UP_RSN_HELLO = 0xA1
     UP_RSN_TELEMETRY = 0xA2
     UP_RSN_CONFIG_ACK = 0xA3
+    UP_RSN_DEBUG = 0xA4
     DOWN_RSN_CONFIG = 0xB1
     DOWN_RSN_HANDSHAKE = 0xB2
 
@@ -60,7 +64,15 @@ class UpConfigAckFrame:
     ack: RsnConfigAck
 
 
-UpFrame = Union[UpHelloFrame, UpTelemetryFrame, UpConfigAckFrame]
+@dataclass
+class UpDebugFrame:
+    node_id: int
+    rssi: int
+    tgw_local_ts_ms: int
+    block: RsnDebugBlock
+
+
+UpFrame = Union[UpHelloFrame, UpTelemetryFrame, UpConfigAckFrame, UpDebugFrame]
 
 
 def parse_up_payload(payload: bytes) -> UpFrame:
@@ -95,6 +107,17 @@ def parse_up_payload(payload: bytes) -> UpFrame:
         ack = RsnConfigAck.from_bytes(payload[3:3 + CONFIG_ACK_STRUCT.size])
         return UpConfigAckFrame(node_id=node_id, rssi=rssi, ack=ack)
 
+    if msg_type == TgwFrameType.UP_RSN_DEBUG:
+        expected = 3 + 4 + DEBUG_STRUCT.size
+        if len(payload) < expected:
+            raise ValueError(f"debug frame too short: {len(payload)} < {expected}")
+        node_id = payload[1]
+        rssi = struct.unpack_from("<b", payload, 2)[0]
+        tgw_ts_ms = struct.unpack_from("<I", payload, 3)[0]
+        # memoryview: as amostras ficam no buffer recebido, sem cópia
+        block = RsnDebugBlock.from_bytes(memoryview(payload)[7:])
+        return UpDebugFrame(node_id=node_id, rssi=rssi, tgw_local_ts_ms=tgw_ts_ms, block=block)
+
     raise ValueError(f"unknown frame type 0x{msg_type:02X}")
 
 
@@ -2,12 +2,20 @@
 Serial uplink helper for TGW <-> GCE.
 
 Framing: [len LSB][len MSB][payload...]
+
+Outbound frames go through a writer thread with a bounded queue:
+submit_payload() returns a Future right away, frames queued together are
+written with a single write()/flush(), and frames not written before their
+deadline fail with TimeoutError. send_payload() keeps the blocking API.
 """
 
 from __future__ import annotations
 
+import queue
 import threading
-from typing import Callable, Optional
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
 
 import serial
 from serial.tools import list_ports
@@ -19,26 +27,52 @@ def auto_detect_port() -> Optional[str]:
     return ports[0].device if ports else None
 
 
+_OutFrame = Tuple[bytes, float, Future]
+
+
 class TgwUplinkSerial:
-    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 1.0, log=None):
+    def __init__(
+        self,
+        port: str,
+        baudrate: int = 115200,
+        timeout: float = 1.0,
+        log=None,
+        *,
+        write_timeout: float = 2.0,
+        send_timeout: float = 5.0,
+        queue_size: int = 256,
+        max_batch_bytes: int = 4096,
+    ):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.send_timeout = send_timeout
+        self.max_batch_bytes = max_batch_bytes
         self._ser: Optional[serial.Serial] = None
         self._log = log
         self._stop_event = threading.Event()
         self._reader_thread: Optional[threading.Thread] = None
         self._callback: Optional[Callable[[bytes], None]] = None
+        self._out: "queue.Queue[_OutFrame]" = queue.Queue(maxsize=queue_size)
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_stop = threading.Event()
+        self._write_lock = threading.Lock()
 
     def open(self):
-        self._ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+        self._ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout, write_timeout=self.write_timeout)
         if self._log:
             self._log.info("serial-open", port=self.port, baud=self.baudrate)
 
     def close(self):
         self._stop_event.set()
+        self._writer_stop.set()
         if self._reader_thread and self._reader_thread.is_alive():
             self._reader_thread.join(timeout=2.0)
+        if self._writer_thread and self._writer_thread.is_alive():
+            self._writer_thread.join(timeout=self.write_timeout + 1.0)
+        self._writer_thread = None
+        self._fail_pending(RuntimeError("serial closed"))
         if self._ser:
             try:
                 self._ser.close()
@@ -47,17 +81,107 @@ class TgwUplinkSerial:
         if self._log:
             self._log.info("serial-closed")
 
+    @staticmethod
+    def _frame(payload: bytes) -> bytes:
+        if len(payload) > 0xFFFF:
+            raise ValueError("payload too large for framing")
+        return len(payload).to_bytes(2, "little") + payload
+
     def send_payload(self, payload: bytes):
+        """Write one frame and wait for it (through the writer thread when running)."""
         if not self._ser:
             raise RuntimeError("serial not open")
-        if len(payload) > 0xFFFF:
-            raise ValueError("payload too large for framing")
-        frame = len(payload).to_bytes(2, "little") + payload
-        self._ser.write(frame)
-        self._ser.flush()
+        if self._writer_thread is not None:
+            self.submit_payload(payload).result(timeout=self.send_timeout + self.write_timeout)
+            return
+        frame = self._frame(payload)
+        with self._write_lock:
+            self._ser.write(frame)
+            self._ser.flush()
         if self._log:
             self._log.debug("serial-send", bytes=len(payload))
 
+    def submit_payload(self, payload: bytes, timeout: Optional[float] = None) -> Future:
+        """
+        Queue one frame for the writer thread; never blocks.
+        The Future resolves to the payload size once written, or fails with
+        queue.Full, TimeoutError (not written within timeout) or the serial error.
+        """
+        future: Future = Future()
+        try:
+            if not self._ser or self._writer_thread is None:
+                raise RuntimeError("serial writer not running")
+            deadline = time.monotonic() + (self.send_timeout if timeout is None else timeout)
+            self._out.put_nowait((self._frame(payload), deadline, future))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def start_writer(self):
+        """Start the writer thread (call after open())."""
+        if not self._ser:
+            raise RuntimeError("serial not open")
+        if self._writer_thread:
+            raise RuntimeError("writer already started")
+        self._writer_stop.clear()
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+
+    def _writer_loop(self):
+        while not self._writer_stop.is_set():
+            try:
+                first = self._out.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch: List[_OutFrame] = [first]
+            size = len(first[0])
+            # junta o que já está na fila numa única escrita
+            while size < self.max_batch_bytes:
+                try:
+                    item = self._out.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            now = time.monotonic()
+            live = []
+            for frame, deadline, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if now > deadline:
+                    future.set_exception(TimeoutError("frame not written before deadline"))
+                else:
+                    live.append((frame, future))
+            if not live:
+                continue
+            try:
+                with self._write_lock:
+                    if not self._ser:
+                        raise RuntimeError("serial closed")
+                    self._ser.write(b"".join(frame for frame, _ in live))
+                    self._ser.flush()
+            except Exception as exc:
+                if self._log:
+                    self._log.error("serial-write-error", err=str(exc), frames=len(live))
+                for _, future in live:
+                    future.set_exception(exc)
+                continue
+            for frame, future in live:
+                future.set_result(len(frame) - 2)
+            if self._log:
+                self._log.debug("serial-send", frames=len(live), bytes=sum(len(f) for f, _ in live))
+        if self._log:
+            self._log.info("serial-writer-exit")
+
+    def _fail_pending(self, exc: Exception):
+        while True:
+            try:
+                _, _, future = self._out.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(exc)
+
     def start_reader(self, callback: Callable[[bytes], None]):
         if not self._ser:
             raise RuntimeError("serial not open")